@@ -0,0 +1,104 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .data_models import Task, TaskStatus
+
+
+class AlarmScheduler:
+    """Keeps upcoming task alarms in a min-heap ordered by the time they should go off.
+
+    A task's alarm goes off its lead time before due_at (the task's alarm_lead_minutes, or
+    the default). Tasks that are DONE, have no due time, or already fired an alarm for
+    their current due time are not scheduled. Replaced heap entries are skipped when
+    they reach the top instead of being searched for and removed.
+    """
+
+    DEFAULT_LEAD_MINUTES = 12 * 60
+
+    def __init__(self, default_lead_minutes: int = DEFAULT_LEAD_MINUTES):
+        self.default_lead_minutes = default_lead_minutes
+        self._heap: List[Tuple[datetime, str, datetime]] = [] # (alarm time, task id, due time)
+        self._entries: Dict[str, Tuple[datetime, datetime]] = {} # task id -> its live (alarm time, due time)
+        self.fired: Dict[str, str] = {} # task id -> due time (isoformat) its alarm already fired for
+        # Called whenever the schedule changed, so a timer can be re-armed for next_alarm_time()
+        self.on_schedule_changed: Optional[Callable[[], None]] = None
+
+    def lead_time(self, task: Task) -> timedelta:
+        lead_minutes = task.alarm_lead_minutes
+        return timedelta(minutes=self.default_lead_minutes if lead_minutes is None else lead_minutes)
+
+    def rebuild(self, tasks: Iterable[Task]):
+        self._entries = {}
+        known_ids = set()
+        for task in tasks:
+            known_ids.add(task.id)
+            entry = self._entry_for(task)
+            if entry is not None:
+                self._entries[task.id] = entry
+        self.fired = {task_id: due_key for task_id, due_key in self.fired.items() if task_id in known_ids}
+        self._heapify()
+        self._notify()
+
+    def update(self, task: Task):
+        """Schedules, reschedules or unschedules a task after it was added or edited."""
+        entry = self._entry_for(task)
+        if entry == self._entries.get(task.id):
+            return
+        if entry is None:
+            del self._entries[task.id]
+        else:
+            self._entries[task.id] = entry
+            heapq.heappush(self._heap, (entry[0], task.id, entry[1]))
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heapify() # Too many replaced entries piled up
+        self._notify()
+
+    def remove(self, task_id: str):
+        self.fired.pop(task_id, None)
+        if self._entries.pop(task_id, None) is not None:
+            self._notify()
+
+    def _entry_for(self, task: Task) -> Optional[Tuple[datetime, datetime]]:
+        if task.status == TaskStatus.DONE or task.due_at is None:
+            return None
+        if task.id in self.fired:
+            if self.fired[task.id] == task.due_at.isoformat():
+                return None
+            del self.fired[task.id] # Rescheduled since the alarm fired, so it may go off again
+        return (task.due_at - self.lead_time(task), task.due_at)
+
+    def _heapify(self):
+        self._heap = [(alarm_time, task_id, due_at) for task_id, (alarm_time, due_at) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _drop_stale_top(self):
+        while self._heap:
+            alarm_time, task_id, due_at = self._heap[0]
+            if self._entries.get(task_id) == (alarm_time, due_at):
+                return
+            heapq.heappop(self._heap)
+
+    def next_alarm_time(self) -> Optional[datetime]:
+        self._drop_stale_top()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """Returns the ids of tasks whose alarm should go off at `now` and records them as fired.
+
+        Alarms whose task is already past due (e.g. the app was closed) are dropped silently.
+        """
+        due_ids = []
+        while True:
+            self._drop_stale_top()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, task_id, due_at = heapq.heappop(self._heap)
+            del self._entries[task_id]
+            if due_at > now:
+                self.fired[task_id] = due_at.isoformat()
+                due_ids.append(task_id)
+        return due_ids
+
+    def _notify(self):
+        if self.on_schedule_changed:
+            self.on_schedule_changed()
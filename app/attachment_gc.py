@@ -0,0 +1,204 @@
+"""Finds attachment files no task refers to, and deletes them or moves them to a quarantine folder.
+
+Usage: python -m app.attachment_gc [--data-folder data] [--delete | --quarantine] [--grace-hours 1]
+
+Without --delete or --quarantine it only reports what could be reclaimed.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+from .storage.attachment_store import blob_digest
+from .utils import format_size
+
+SCAN_WORKERS = 8
+BLOBS = "blobs" # Where AttachmentStore keeps its content-addressed files
+
+
+@dataclass
+class OrphanReport:
+    """What a scan of the attachments folder found. Paths are relative to the attachments folder."""
+    scanned_files: int = 0
+    orphans: List[Tuple[str, int]] = field(default_factory=list) # (path, size)
+    skipped_young: int = 0 # Unreferenced, but too recent to be sure nobody is about to refer to them
+    removed: int = 0 # Deleted or quarantined
+    quarantine_dir: Optional[str] = None
+    cutoff: float = 0.0 # Files changed at or after this time were left alone
+    errors: List[Tuple[str, str]] = field(default_factory=list) # (path, message)
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return sum(size for _, size in self.orphans)
+
+
+def referenced_paths(attachment_refs: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """Splits attachment references into (stored blob digests, normalised legacy relative paths)."""
+    digests, legacy_paths = set(), set()
+    for ref in attachment_refs:
+        digest = blob_digest(ref)
+        if digest:
+            digests.add(digest)
+        else:
+            legacy_paths.add(os.path.normcase(os.path.normpath(ref)))
+    return digests, legacy_paths
+
+
+def _scan_tree(attachments_dir: str, top: str, recursive: bool, is_referenced: Callable[[str, str], bool],
+               cutoff: float) -> Tuple[int, int, List[Tuple[str, int]]]:
+    """Walks one folder below the attachments folder with os.scandir.
+
+    Returns (files seen, recent unreferenced files left alone, orphans as (relative path, size)).
+    Only unreferenced files are stat'ed, so a folder of files in use costs one directory read.
+    """
+    seen, young, orphans = 0, 0, []
+    stack = [top]
+    while stack:
+        rel_folder = stack.pop()
+        try:
+            with os.scandir(os.path.join(attachments_dir, rel_folder)) as entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_folder, entry.name) if rel_folder else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(rel_path)
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    seen += 1
+                    if is_referenced(rel_folder, entry.name):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime >= cutoff:
+                        young += 1
+                    else:
+                        orphans.append((rel_path, stat.st_size))
+        except FileNotFoundError: # Removed while we were looking
+            pass
+    return seen, young, orphans
+
+
+def _subfolders(folder: str) -> List[str]:
+    try:
+        with os.scandir(folder) as entries:
+            return [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+
+
+def find_orphans(attachments_dir: str, digests: Set[str], legacy_paths: Set[str],
+                 grace_seconds: float = 3600, now: Optional[float] = None, workers: int = SCAN_WORKERS) -> OrphanReport:
+    """Walks the attachments folder in parallel and lists the files nothing refers to.
+
+    Each task folder and each blobs/<xx> fan-out folder is walked by its own worker.
+    Files changed within the last `grace_seconds` are left alone: they may be a copy in
+    progress or be referred to by changes another instance has not saved yet.
+    """
+    report = OrphanReport()
+    report.cutoff = cutoff = (now if now is not None else time.time()) - grace_seconds
+
+    def is_referenced(rel_folder: str, name: str) -> bool:
+        if rel_folder == BLOBS or rel_folder.startswith(BLOBS + os.sep):
+            # Only blobs/<xx>/<digest> holds stored content; anything else there is a leftover
+            return name in digests and rel_folder[len(BLOBS) + 1:] == name[:2]
+        return os.path.normcase(os.path.join(rel_folder, name)) in legacy_paths
+
+    # (folder, walk subfolders too): the loose files at the top, then one entry per subtree
+    tops = [("", False)]
+    for name in _subfolders(attachments_dir):
+        if name == BLOBS:
+            tops.append((BLOBS, False))
+            tops.extend((os.path.join(BLOBS, fan_out), True) for fan_out in _subfolders(os.path.join(attachments_dir, BLOBS)))
+        else:
+            tops.append((name, True))
+    with ThreadPoolExecutor(workers, thread_name_prefix="AttachmentScan") as executor:
+        for seen, young, orphans in executor.map(
+                lambda top: _scan_tree(attachments_dir, top[0], top[1], is_referenced, cutoff), tops):
+            report.scanned_files += seen
+            report.skipped_young += young
+            report.orphans.extend(orphans)
+    report.orphans.sort()
+    return report
+
+
+def remove_orphans(attachments_dir: str, report: OrphanReport, quarantine_dir: Optional[str] = None,
+                   workers: int = SCAN_WORKERS) -> OrphanReport:
+    """Deletes the report's orphans, or moves them under `quarantine_dir` keeping their relative paths.
+
+    Folders left empty are removed too. Failures are listed in `report.errors`.
+    """
+    report.quarantine_dir = quarantine_dir
+    names_by_folder = {}
+    for rel_path, _ in report.orphans:
+        folder, name = os.path.split(rel_path)
+        names_by_folder.setdefault(folder, []).append(name)
+
+    def remove_folder(folder: str, names: List[str]) -> List[Tuple[str, str]]:
+        # One worker per folder, so quarantine folders are created once each
+        failures = []
+        source_dir = os.path.join(attachments_dir, folder)
+        target_dir = os.path.join(quarantine_dir, folder) if quarantine_dir else None
+        if target_dir:
+            os.makedirs(target_dir, exist_ok=True)
+        for name in names:
+            path = os.path.join(source_dir, name)
+            try:
+                # Only a blob can be attached again after the scan (which touches it)
+                if folder.startswith(BLOBS) and os.stat(path).st_mtime >= report.cutoff:
+                    failures.append((os.path.join(folder, name), "attached again since the scan"))
+                elif target_dir:
+                    os.replace(path, os.path.join(target_dir, name))
+                else:
+                    os.remove(path)
+            except OSError as e:
+                failures.append((os.path.join(folder, name), str(e)))
+        return failures
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="AttachmentCleanup") as executor:
+        for failures in executor.map(remove_folder, names_by_folder.keys(), names_by_folder.values()):
+            report.errors.extend(failures)
+    report.removed = len(report.orphans) - len(report.errors)
+
+    # Deepest folders first, so a task folder goes once its last file does
+    for folder in sorted(names_by_folder.keys() - {""}, key=lambda rel_path: rel_path.count(os.sep), reverse=True):
+        while folder:
+            try:
+                os.rmdir(os.path.join(attachments_dir, folder))
+            except OSError: # Not empty, or gone already
+                break
+            folder = os.path.dirname(folder)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-folder", default="data", help="data folder, relative to the app (default: %(default)s)")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--delete", action="store_true", help="delete unreferenced files")
+    action.add_argument("--quarantine", action="store_true", help="move unreferenced files to a quarantine folder")
+    parser.add_argument("--grace-hours", type=float, default=1.0,
+                        help="leave files changed this recently alone (default: %(default)s)")
+    args = parser.parse_args()
+
+    from .data_manager import DataManager # Imported here because data_manager imports this module
+    data_manager = DataManager(args.data_folder)
+    data_manager.load_data()
+    started = time.perf_counter()
+    report = data_manager.collect_orphan_attachments(remove=args.delete or args.quarantine, quarantine=args.quarantine,
+                                                     grace_seconds=args.grace_hours * 3600)
+    elapsed = time.perf_counter() - started
+    print(f"Scanned {report.scanned_files} files in {elapsed:.2f}s.")
+    print(f"{len(report.orphans)} unreferenced files, {format_size(report.reclaimable_bytes)} reclaimable"
+          f" ({report.skipped_young} recent ones left alone).")
+    if report.quarantine_dir:
+        print(f"Moved {report.removed} files to {report.quarantine_dir}.")
+    elif args.delete:
+        print(f"Deleted {report.removed} files.")
+    for rel_path, message in report.errors:
+        print(f"Error: Could not remove {rel_path}: {message}")
+    data_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, Iterable, List, Optional
+from .storage.attachment_store import CHUNK_SIZE, AttachmentStore, attachment_name, blob_digest
+
+# Makes a thumbnail of an image file: (image path, thumbnail path) -> whether one was written
+Thumbnailer = Callable[[str, str], bool]
+
+# Leading bytes of common files whose names don't say what they are
+_MAGIC_TYPES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"%PDF", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+]
+
+
+@dataclass
+class AttachmentInfo:
+    """What the attachment list shows about one attachment, as last read from its file."""
+    size: int
+    mtime_ns: int
+    mime_type: str
+    sha256: str
+    has_thumbnail: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def guess_mime_type(name: str, file_path: Optional[str] = None) -> str:
+    mime_type, _ = mimetypes.guess_type(name)
+    if mime_type is None and file_path:
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(16)
+            mime_type = next((magic_type for magic, magic_type in _MAGIC_TYPES if head.startswith(magic)), None)
+        except OSError:
+            pass
+    return mime_type or "application/octet-stream"
+
+
+class AttachmentMetadataCache:
+    """Size, MIME type, content hash and image thumbnail per attachment reference.
+
+    Views read entries from memory with get() and never touch the files; refresh()
+    checks and fills entries on a background thread. An entry is stale once its file's
+    size or modification time differs from what it recorded; stored blobs never change
+    content, so for them only the size is compared (re-attaching one touches its mtime).
+    Entries are kept in a JSON file and thumbnails as PNG files named by content hash,
+    both next to the attachments folder.
+    """
+
+    THUMBNAIL_SIZE = 64
+
+    def __init__(self, store: AttachmentStore, index_file: str, thumbnails_dir: str):
+        self.store = store
+        self.index_file = index_file
+        self.thumbnails_dir = thumbnails_dir
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, AttachmentInfo]] = None # Read on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _loaded_entries(self) -> Dict[str, AttachmentInfo]:
+        # Callers hold self._lock
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.index_file, 'r') as f:
+                    data = json.load(f)
+                for ref, entry in (data if isinstance(data, dict) else {}).items():
+                    try:
+                        self._entries[ref] = AttachmentInfo.from_dict(entry)
+                    except TypeError: # Written by another version of the app
+                        pass
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+        return self._entries
+
+    def get(self, ref: str) -> Optional[AttachmentInfo]:
+        """The cached entry, possibly stale, without touching the file."""
+        with self._lock:
+            return self._loaded_entries().get(ref)
+
+    def thumbnail_path(self, info: AttachmentInfo) -> Optional[str]:
+        return os.path.join(self.thumbnails_dir, info.sha256 + ".png") if info.has_thumbnail else None
+
+    def refresh(self, refs: Iterable[str], thumbnailer: Optional[Thumbnailer] = None) -> Future:
+        """Brings the entries of `refs` up to date on a background thread.
+
+        The future's result is the list of refs whose entries changed.
+        """
+        refs = list(refs)
+        with self._lock:
+            if self._executor is None: # Started on first use
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="AttachmentMetadata")
+            return self._executor.submit(self._refresh, refs, thumbnailer)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _refresh(self, refs: List[str], thumbnailer: Optional[Thumbnailer]) -> List[str]:
+        changed = []
+        for ref in refs:
+            path = self.store.path(ref)
+            try:
+                stat = os.stat(path)
+            except OSError: # Missing; the dialog says so when it is opened
+                continue
+            cached = self.get(ref)
+            if cached is not None and cached.size == stat.st_size and (
+                    cached.mtime_ns == stat.st_mtime_ns or blob_digest(ref) is not None):
+                continue
+            try:
+                info = self._read_info(ref, path, stat, thumbnailer)
+            except OSError as e:
+                print(f"Warning: Could not read attachment '{attachment_name(ref)}': {e}")
+                continue
+            with self._lock:
+                self._loaded_entries()[ref] = info
+            changed.append(ref)
+        if changed:
+            self._save()
+        return changed
+
+    def _read_info(self, ref: str, path: str, stat: os.stat_result, thumbnailer: Optional[Thumbnailer]) -> AttachmentInfo:
+        digest = blob_digest(ref)
+        if digest is None: # Files stored before the blob store are hashed once here
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+        info = AttachmentInfo(stat.st_size, stat.st_mtime_ns, guess_mime_type(attachment_name(ref), path), digest)
+        if thumbnailer and info.mime_type.startswith("image/"):
+            thumbnail = os.path.join(self.thumbnails_dir, digest + ".png")
+            if os.path.exists(thumbnail): # Same picture attached elsewhere
+                info.has_thumbnail = True
+            else:
+                os.makedirs(self.thumbnails_dir, exist_ok=True)
+                info.has_thumbnail = thumbnailer(path, thumbnail)
+        return info
+
+    def _save(self):
+        with self._lock:
+            data = json.dumps({ref: asdict(info) for ref, info in self._loaded_entries().items()})
+        tmp_path = self.index_file + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            print(f"Error saving attachment metadata: {e}")
@@ -0,0 +1,128 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+from .storage.attachment_store import AttachmentStore, TransferCancelled
+
+# Transfer states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class AttachmentTransfer:
+    """One file being copied into or out of the attachment store on a worker thread.
+
+    The worker only updates `done_bytes` and the final state; whoever started the
+    transfer polls it (the GUI from a timer) and acts on the result on its own thread.
+    """
+
+    def __init__(self, src_path: str, total_bytes: int, dest_path: Optional[str] = None):
+        self.src_path = src_path
+        self.dest_path = dest_path # Set for copies out of the store
+        self.name = os.path.basename(dest_path or src_path)
+        self.total_bytes = total_bytes
+        self.done_bytes = 0
+        self.state = QUEUED
+        self.ref: Optional[str] = None # The attachment reference, once a copy into the store is done
+        self.error: Optional[Exception] = None
+        self._cancel = threading.Event()
+        self._future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        """Stops the copy between chunks; a copy that has not started yet never starts."""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.state = CANCELLED
+
+    def wait(self, timeout: Optional[float] = None):
+        if self._future is not None:
+            try:
+                self._future.result(timeout)
+            except Exception:
+                pass # Kept in `error` and `state`
+
+    def _add_progress(self, count: int):
+        self.done_bytes += count
+
+
+class AttachmentTransfers:
+    """Copies attachment files in chunks on a small thread pool, several files at once.
+
+    Each copy is verified before it counts as done (see AttachmentStore), so a task only
+    ever refers to a complete file.
+    """
+    MAX_WORKERS = 4
+
+    def __init__(self, store: AttachmentStore, max_workers: int = MAX_WORKERS):
+        self.store = store
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._transfers: List[AttachmentTransfer] = []
+
+    def attach(self, src_path: str) -> AttachmentTransfer:
+        """Starts storing a file. Its reference is in `ref` once the transfer is DONE.
+
+        Progress counts up to twice the file size: the file is hashed, then copied if its
+        content is new (a file already stored finishes after the first pass).
+        """
+        transfer = AttachmentTransfer(src_path, 2 * os.path.getsize(src_path))
+        return self._submit(transfer, self._run_attach)
+
+    def download(self, ref: str, dest_path: str) -> AttachmentTransfer:
+        """Starts copying an attachment out of the store to `dest_path`."""
+        src_path = self.store.path(ref)
+        transfer = AttachmentTransfer(src_path, os.path.getsize(src_path), dest_path)
+        transfer.ref = ref
+        return self._submit(transfer, self._run_download)
+
+    def active(self) -> List[AttachmentTransfer]:
+        with self._lock:
+            self._transfers = [transfer for transfer in self._transfers if not transfer.finished]
+            return list(self._transfers)
+
+    def cancel_all(self):
+        for transfer in self.active():
+            transfer.cancel()
+
+    def shutdown(self):
+        """Cancels what is still running and waits for the workers to stop."""
+        self.cancel_all()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _submit(self, transfer: AttachmentTransfer, run) -> AttachmentTransfer:
+        with self._lock:
+            if self._executor is None: # Started on first use
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="AttachmentTransfer")
+            self._transfers.append(transfer)
+            transfer._future = self._executor.submit(self._run, transfer, run)
+        return transfer
+
+    def _run(self, transfer: AttachmentTransfer, run):
+        transfer.state = RUNNING
+        try:
+            run(transfer)
+            transfer.done_bytes = transfer.total_bytes
+            transfer.state = DONE
+        except TransferCancelled:
+            transfer.state = CANCELLED
+        except Exception as e:
+            print(f"Error: Could not copy attachment '{transfer.name}': {e}")
+            transfer.error = e
+            transfer.state = FAILED
+
+    def _run_attach(self, transfer: AttachmentTransfer):
+        transfer.ref = self.store.add_file(transfer.src_path, transfer._add_progress, transfer._cancel)
+
+    def _run_download(self, transfer: AttachmentTransfer):
+        self.store.copy_out(transfer.ref, transfer.dest_path, transfer._add_progress, transfer._cancel)
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from .data_models import Comment, CommentSource
+
+
+class CommentCache(CommentSource):
+    """The comment threads of stored tasks, read on demand and kept in a least-recently-used cache.
+
+    Only the `capacity` most recently read threads stay in memory. Each cached thread also
+    remembers the comments it was loaded or last saved with, so that an edit made in place
+    (e.g. through task.comments) can be noticed and saved by DataManager.update_task.
+    An in-place edit that is never saved is lost once its thread is evicted, which is why
+    the GUI edits stored comments through DataManager.update_comment and delete_comment.
+    """
+
+    DEFAULT_CAPACITY = 256
+
+    def __init__(self, load_thread: Callable[[str], List[Comment]], capacity: int = DEFAULT_CAPACITY):
+        self._load_thread = load_thread
+        self.capacity = capacity
+        self._threads: "OrderedDict[str, List[Comment]]" = OrderedDict()
+        self._saved: Dict[str, List[dict]] = {} # task id -> its thread as last loaded or saved
+
+    def thread(self, task_id: str) -> List[Comment]:
+        thread = self._threads.get(task_id)
+        if thread is None:
+            thread = self._load_thread(task_id)
+            self.put(task_id, thread)
+        else:
+            self._threads.move_to_end(task_id)
+        return thread
+
+    def peek(self, task_id: str) -> Optional[List[Comment]]:
+        """The cached thread, if any, without loading it or refreshing its place in the cache."""
+        return self._threads.get(task_id)
+
+    def put(self, task_id: str, thread: List[Comment]):
+        self._threads[task_id] = thread
+        self._threads.move_to_end(task_id)
+        self.mark_saved(task_id)
+        while len(self._threads) > self.capacity:
+            evicted_id, _ = self._threads.popitem(last=False)
+            del self._saved[evicted_id]
+
+    def mark_saved(self, task_id: str):
+        self._saved[task_id] = [comment.to_dict() for comment in self._threads[task_id]]
+
+    def changed(self, task_id: str) -> bool:
+        thread = self._threads.get(task_id)
+        return thread is not None and [comment.to_dict() for comment in thread] != self._saved[task_id]
+
+    def discard(self, task_id: str):
+        if self._threads.pop(task_id, None) is not None:
+            del self._saved[task_id]
+
+    def clear(self):
+        self._threads.clear()
+        self._saved.clear()
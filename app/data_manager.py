@@ -1,15 +1,63 @@
 # c:\Users\xiongti\Documents\TeamTaskManager\app\data_manager.py
 import os
+import gc
 import json
 import sys # Import sys to check if running as a bundled app
-from datetime import datetime, date
-from typing import List, Dict, Optional
-from .data_models import TaskList, Task, TaskStatus, Comment, TaskPriority
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, date, timedelta
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from .data_models import TaskList, Task, LazyTask, TaskStatus, Comment, TaskPriority
+from .storage.base import StorageBackend
+from .storage.json_backend import JsonBackend
+from .storage.sqlite_backend import SqliteBackend
+from .storage.sharded_backend import ShardedJsonBackend
+from .storage.comment_store import THREAD_OPS, task_header
+from .storage.write_behind import WriteBehindSaver
+from .storage.archive import TaskArchive
+from .storage.file_lock import DataFolderLock
+from .storage.attachment_store import AttachmentStore, blob_digest
+from .storage.merge import TaskConflict, apply_record, check_versions
+from .settings_store import SettingsStore, WorkspaceViewState
+from .indexes import SecondaryIndex, IntervalIndex, ReferenceCounter
+from .alarm_scheduler import AlarmScheduler
+from .comment_cache import CommentCache
+from .attachment_transfers import AttachmentTransfers
+from .attachment_metadata import AttachmentMetadataCache
+from .attachment_gc import BLOBS, OrphanReport, find_orphans, referenced_paths, remove_orphans
+from .utils import format_size
+from .events import EventBus, ChangeEvent, TASK_ADDED, TASK_UPDATED, TASK_DELETED, COMMENT_ADDED, \
+    LIST_ADDED, LIST_UPDATED, LISTS_DELETED, RELOADED
+from .task_import import ImportReport, RowError, iter_rows, parse_task_row, detect_format
+from .task_export import COMMENTS_NESTED, iter_export_records, write_csv, write_ndjson
 import shutil
 # from .utils import DATE_FORMAT # Currently not used in this file
 
+def _task_day_span(task: Task) -> Optional[Tuple[int, int]]:
+    """The calendar days a task shows up on, as inclusive date ordinals."""
+    if not task.due_at:
+        return None
+    due_day = task.due_at.date().toordinal()
+    if task.start_at:
+        start_day = task.start_at.date().toordinal()
+        return (start_day, due_day) if start_day <= due_day else None
+    return (due_day, due_day)
+
+def _task_blob_digests(task: Task) -> Set[str]:
+    """The stored blobs a task's attachments refer to."""
+    return {digest for digest in map(blob_digest, task.attachment_refs()) if digest}
+
 class DataManager:
-    def __init__(self, data_folder_name="data"):
+    # Default write-behind timing in seconds: save after this much idle time, but never
+    # hold unsaved changes for longer than the max delay.
+    WRITE_BEHIND_QUIET_PERIOD = 1.0
+    WRITE_BEHIND_MAX_DELAY = 5.0
+    # DONE tasks due (or, without a due time, created) this many days ago are archived
+    ARCHIVE_AFTER_DAYS = 30
+
+    def __init__(self, data_folder_name="data", journal_mode: bool = True, backend: Optional[str] = None,
+                 lazy_load: bool = True, binary_snapshot: bool = True):
         # Determine the base directory for data storage.
         if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
             # Running in a PyInstaller bundle (frozen)
@@ -28,145 +76,671 @@ class DataManager:
         self.members_file = os.path.join(self.data_dir, "task_lists.json") # Using plural version
         self.tasks_file = os.path.join(self.data_dir, "tasks.json")       # Using plural version
         self.settings_file = os.path.join(self.data_dir, "settings.json")
+        self.journal_file = os.path.join(self.data_dir, "journal.ndjson")
+        self.database_file = os.path.join(self.data_dir, "tasks.db")
+        self.snapshot_file = os.path.join(self.data_dir, "tasks.snap") # Binary copy of the JSON files
+        self.lists_dir = os.path.join(self.data_dir, "lists") # One shard file per task list
+        self.comments_dir = os.path.join(self.data_dir, "comments") # One thread file per task (JSON backends)
+        self.archive_dir = os.path.join(self.data_dir, "archive") # Compressed segments of archived DONE tasks
+        self.lock_file = os.path.join(self.data_dir, "data.lock") # Shared by every instance using this folder
+        self.conflicts_file = os.path.join(self.data_dir, "conflicts.ndjson") # Changes that lost to another instance
+        self.quarantine_dir = os.path.join(self.data_dir, "attachments_quarantine") # Set aside by collect_orphan_attachments
+        self.attachment_metadata_file = os.path.join(self.data_dir, "attachment_metadata.json")
+        self.thumbnails_dir = os.path.join(self.data_dir, "attachment_thumbnails") # PNGs named by content hash
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.attachments_dir, exist_ok=True)
 
 
         self.task_lists: Dict[str, TaskList] = {}
         self.tasks: Dict[str, Task] = {}
+        # Set when the backend left finished tasks out of the load; the ones asked for are
+        # read in as they are needed (see _load_finished_tasks), so `tasks` holds only part of them
+        self._partially_loaded = False
+        # Secondary indexes, kept in step with every mutation below
+        self._tasks_by_list = SecondaryIndex(lambda task: task.assigned_to)
+        self._tasks_by_status = SecondaryIndex(lambda task: task.status)
+        self._lists_by_category = SecondaryIndex(lambda task_list: getattr(task_list, 'category', 'default'))
+        self._lists_by_name = SecondaryIndex(lambda task_list: task_list.name.casefold()) # Names are unique across categories
+        self._task_spans = IntervalIndex(lambda task: task.assigned_to, _task_day_span) # Calendar-day spans
+        # Attachment files are stored once per content; tasks hold references to them
+        self.attachment_store = AttachmentStore(self.attachments_dir)
+        self._blob_refs = ReferenceCounter(_task_blob_digests) # Tasks referring to each stored blob
+        self.attachment_transfers = AttachmentTransfers(self.attachment_store) # Copies files off the GUI thread
+        # Size, type, hash and thumbnail per attachment, for showing attachments without reading them
+        self.attachment_metadata = AttachmentMetadataCache(self.attachment_store, self.attachment_metadata_file,
+                                                           self.thumbnails_dir)
+        self._maintenance: Optional[ThreadPoolExecutor] = None # Background clean-ups; see start_attachment_collection
+        # Tasks keep no comments; their threads are read from storage when shown
+        self.comment_threads = CommentCache(self._load_thread)
+        self.settings = SettingsStore(self.settings_file) # Read once, served from memory
+        self.alarms = AlarmScheduler(self.load_setting('default_alarm_lead_minutes', AlarmScheduler.DEFAULT_LEAD_MINUTES))
+        self.alarms.fired = dict(self.load_setting('fired_alarms', {})) # Survives restarts
+        # 'json' (default), 'sharded' or 'sqlite'; falls back to the 'storage_backend' setting when not given.
+        self.backend_name = backend or self.load_setting('storage_backend', 'json')
+        self.storage: StorageBackend = self._create_storage(self.backend_name, journal_mode, binary_snapshot)
+        # Loaded tasks decode their creation time on first access
+        self.lazy_load = lazy_load
+        self._lock = threading.RLock() # Guards the in-memory data while the saver thread serializes it
+        self._io_lock = threading.RLock() # Serializes writes to the data files
+        self._pending_changes: List[dict] = [] # Change records not yet written to disk
+        self._transaction_changes: Optional[List[dict]] = None # Records held back by an open transaction
+        # How to take back each change of the open transaction, oldest first; see _rollback_transaction
+        self._transaction_undo: List[Callable[[], Optional[dict]]] = []
+        # Several instances may share the data folder. Writes happen under the folder lock, and
+        # when another instance wrote since our data was loaded, our records are checked against
+        # the stored task versions and merged into the stored data instead of overwriting it.
+        self._folder_lock = DataFolderLock(self.lock_file)
+        self._synced_generation: Optional[int] = None # Write generation the in-memory data matches
+        self._stored_versions: Optional[Dict[str, int]] = None # Task versions on disk, at _versions_generation
+        self._versions_generation: Optional[int] = None
+        self.conflicts: List[TaskConflict] = [] # Found while saving, not yet shown (see take_conflicts)
+        self._conflicted_ids: Set[str] = set() # Tasks whose in-memory version lost to a stored one
+        self._lock_file_fingerprint: Optional[Tuple[int, int]] = None # Last seen by reload_changes
+        self.saver: Optional[WriteBehindSaver] = None
+        self.events = EventBus() # Views subscribe here to patch themselves after each change
+        # Finished tasks moved out of the working set; 'gzip' (default) or 'lzma'
+        self.archive = TaskArchive(self.archive_dir, self.load_setting('archive_compression', 'gzip'))
         # self.load_data() # load_data is called from main.py after DataManager instantiation
 
-    def _load_json(self, file_path: str) -> list:
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                return data if isinstance(data, list) else [] # Ensure it's a list
-        except FileNotFoundError:
-            print(f"Info: File {file_path} not found. Will be created on save.")
-            return []
-        except json.JSONDecodeError:
-            print(f"Error: Could not decode JSON from {file_path}. Returning empty list.")
-            return []
-        except Exception as e:
-            print(f"An unexpected error occurred while loading {file_path}: {e}")
-            return []
+    def _create_storage(self, backend_name: str, journal_mode: bool, binary_snapshot: bool) -> StorageBackend:
+        if backend_name == 'sqlite':
+            return SqliteBackend(self.database_file)
+        if backend_name == 'sharded':
+            return ShardedJsonBackend(self.lists_dir, self.comments_dir)
+        if backend_name != 'json':
+            print(f"Warning: Unknown storage backend '{backend_name}'. Using JSON files.")
+        # In journal mode each mutation appends one record instead of rewriting the JSON files.
+        return JsonBackend(self.members_file, self.tasks_file, self.journal_file if journal_mode else None,
+                           self.snapshot_file if binary_snapshot else None, self.comments_dir)
+
+    def save_setting(self, key: str, value):
+        if self.settings.set(key, value):
+            self._settings_changed()
+
+    def load_setting(self, key: str, default=None):
+        return self.settings.get(key, default)
+
+    def get_view_state(self, workspace_id: str) -> WorkspaceViewState:
+        return self.settings.get_view_state(workspace_id)
+
+    def save_view_state(self, workspace_id: str, state: WorkspaceViewState):
+        if self.settings.set_view_state(workspace_id, state):
+            self._settings_changed()
+
+    def _settings_changed(self):
+        # Settings ride along with the next write-behind flush
+        if self.saver:
+            self.saver.mark_dirty()
+        else:
+            self.settings.flush()
+
+    def load_data(self):
+        source = self.storage
+        migrating = False
+        if not isinstance(self.storage, JsonBackend) and self.storage.is_empty():
+            # One-shot migration: a fresh database picks up the existing JSON files.
+            legacy = JsonBackend(self.members_file, self.tasks_file, self.journal_file, comments_dir=self.comments_dir)
+            if not legacy.is_empty():
+                print(f"Migrating JSON data into {self.backend_name} storage...")
+                source = legacy
+                migrating = True
+
+        with self._io_lock, self._folder_lock: # Not while another instance is writing
+            # Building many objects at once triggers repeated garbage collection passes that
+            # find nothing to free, so pause the collector while loading.
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                replayed_count = self._load_from(source)
+                self._synced_generation = self._folder_lock.generation()
+                if migrating: # Carry the comment threads over as well
+                    with self._lock:
+                        for task_id in self.tasks:
+                            comment_dicts = source.load_comments(task_id)
+                            if comment_dicts:
+                                self._pending_changes.append({'op': 'put_comments', 'task_id': task_id,
+                                                              'comments': comment_dicts})
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+            if replayed_count:
+                print(f"Replayed {replayed_count} journal records.")
+            if replayed_count or migrating:
+                self.save_data()
+        print("Data loaded.")
+        self.events.emit(ChangeEvent(RELOADED))
+        if not self.task_lists and not self.tasks:
+            print("Note: No saved task lists or tasks were found. They will be created on save if data is added.")
+
+    def _load_from(self, source: StorageBackend) -> int:
+        """Replaces the in-memory data with the contents of `source`.
+
+        Returns the number of replayed changes plus the number of comment threads found in
+        older data that still kept them inside the tasks; those are queued to be moved out.
+        """
+        with self._lock:
+            self.task_lists.clear()
+            self.tasks.clear()
+            self.comment_threads.clear()
+            moved_threads = 0
+            task_lists_data, tasks_data = source.load()
+            self._partially_loaded = source.finished_on_demand
+            task_class = LazyTask if self.lazy_load else Task
+            for list_dict in task_lists_data:
+                # Ensure id and name exist, otherwise skip this malformed entry
+                if 'id' not in list_dict or 'name' not in list_dict:
+                    print(f"Warning: Skipping malformed task list entry: {list_dict}")
+                    continue
+                task_list = TaskList.from_dict(list_dict)
+                self.task_lists[task_list.id] = task_list
+
+            for task_dict in tasks_data: # May be streamed from disk one task at a time
+                comment_dicts = task_dict.pop('comments', None)
+                if comment_dicts: # Saved before comments were stored separately
+                    self._pending_changes.append({'op': 'put_comments', 'task_id': task_dict['id'],
+                                                  'comments': list(comment_dicts)})
+                    moved_threads += 1
+                task = task_class.from_dict(task_dict)
+                task.store_comments_in(self.comment_threads)
+                self.tasks[task.id] = task
+            self._rebuild_indexes()
+
+            # Replay mutations journaled since the last compaction, then fold them into the snapshot.
+            change_records = source.load_changes()
+            for record in change_records:
+                if record.get('op') == 'add_comment' or 'comments' in record.get('task', ()):
+                    # Older journals kept comments; queue them for the comment store
+                    moved_threads += self._queue_journaled_comments(record)
+                self._apply_change(record)
+            return len(change_records) + moved_threads
+
+    def _queue_journaled_comments(self, record: dict) -> int:
+        if record['op'] == 'put_task':
+            self._pending_changes.append({'op': 'put_comments', 'task_id': record['task']['id'],
+                                          'comments': list(record['task']['comments'])})
+            return 1
+        # Skip comments already folded into the snapshot by an interrupted compaction
+        if record['task_id'] in self.tasks and Comment.from_dict(record['comment']) not in self._read_thread(record['task_id']):
+            self._pending_changes.append(record)
+            return 1
+        return 0
+
+    def _load_thread(self, task_id: str) -> List[Comment]:
+        # Waits for a write in progress, whose records are neither pending nor in storage yet
+        with self._io_lock, self._lock:
+            return self._read_thread(task_id)
+
+    def _peek_thread(self, task_id: str) -> List[Comment]:
+        """A task's comments, read past the cache unless cached already, so that reading many
+        threads (archiving, exporting) does not evict the ones being shown."""
+        thread = self.comment_threads.peek(task_id)
+        return thread if thread is not None else self._load_thread(task_id)
+
+    def _read_thread(self, task_id: str) -> List[Comment]:
+        """Reads a comment thread from storage, with the changes not written yet applied on top."""
+        comment_dicts = self.storage.load_comments(task_id)
+        for record in self._pending_changes + (self._transaction_changes or []):
+            op = record.get('op')
+            if op == 'add_comment' and record['task_id'] == task_id:
+                comment_dicts.append(record['comment'])
+            elif op == 'put_comments' and record['task_id'] == task_id:
+                comment_dicts = list(record['comments'])
+            elif op == 'put_task' and record['task']['id'] == task_id and 'comments' in record['task']:
+                comment_dicts = list(record['task']['comments'])
+            elif op == 'delete_task' and record['id'] == task_id:
+                comment_dicts = []
+        return [Comment.from_dict(comment_dict) for comment_dict in comment_dicts]
+
+    def _load_finished_tasks(self, **filters):
+        """Reads the stored finished tasks matching `filters` (see StorageBackend.query_task_ids) into
+        memory, if the backend left them out of the load, so that the in-memory indexes cover them."""
+        if self._partially_loaded:
+            self._load_stored_tasks(lambda: self.storage.query_task_ids(status=TaskStatus.DONE.name, **filters))
+
+    def _load_stored_tasks(self, query_ids: Callable[[], Iterable[str]]):
+        # Waits for a write in progress, whose deletions are neither pending nor in storage yet
+        with self._io_lock, self._lock:
+            deleted_ids = {record['id'] for record in self._pending_changes + (self._transaction_changes or [])
+                           if record.get('op') == 'delete_task'}
+            task_ids = [task_id for task_id in query_ids() if task_id not in self.tasks and task_id not in deleted_ids]
+            if not task_ids:
+                return
+            task_class = LazyTask if self.lazy_load else Task
+            for task_dict in self.storage.load_tasks(task_ids):
+                task = task_class.from_dict(task_dict)
+                if task.assigned_to not in self.task_lists: # Its list was deleted, but that is not saved yet
+                    task.assigned_to = None
+                task.store_comments_in(self.comment_threads)
+                self.tasks[task.id] = task
+                self._index_task(task)
+
+    def _rebuild_indexes(self):
+        self._tasks_by_list.rebuild(self.tasks.items())
+        self._tasks_by_status.rebuild(self.tasks.items())
+        self._task_spans.rebuild(self.tasks.items())
+        self._blob_refs.rebuild(self.tasks.items())
+        self._lists_by_category.rebuild(self.task_lists.items())
+        self._lists_by_name.rebuild(self.task_lists.items())
+        self.alarms.rebuild(self.tasks.values())
+
+    def _index_list(self, task_list: TaskList):
+        self._lists_by_category.update(task_list.id, task_list)
+        self._lists_by_name.update(task_list.id, task_list)
+
+    def _index_task(self, task: Task):
+        self._tasks_by_list.update(task.id, task)
+        self._tasks_by_status.update(task.id, task)
+        self._task_spans.update(task.id, task)
+        self._blob_refs.update(task.id, task)
+        self.alarms.update(task)
+
+    def _unindex_task(self, task_id: str):
+        self._tasks_by_list.remove(task_id)
+        self._tasks_by_status.remove(task_id)
+        self._task_spans.remove(task_id)
+        self._blob_refs.remove(task_id)
+        self.alarms.remove(task_id)
 
+    def _unassign_tasks(self, list_ids, unassigned: Optional[List[Tuple[Task, str]]] = None):
+        """Takes the lists' tasks out of them, noting each task and its list in `unassigned` if given."""
+        for list_id in list_ids:
+            for task_id in self._tasks_by_list.get(list_id):
+                task = self.tasks[task_id]
+                if unassigned is not None:
+                    unassigned.append((task, task.assigned_to))
+                task.assigned_to = None
+                self._tasks_by_list.update(task_id, task)
+                self._task_spans.update(task_id, task)
 
-    def _save_json(self, file_path: str, data: list):
+    def _remove_task_lists(self, list_ids):
+        for an_id in list_ids:
+            if self.task_lists.pop(an_id, None) is not None:
+                self._lists_by_category.remove(an_id)
+                self._lists_by_name.remove(an_id)
+
+    def save_data(self):
+        """Writes a full snapshot of all lists and tasks. In journal mode this is the compaction step.
+
+        If another instance wrote since our data was loaded, the snapshot is the stored data
+        with our changes merged in, so theirs are kept.
+        """
+        if self._partially_loaded: # A snapshot would drop the finished tasks not read in; write the changes
+            self.flush()
+            return
+        with self._io_lock, self._folder_lock:
+            in_sync = self._in_sync()
+            with self._lock:
+                records, self._pending_changes = self._pending_changes, []
+                if in_sync: # The snapshot covers every pending change to lists and tasks
+                    task_lists_list = [task_list.to_dict() for task_list in self.task_lists.values()]
+                    tasks_list = [task.to_dict(include_comments=False) for task in self.tasks.values()]
+            records = self._begin_write(records, in_sync)
+            if not in_sync:
+                task_lists_list, tasks_list = self._merged_snapshot(records)
+            # Changes to comment threads, which the snapshot leaves alone, need a separate write.
+            thread_records = [record for record in records
+                              if record.get('op') in THREAD_OPS or 'comments' in record.get('task', ())]
+            if thread_records:
+                self.storage.write_changes(thread_records)
+            self.storage.write_snapshot(task_lists_list, tasks_list)
+
+    def flush(self):
+        """Writes dirty settings and pending change records, compacting if the backend asks for a snapshot."""
+        with self._io_lock, self._folder_lock:
+            self.settings.flush()
+            in_sync = self._in_sync()
+            with self._lock:
+                records, self._pending_changes = self._pending_changes, []
+            if not records:
+                return
+            self.storage.write_changes(self._begin_write(records, in_sync))
+            if self.storage.needs_snapshot():
+                self.save_data()
+
+    def _in_sync(self) -> bool:
+        """Whether nobody else wrote to the data folder since our data was loaded. Needs the folder lock."""
+        return self._folder_lock.generation() == self._synced_generation
+
+    def _begin_write(self, records: List[dict], in_sync: bool) -> List[dict]:
+        """Announces a write to the other instances and returns the records that may be written.
+
+        Out of sync, records that would overwrite a task another instance changed (or
+        deleted) are dropped and reported as conflicts. Needs the folder lock.
+        """
+        if not in_sync and records:
+            generation = self._folder_lock.generation()
+            if self._versions_generation != generation:
+                self._stored_versions = self.storage.load_versions()
+                self._versions_generation = generation
+            records, conflicts = check_versions(records, self._stored_versions)
+            if conflicts:
+                self._report_conflicts(conflicts)
+        # Announce the write before making it, so a crash mid-write still warns the others
+        generation = self._folder_lock.bump_generation()
+        if in_sync:
+            self._synced_generation = generation
+        elif self._stored_versions is not None and self._versions_generation == generation - 1:
+            self._versions_generation = generation # Updated with our records by check_versions
+        return records
+
+    def _merged_snapshot(self, records: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """The stored lists and tasks with `records` applied on top."""
+        task_lists_data, tasks_data = self.storage.load()
+        task_lists = {list_dict['id']: list_dict for list_dict in task_lists_data}
+        # Through Task to get plain headers; a binary snapshot loads datetimes, not strings
+        tasks = {task_dict['id']: Task.from_dict(task_header(task_dict)).to_dict(include_comments=False)
+                 for task_dict in tasks_data}
+        for record in self.storage.load_changes() + records:
+            apply_record(task_lists, tasks, record)
+        return list(task_lists.values()), list(tasks.values())
+
+    def _report_conflicts(self, conflicts: List[TaskConflict]):
+        """Keeps our side of each conflict in the conflicts file and queues it for take_conflicts."""
+        detected_at = datetime.now().isoformat()
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            print(f"Data successfully saved to {file_path}")
+            with open(self.conflicts_file, 'a', encoding='utf-8') as f:
+                for conflict in conflicts:
+                    f.write(json.dumps({'task_id': conflict.task_id, 'ours': conflict.ours,
+                                        'stored_version': conflict.stored_version,
+                                        'detected_at': detected_at}) + "\n")
         except IOError as e:
-            print(f"IOError: Could not write to file {file_path}. Error: {e}")
-        except TypeError as e:
-            print(f"TypeError: Could not serialize data to JSON for {file_path}. Error: {e}")
-        except Exception as e:
-            print(f"An unexpected error occurred while saving to {file_path}. Error: {e}")
+            print(f"IOError: Could not write to {self.conflicts_file}. Error: {e}")
+        with self._lock:
+            self.conflicts.extend(conflicts)
+            self._conflicted_ids.update(conflict.task_id for conflict in conflicts)
+        print(f"Warning: {len(conflicts)} changes were not saved because another instance changed "
+              f"the same tasks first. They are kept in {self.conflicts_file}.")
 
-    def _load_settings(self) -> dict:
-        try:
-            with open(self.settings_file, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+    def take_conflicts(self) -> List[TaskConflict]:
+        """Returns the conflicts found since the last call, for the GUI to show."""
+        with self._lock:
+            conflicts, self.conflicts = self.conflicts, []
+        return conflicts
+
+    # Past this many changed lists and tasks, reload_changes has views rebuild instead of patching rows
+    RELOAD_PATCH_LIMIT = 100
+
+    def reload_changes(self) -> int:
+        """Picks up what other instances saved to the data folder and patches memory and the views.
 
-    def _save_settings(self, settings: dict):
+        Meant to be polled: while nobody else writes it only stats the lock file. Tasks are
+        compared by version, so only changed tasks are turned into objects (the SQLite
+        backend reads only their rows), and each change reaches the views as its own event.
+        Tasks and lists with unsaved changes of our own are left alone; saving those checks
+        them for conflicts. Returns the number of changed lists and tasks.
+        """
+        try:
+            stat = os.stat(self.lock_file)
+        except FileNotFoundError:
+            return 0
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        if fingerprint == self._lock_file_fingerprint or self._transaction_changes is not None:
+            return 0
+        if not self._io_lock.acquire(blocking=False):
+            return 0 # A save is running; look again on the next poll
         try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(settings, f, indent=4)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+            with self._folder_lock:
+                self._lock_file_fingerprint = fingerprint
+                generation = self._folder_lock.generation()
+                if generation == self._synced_generation:
+                    return 0
+                with self._lock:
+                    unsaved_task_ids, unsaved_list_ids = self._unsaved_ids()
+                    # A version that lost a conflict is ours, not the stored one; never matches
+                    known_versions = {task_id: -1 if task_id in self._conflicted_ids else task.version
+                                      for task_id, task in self.tasks.items()}
+                    # Tasks with unsaved changes are compared by the version those changes started from
+                    known_versions.update(unsaved_task_ids)
+                    self._conflicted_ids.clear()
+                task_lists_data, changed_tasks, removed_ids = self.storage.load_diff(known_versions)
+                with self._lock:
+                    events, skipped = self._apply_stored_changes(task_lists_data, changed_tasks, removed_ids,
+                                                                 unsaved_task_ids, unsaved_list_ids)
+                    if not skipped: # Else memory still differs from storage; saves keep merging
+                        self._synced_generation = generation
+            self.archive.reload()
+        finally:
+            self._io_lock.release()
 
-    def save_setting(self, key: str, value):
-        settings = self._load_settings()
-        settings[key] = value
-        self._save_settings(settings)
+        if events:
+            print(f"Reloaded {len(events)} changes made by another instance.")
+            with ExitStack() as stack:
+                if len(events) > self.RELOAD_PATCH_LIMIT:
+                    stack.enter_context(self.events.batch())
+                for event in events:
+                    self.events.emit(event)
+        return len(events)
 
-    def load_setting(self, key: str, default=None):
-        settings = self._load_settings()
-        return settings.get(key, default)
+    def _unsaved_ids(self) -> Tuple[Dict[str, int], Set[str]]:
+        """The tasks (with the version their first unsaved change started from) and the lists
+        that have change records not written yet."""
+        task_ids, list_ids = {}, set()
+        for record in self._pending_changes + (self._transaction_changes or []):
+            op = record.get('op')
+            if op == 'put_task':
+                task_ids.setdefault(record['task']['id'], record['task'].get('version', 1) - 1)
+            elif op == 'delete_task':
+                task_ids.setdefault(record['id'], record.get('version', 0))
+            elif op == 'put_list':
+                list_ids.add(record['list']['id'])
+            elif op == 'delete_lists':
+                list_ids.update(record['ids'])
+        return task_ids, list_ids
 
-    def load_data(self):
-        self.task_lists.clear()
-        self.tasks.clear()
-        # Load Task Lists
-        task_lists_data = self._load_json(self.members_file)
-        for list_dict in task_lists_data:
-            # Ensure id and name exist, otherwise skip this malformed entry
-            if 'id' not in list_dict or 'name' not in list_dict:
-                print(f"Warning: Skipping malformed task list entry in {self.members_file}: {list_dict}")
+    def _apply_stored_changes(self, task_lists_data: List[dict], changed_tasks: List[dict], removed_ids: List[str],
+                              unsaved_task_ids: Dict[str, int], unsaved_list_ids: Set[str]) -> Tuple[List[ChangeEvent], bool]:
+        """Brings memory in line with a diff from load_diff. Returns the events for the views and
+        whether anything was skipped because we have unsaved changes to it."""
+        events = []
+        stored_lists = {list_dict['id']: list_dict for list_dict in task_lists_data}
+        missing_list_ids = [list_id for list_id in self.task_lists if list_id not in stored_lists]
+        deleted_list_ids = [list_id for list_id in missing_list_ids if list_id not in unsaved_list_ids]
+        skipped = len(deleted_list_ids) < len(missing_list_ids)
+        for list_id, list_dict in stored_lists.items():
+            task_list = TaskList.from_dict(list_dict)
+            if list_id in self.task_lists and self.task_lists[list_id].to_dict() == task_list.to_dict():
                 continue
-            task_list = TaskList(
-                id=list_dict['id'], 
-                name=list_dict['name']
-            )
-            # Backwards compatibility for old data
-            task_list.category = list_dict.get('category', 'default') # Already exists, good.
-            task_list.is_pinned = list_dict.get('is_pinned', False)
-            self.task_lists[task_list.id] = task_list
+            if list_id in unsaved_list_ids:
+                skipped = True
+                continue
+            kind = LIST_ADDED if list_id not in self.task_lists else LIST_UPDATED
+            self.task_lists[list_id] = task_list
+            self._index_list(task_list)
+            events.append(ChangeEvent(kind, task_list=task_list))
+        if deleted_list_ids:
+            self._unassign_tasks(deleted_list_ids) # As the other instance did when it deleted them
+            self._remove_task_lists(deleted_list_ids)
+            events.append(ChangeEvent(LISTS_DELETED, ids=tuple(sorted(deleted_list_ids))))
 
-        # Load Tasks
-        tasks_data = self._load_json(self.tasks_file)
-        for task_dict in tasks_data:
-            comments = [Comment.from_dict(c) for c in task_dict.get('comments', [])]
-            attachments = task_dict.get('attachments', [])
-            task = Task(
-                id=task_dict['id'],
-                description=task_dict['description'],
-                status=TaskStatus[task_dict.get('status', TaskStatus.PENDING.name).upper()],
-                comments=comments,
-                attachments=attachments,
-                priority=TaskPriority[task_dict.get('priority', TaskPriority.MEDIUM.name).upper()],
-                created_at=datetime.fromisoformat(task_dict.get('created_at', datetime.now().isoformat())),
-                assigned_to=task_dict.get('assigned_to')
-            ) # due_at will be None if not present in old data
-            task.start_at = datetime.fromisoformat(task_dict['start_at']) if task_dict.get('start_at') else None
-            task.due_at = datetime.fromisoformat(task_dict['due_at']) if task_dict.get('due_at') else None
-            task.is_pinned = task_dict.get('is_pinned', False)
+        task_class = LazyTask if self.lazy_load else Task
+        for task_dict in changed_tasks:
+            if task_dict['id'] in unsaved_task_ids:
+                skipped = True
+                continue
+            task = task_class.from_dict(task_header(task_dict))
+            task.store_comments_in(self.comment_threads)
+            kind = TASK_ADDED if task.id not in self.tasks else TASK_UPDATED
             self.tasks[task.id] = task
-        print("Data loaded.")
-        if not task_lists_data and not tasks_data:
-            print(f"Note: Both {self.members_file} and {self.tasks_file} were empty or not found. New files will be created on save if data is added.")
+            self._index_task(task)
+            events.append(ChangeEvent(kind, task=task))
+        for task_id in removed_ids:
+            if task_id in unsaved_task_ids:
+                skipped = skipped or unsaved_task_ids[task_id] != 0 # Else it is ours and not saved yet
+                continue
+            task = self.tasks.pop(task_id, None)
+            if task is None:
+                continue
+            self._unindex_task(task_id)
+            events.append(ChangeEvent(TASK_DELETED, task=task, ids=(task_id,)))
+        # Comments carry no versions; threads are read again when next shown
+        self.comment_threads.clear()
+        return events, skipped
 
-    def save_data(self):
-        # Save Task Lists
-        task_lists_list = [{
-            "id": m.id, 
-            "name": m.name, 
-            "category": getattr(m, 'category', 'default'),
-            "is_pinned": getattr(m, 'is_pinned', False)
-        } for m in self.task_lists.values()]
-        self._save_json(self.members_file, task_lists_list)
-
-        # Save Tasks
-        tasks_list = []
-        for task in self.tasks.values():
-            task_dict = {
-                "id": task.id,
-                "description": task.description,
-                "status": task.status.name, # Store enum name
-                "priority": task.priority.name, # Store enum name
-                "comments": [c.to_dict() for c in task.comments],
-                "attachments": task.attachments,
-                "created_at": task.created_at.isoformat(),
-                "start_at": task.start_at.isoformat() if task.start_at else None,
-                "due_at": task.due_at.isoformat() if task.due_at else None, # Save due_at
-                "assigned_to": task.assigned_to
-            }
-            task_dict['is_pinned'] = getattr(task, 'is_pinned', False)
-            tasks_list.append(task_dict)
-        self._save_json(self.tasks_file, tasks_list) # Ensure this uses self.tasks_file
+    def start_write_behind(self, quiet_period: Optional[float] = None, max_delay: Optional[float] = None):
+        """Moves all saving onto a background thread that coalesces bursts of edits."""
+        if self.saver:
+            return
+        self.saver = WriteBehindSaver(
+            self.flush,
+            quiet_period=self.WRITE_BEHIND_QUIET_PERIOD if quiet_period is None else quiet_period,
+            max_delay=self.WRITE_BEHIND_MAX_DELAY if max_delay is None else max_delay
+        )
+        self.saver.start()
+
+    def close(self):
+        """Stops the write-behind saver and persists everything still pending. Call this on exit."""
+        self.attachment_transfers.shutdown() # Unfinished copies were never referenced by a task
+        self.attachment_metadata.shutdown()
+        if self._maintenance:
+            self._maintenance.shutdown(wait=True, cancel_futures=True)
+            self._maintenance = None
+        if self.saver:
+            self.saver.stop()
+            self.saver = None
+        self.flush()
+        if self.storage.snapshot_on_close:
+            self.save_data()
+        self.storage.close()
+
+    def _record_change(self, record: dict):
+        """Queues a change record, then writes it now or leaves it to the write-behind saver."""
+        with self._lock:
+            if self._transaction_changes is not None:
+                self._transaction_changes.append(record) # Persisted when the transaction commits
+                return
+            self._pending_changes.append(record)
+        self._changes_pending()
+
+    def _changes_pending(self):
+        if self.saver:
+            self.saver.mark_dirty()
+        else:
+            self.flush()
+
+    @contextmanager
+    def transaction(self):
+        """Groups mutations so that they are persisted together when the outermost transaction ends.
+
+        If the block raises, the in-memory data is put back the way it was when the block
+        started and the exception propagates; a nested block only undoes its own changes.
+        Nothing is read or written to do so. A task or list edited in place and then passed
+        to update_task() or update_task_list() cannot be put back, since its earlier state
+        is gone; that edit is kept and saved. Pass them an edited copy instead when the block
+        may fail. Files removed along the way, such as a deleted task's attachments, are not
+        restored.
+        """
+        outermost = self._transaction_changes is None
+        if outermost:
+            with self._lock:
+                self._transaction_changes = []
+                self._transaction_undo = []
+        savepoint = (len(self._transaction_changes), len(self._transaction_undo))
+        try:
+            yield self
+        except BaseException:
+            self._rollback_transaction(savepoint)
+            if outermost:
+                self._commit_transaction() # Edits made in place, if any
+            raise
+        if outermost:
+            self._commit_transaction()
+
+    def _commit_transaction(self):
+        with self._lock:
+            records, self._transaction_changes = self._transaction_changes, None
+            self._transaction_undo = []
+            self._pending_changes.extend(records)
+        if records:
+            self._changes_pending()
+
+    def _push_undo(self, undo: Callable[[], Optional[dict]]):
+        """Remembers how to take back a change made inside a transaction. `undo` returns a
+        record to save anyway, for changes it cannot take back. Callers hold self._lock."""
+        if self._transaction_changes is not None:
+            self._transaction_undo.append(undo)
+
+    def _rollback_transaction(self, savepoint: Tuple[int, int]):
+        """Takes back the changes made since the savepoint, newest first, and drops their records."""
+        changes_savepoint, undo_savepoint = savepoint
+        with self._lock:
+            kept_records = []
+            for undo in reversed(self._transaction_undo[undo_savepoint:]):
+                record = undo()
+                if record is not None:
+                    kept_records.append(record)
+            del self._transaction_undo[undo_savepoint:]
+            del self._transaction_changes[changes_savepoint:]
+            # In-place edits of tasks and lists that are still there after the rollback
+            for record in reversed(kept_records):
+                if record['op'] == 'put_task' and record['task']['id'] in self.tasks or \
+                        record['op'] == 'put_list' and record['list']['id'] in self.task_lists:
+                    self._transaction_changes.append(record)
+        self.events.emit(ChangeEvent(RELOADED))
+
+    def _undo_task(self, task_id: str, before: Optional[Task]):
+        """Puts back the task held before a change, or removes it if there was none."""
+        if before is None:
+            self.tasks.pop(task_id, None)
+            self._unindex_task(task_id) # Also whatever indexing did before it failed
+        else:
+            self.tasks[task_id] = before
+            self._index_task(before)
+        self.comment_threads.discard(task_id) # It may hold comments from the dropped records
+
+    def _undo_list(self, list_id: str, before: Optional[TaskList]):
+        if before is None:
+            self._remove_task_lists([list_id])
+        else:
+            self.task_lists[list_id] = before
+            self._index_list(before)
+
+    def _apply_change(self, record: dict):
+        """Applies a journal record to the in-memory data. Records are safe to replay twice."""
+        op = record.get('op')
+        if op == 'put_list':
+            task_list = TaskList.from_dict(record['list'])
+            self.task_lists[task_list.id] = task_list
+            self._index_list(task_list)
+        elif op == 'delete_lists':
+            ids_to_delete = set(record['ids'])
+            self._unassign_tasks(ids_to_delete)
+            self._remove_task_lists(ids_to_delete)
+        elif op == 'put_task':
+            task = Task.from_dict(task_header(record['task']))
+            task.store_comments_in(self.comment_threads)
+            self.tasks[task.id] = task
+            self._index_task(task)
+            if 'comments' in record['task']:
+                self.comment_threads.discard(task.id)
+        elif op == 'delete_task':
+            self.tasks.pop(record['id'], None)
+            self._unindex_task(record['id'])
+            self.comment_threads.discard(record['id'])
+        elif op == 'add_comment':
+            thread = self.comment_threads.peek(record['task_id'])
+            comment = Comment.from_dict(record['comment'])
+            # Threads that are not cached pick the comment up when they are next read
+            if thread is not None and comment not in thread:
+                thread.append(comment)
+                self.comment_threads.mark_saved(record['task_id'])
+        elif op == 'put_comments':
+            self.comment_threads.discard(record['task_id'])
+        else:
+            print(f"Warning: Ignoring unknown journal record: {record}")
 
     # --- TaskList Operations ---
     def add_task_list(self, name: str, category: str = 'default') -> Optional[TaskList]:
-        if any(task_list.name.lower() == name.lower() for task_list in self.task_lists.values()):
+        if self._lists_by_name.count(name.casefold()):
             print(f"Task List '{name}' already exists.")
             return None
         new_list = TaskList(name=name)
         new_list.category = category
-        self.task_lists[new_list.id] = new_list
-        self.save_data() # Ensure save is called
+        with self._lock:
+            self._push_undo(lambda: self._undo_list(new_list.id, None)) # First, in case indexing fails
+            self.task_lists[new_list.id] = new_list
+            self._index_list(new_list)
+        self._record_change({'op': 'put_list', 'list': new_list.to_dict()})
+        self.events.emit(ChangeEvent(LIST_ADDED, task_list=new_list))
         return new_list
 
     def get_task_list_by_id(self, list_id: str) -> Optional[TaskList]:
@@ -175,29 +749,52 @@ class DataManager:
     def get_all_task_lists(self) -> List[TaskList]:
         return list(self.task_lists.values())
 
+    def get_task_list_by_name(self, name: str) -> Optional[TaskList]:
+        """Looks a task list up by name, ignoring case."""
+        list_ids = self._lists_by_name.get(name.casefold())
+        return self.task_lists[list_ids[0]] if list_ids else None
+
+    def get_task_lists_by_category(self, category: str) -> List[TaskList]:
+        return [self.task_lists[list_id] for list_id in self._lists_by_category.get(category)]
+
     def update_task_list(self, task_list: TaskList):
         if task_list.id in self.task_lists:
-            self.task_lists[task_list.id] = task_list
-            self.save_data() # Ensure save is called
+            record = {'op': 'put_list', 'list': task_list.to_dict()}
+            with self._lock:
+                before = self.task_lists[task_list.id]
+                self._push_undo(lambda: record if before is task_list else self._undo_list(task_list.id, before))
+                self.task_lists[task_list.id] = task_list
+                self._index_list(task_list)
+            self._record_change(record)
+            self.events.emit(ChangeEvent(LIST_UPDATED, task_list=task_list))
         else:
             print(f"Error: Task List with ID '{task_list.id}' not found for update.")
 
     def update_task_list_name(self, list_id: str, new_name: str) -> bool:
         """Updates the name of a task list, ensuring the new name is unique."""
         # Check if another task list with the new name already exists.
-        if any(tl.name.lower() == new_name.lower() and tl.id != list_id for tl in self.task_lists.values()):
+        if any(an_id != list_id for an_id in self._lists_by_name.get(new_name.casefold())):
             print(f"Error: A task list with the name '{new_name}' already exists.")
             return False
         
         task_list = self.get_task_list_by_id(list_id)
         if task_list:
-            task_list.name = new_name
-            self.save_data() # Save the changes
+            with self._lock:
+                old_name = task_list.name
+                self._push_undo(lambda: self._rename_back(task_list, old_name))
+                task_list.name = new_name
+                self._index_list(task_list)
+            self._record_change({'op': 'put_list', 'list': task_list.to_dict()})
+            self.events.emit(ChangeEvent(LIST_UPDATED, task_list=task_list))
             return True
         
         print(f"Error: Task List with ID '{list_id}' not found for rename.")
         return False
 
+    def _rename_back(self, task_list: TaskList, name: str):
+        task_list.name = name
+        self._index_list(task_list)
+
     def delete_task_list(self, list_id: str) -> bool:
         if list_id in self.task_lists:
             list_to_delete = self.task_lists[list_id]
@@ -206,52 +803,70 @@ class DataManager:
             # If it's a project block, find its child lists to delete as well
             if getattr(list_to_delete, 'category', 'default') == 'project':
                 child_category = f"project_{list_id}"
-                child_list_ids = {
-                    tl.id for tl in self.task_lists.values() 
-                    if getattr(tl, 'category', 'default') == child_category
-                }
-                ids_to_delete.update(child_list_ids)
-
-            # Unassign tasks from all lists being deleted
-            for task in self.tasks.values():
-                if task.assigned_to in ids_to_delete:
-                    task.assigned_to = None
-            
-            # Delete the lists from the dictionary
-            for an_id in ids_to_delete:
-                if an_id in self.task_lists:
-                    del self.task_lists[an_id]
+                ids_to_delete.update(self._lists_by_category.get(child_category))
 
-            self.save_data()
+            with self._lock:
+                deleted_lists = [self.task_lists[an_id] for an_id in ids_to_delete]
+                unassigned = [] # Filled in as tasks are unassigned, so a failure part way is undone too
+                self._push_undo(lambda: self._undo_delete_lists(deleted_lists, unassigned))
+                # Unassign tasks from all lists being deleted
+                self._unassign_tasks(ids_to_delete, unassigned)
+                # Delete the lists from the dictionary
+                self._remove_task_lists(ids_to_delete)
+
+            self._record_change({'op': 'delete_lists', 'ids': sorted(ids_to_delete)})
+            self.events.emit(ChangeEvent(LISTS_DELETED, ids=tuple(sorted(ids_to_delete))))
             return True
         return False
 
+    def _undo_delete_lists(self, task_lists: List[TaskList], unassigned: List[Tuple[Task, str]]):
+        for task_list in task_lists:
+            self._undo_list(task_list.id, task_list)
+        for task, list_id in unassigned:
+            task.assigned_to = list_id
+            self._tasks_by_list.update(task.id, task)
+            self._task_spans.update(task.id, task)
+
     def delete_task(self, task_id: str) -> bool:
-        """Deletes a task and its associated attachments."""
-        if task_id in self.tasks:
-            task_to_delete = self.tasks[task_id]
-
-            # --- Clean up attachments directory ---
-            if task_to_delete.attachments:
-                task_attachment_dir = os.path.join(self.attachments_dir, task_id)
-                if os.path.isdir(task_attachment_dir):
-                    try:
-                        shutil.rmtree(task_attachment_dir)
-                        print(f"Deleted attachment directory: {task_attachment_dir}")
-                    except Exception as e:
-                        print(f"Error deleting attachment directory for task {task_id}: {e}")
-                        # Proceed with deleting the task record even if file deletion fails
-
-            del self.tasks[task_id]
-            self.save_data()
+        """Deletes a task and its associated attachments.
+
+        Attachments in the shared store only lose the task's reference; the files go once
+        no task refers to them (see collect_attachment_blobs).
+        """
+        task_to_delete = self.get_task_by_id(task_id)
+        if task_to_delete:
+            # --- Clean up attachments directory (attachments made before the shared store) ---
+            # Checked even without attachments: the folder can outlive the task's references to it.
+            # Whatever is left behind here is found by collect_orphan_attachments.
+            task_attachment_dir = os.path.join(self.attachments_dir, task_id)
+            if os.path.isdir(task_attachment_dir):
+                try:
+                    shutil.rmtree(task_attachment_dir)
+                    print(f"Deleted attachment directory: {task_attachment_dir}")
+                except Exception as e:
+                    print(f"Error deleting attachment directory for task {task_id}: {e}")
+                    # Proceed with deleting the task record even if file deletion fails
+
+            self._remove_task(task_to_delete)
             return True
         return False
 
+    def _remove_task(self, task: Task):
+        """Drops a task from memory and storage, leaving its attachments alone."""
+        with self._lock:
+            self._push_undo(lambda: self._undo_task(task.id, task))
+            del self.tasks[task.id]
+            self._unindex_task(task.id)
+            self.comment_threads.discard(task.id)
+        self._record_change({'op': 'delete_task', 'id': task.id, 'version': task.version})
+        self.events.emit(ChangeEvent(TASK_DELETED, task=task, ids=(task.id,)))
+
     # --- Task Operations ---
     def add_task(self, description: str, assigned_to_id: str,
                  priority: TaskPriority = TaskPriority.MEDIUM, status: TaskStatus = TaskStatus.PENDING,
                  start_at: Optional[datetime] = None, due_at: Optional[datetime] = None,
-                 comments: Optional[List[Comment]] = None, attachments: Optional[List[str]] = None) -> Optional[Task]:
+                 comments: Optional[List[Comment]] = None, attachments: Optional[List[str]] = None,
+                 alarm_lead_minutes: Optional[int] = None, is_pinned: bool = False) -> Optional[Task]:
         if assigned_to_id not in self.task_lists:
             print(f"Error: Task List with ID '{assigned_to_id}' not found.")
             return None
@@ -263,45 +878,418 @@ class DataManager:
             start_at=start_at,
             due_at=due_at,
             comments=comments or [],
-            attachments=attachments or []
+            attachments=attachments or [],
+            alarm_lead_minutes=alarm_lead_minutes,
+            is_pinned=is_pinned
         )
-        self.tasks[task.id] = task # Add to the dictionary
-        self.save_data() # Save immediately after adding a task
+        with self._lock:
+            self._push_undo(lambda: self._undo_task(task.id, None)) # First, in case indexing fails
+            self.tasks[task.id] = task # Add to the dictionary
+            self._index_task(task)
+        self._record_change(self._put_task_record(task, new=True))
+        self.events.emit(ChangeEvent(TASK_ADDED, task=task))
         return task
 
+    def _put_task_record(self, task: Task, new: bool = False) -> dict:
+        """A put_task record for the next version of the task. It carries the comment thread, which then
+        replaces the stored one, only if the thread changed; comments the task holds itself move to the cache."""
+        with self._lock:
+            task.version += 1
+            if not task.reads_comments_from(self.comment_threads):
+                thread = list(task.comments)
+                task.store_comments_in(self.comment_threads)
+                self.comment_threads.put(task.id, thread)
+                changed = bool(thread) or not new
+            else:
+                thread = self.comment_threads.peek(task.id)
+                changed = self.comment_threads.changed(task.id)
+                if changed:
+                    self.comment_threads.mark_saved(task.id)
+            task_dict = task.to_dict(include_comments=False)
+            if changed:
+                task_dict['comments'] = [comment.to_dict() for comment in thread]
+        return {'op': 'put_task', 'task': task_dict}
+
+    def import_tasks(self, file_path: str, file_format: Optional[str] = None, create_lists: bool = True,
+                     list_category: str = 'default') -> ImportReport:
+        """Imports tasks from a CSV or NDJSON file ('csv' or 'ndjson'; guessed from the extension if not given).
+
+        Rows are read one at a time. A row that fails validation is reported in the returned
+        ImportReport and skipped; the rest are saved together in one transaction, and views get
+        a single RELOADED event instead of one per task. Lists are matched by name (ignoring
+        case) and created in `list_category` if `create_lists` is set.
+        """
+        report = ImportReport()
+        with self.events.batch(), self.transaction():
+            for row_number, row in iter_rows(file_path, file_format):
+                try:
+                    fields = parse_task_row(row)
+                    list_id = self._resolve_import_list(fields.pop('list'), fields.pop('list_id'),
+                                                        create_lists, list_category, report)
+                except RowError as e:
+                    report.errors.append((row_number, str(e)))
+                    continue
+                self.add_task(assigned_to_id=list_id, **fields)
+                report.imported += 1
+        print(f"Imported {report.imported} tasks ({len(report.errors)} rows skipped).")
+        return report
+
+    def _resolve_import_list(self, list_name: str, list_id: str, create_lists: bool, list_category: str,
+                             report: ImportReport) -> str:
+        if list_id in self.task_lists:
+            return list_id
+        if not list_name: # A list name, when given, is the fallback for ids from another data folder
+            raise RowError(f"Unknown list id '{list_id}'" if list_id else "Missing list")
+        task_list = self.get_task_list_by_name(list_name)
+        if task_list is None:
+            if not create_lists:
+                raise RowError(f"Unknown list '{list_name}'")
+            task_list = self.add_task_list(list_name, category=list_category)
+            report.created_lists.append(list_name)
+        return task_list.id
+
+    # --- Archive ---
+    def archive_done_tasks(self, older_than_days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+        """Moves DONE tasks due (or created, without a due time) more than `older_than_days` ago
+        into the archive, comments included; their attachments stay where they are.
+
+        The age defaults to the 'archive_after_days' setting; a negative age or a setting of
+        None turns archiving off. Returns the number of tasks archived.
+        """
+        if older_than_days is None:
+            older_than_days = self.load_setting('archive_after_days', self.ARCHIVE_AFTER_DAYS)
+        if older_than_days is None or older_than_days < 0:
+            return 0
+        cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+        self._load_finished_tasks(older_than=cutoff) # Only the ones to archive, if they were left in storage
+        finished = [self.tasks[task_id] for task_id in self._tasks_by_status.get(TaskStatus.DONE)
+                    if (self.tasks[task_id].due_at or self.tasks[task_id].created_at) < cutoff]
+        if not finished:
+            return 0
+        task_dicts = []
+        for task in finished:
+            task_dict = task.to_dict(include_comments=False)
+            task_dict['comments'] = [comment.to_dict() for comment in self._peek_thread(task.id)]
+            task_dicts.append(task_dict)
+        with self._folder_lock: # Other instances append to the same segments
+            self.archive.reload()
+            archived = self.archive.append(task_dicts)
+        if not archived: # Keep the tasks if they could not be archived
+            return 0
+        with self.events.batch(), self.transaction():
+            for task in finished:
+                self._remove_task(task)
+        self.flush() # Don't leave archived tasks in the working set on disk
+        print(f"Archived {len(finished)} finished tasks.")
+        return len(finished)
+
+    def search_archive(self, text: Optional[str] = None, list_id: Optional[str] = None) -> Iterator[Tuple[str, Task]]:
+        """Yields (segment name, task) for archived tasks matching the filters, newest first.
+
+        Segments are decompressed one at a time as the caller iterates.
+        """
+        for segment, task_dict in self.archive.search(text, list_id):
+            yield segment.name, Task.from_dict(task_dict)
+
+    def read_archive_segment(self, segment_name: str) -> List[Task]:
+        segment = self.archive.get_segment(segment_name)
+        return [Task.from_dict(task_dict) for task_dict in self.archive.read_segment(segment)] if segment else []
+
+    def restore_archived_task(self, task_id: str, segment_name: Optional[str] = None) -> Optional[Task]:
+        """Moves a task back from the archive into its list (unassigned if the list is gone)."""
+        self.archive.reload()
+        found = self.archive.find(task_id, segment_name)
+        if found is None:
+            print(f"Error: Task with ID '{task_id}' not found in the archive.")
+            return None
+        segment, task_dict = found
+        task = self.tasks.get(task_id)
+        if task is None: # Else it was archived but its removal never got saved
+            task = Task.from_dict(task_dict)
+            task.version = 0 # Stored anew
+            if task.assigned_to not in self.task_lists:
+                task.assigned_to = None
+            with self._lock:
+                self._push_undo(lambda: self._undo_task(task.id, None))
+                self.tasks[task.id] = task
+                self._index_task(task)
+            self._record_change(self._put_task_record(task, new=True))
+            self.events.emit(ChangeEvent(TASK_ADDED, task=task))
+        with self._folder_lock:
+            self.archive.reload()
+            self.archive.remove(segment.name, task_id)
+        return task
+
+    # --- Attachments ---
+    ATTACHMENT_GRACE_SECONDS = 3600
+
+    def attachment_ref_count(self, ref: str) -> int:
+        """How many tasks refer to the stored blob behind an attachment reference."""
+        digest = blob_digest(ref)
+        return self._blob_refs.count(digest) if digest else 0
+
+    def collect_attachment_blobs(self, grace_seconds: Optional[float] = None, now: Optional[float] = None) -> Tuple[int, int]:
+        """Removes stored attachment blobs no task refers to any more. Returns (blobs removed, bytes freed).
+
+        Archived tasks keep their blobs. Blobs stored or re-attached within the last
+        `grace_seconds` are kept too, since another instance may hold an unsaved reference.
+        The blobs and the archive are read without the locks, so saves only wait for the
+        removal. Nothing is removed if another instance saved since our data was last
+        synced, or the archive changed during the scan; the next run catches up.
+        """
+        if grace_seconds is None:
+            grace_seconds = self.ATTACHMENT_GRACE_SECONDS
+        cutoff = (now if now is not None else datetime.now().timestamp()) - grace_seconds
+        old_blobs = {digest: stat.st_size for digest, _, stat in self.attachment_store.iter_blobs() if stat.st_mtime < cutoff}
+        with self._lock:
+            unreferenced = {digest: size for digest, size in old_blobs.items() if not self._blob_refs.count(digest)}
+        if not unreferenced:
+            return 0, 0
+        # A reader of our own, since this may run on another thread than the views reading self.archive
+        archive = TaskArchive(self.archive_dir)
+        for _, task_dict in archive.search():
+            for ref in task_dict.get('attachments') or ():
+                unreferenced.pop(blob_digest(ref), None)
+        for ref in self._stored_finished_refs():
+            unreferenced.pop(blob_digest(ref), None)
+
+        with self._io_lock, self._folder_lock:
+            # Tasks archived since the search was read were taken out of memory after it
+            if not self._in_sync() or TaskArchive(self.archive_dir).segments() != archive.segments():
+                return 0, 0
+            with self._lock: # Skip blobs attached again since the scan
+                orphans = [(os.path.join(BLOBS, digest[:2], digest), size) for digest, size in sorted(unreferenced.items())
+                           if not self._blob_refs.count(digest)]
+            report = remove_orphans(self.attachments_dir, OrphanReport(orphans=orphans, cutoff=cutoff))
+        failed = {rel_path for rel_path, _ in report.errors}
+        freed = sum(size for rel_path, size in report.orphans if rel_path not in failed)
+        if report.removed:
+            print(f"Removed {report.removed} unused attachment files ({format_size(freed)}).")
+        return report.removed, freed
+
+    def _stored_finished_refs(self) -> List[str]:
+        """The attachment references of the stored finished tasks, which may not have been read in.
+        Tasks read in and changed since count twice, which only keeps a blob longer."""
+        return self.storage.load_attachment_refs(TaskStatus.DONE.name) if self._partially_loaded else []
+
+    def start_attachment_collection(self) -> Future:
+        """Runs collect_attachment_blobs on a background thread, e.g. once the main window is up.
+
+        The future's result is what collect_attachment_blobs returned.
+        """
+        with self._lock:
+            if self._maintenance is None: # Started on first use
+                self._maintenance = ThreadPoolExecutor(1, thread_name_prefix="Maintenance")
+            return self._maintenance.submit(self.collect_attachment_blobs)
+
+    def collect_orphan_attachments(self, remove: bool = False, quarantine: bool = True,
+                                   grace_seconds: Optional[float] = None, now: Optional[float] = None) -> OrphanReport:
+        """Finds files in the attachments folder that no task, archived ones included, refers to.
+
+        Covers task folders left behind by failed or skipped clean-ups and tasks removed by
+        other instances or by hand, as well as unused blobs and abandoned partial copies.
+        With `remove`, the files are moved to a time-stamped folder under
+        attachments_quarantine (or deleted, without `quarantine`). The folder is scanned
+        in parallel; files changed within `grace_seconds` are left alone.
+        """
+        if grace_seconds is None:
+            grace_seconds = self.ATTACHMENT_GRACE_SECONDS
+        self.reload_changes() # Count the references other instances saved
+        with self._io_lock, self._folder_lock:
+            if not self._in_sync(): # Someone is writing right now; try again next time
+                print("Info: Another instance is saving; attachment clean-up skipped.")
+                return OrphanReport()
+            with self._lock:
+                refs = [ref for task in self.tasks.values() for ref in task.attachment_refs()]
+            self.archive.reload()
+            refs.extend(ref for _, task_dict in self.archive.search() for ref in task_dict.get('attachments') or ())
+            refs.extend(self._stored_finished_refs())
+        digests, legacy_paths = referenced_paths(refs)
+        # The scan needs no lock: references made from now on point at files younger than the grace period
+        report = find_orphans(self.attachments_dir, digests, legacy_paths, grace_seconds, now)
+        if remove and report.orphans:
+            quarantine_dir = os.path.join(self.quarantine_dir, datetime.now().strftime("%Y%m%d-%H%M%S")) if quarantine else None
+            remove_orphans(self.attachments_dir, report, quarantine_dir)
+            print(f"Removed {report.removed} unused attachment files ({report.reclaimable_bytes} bytes).")
+        return report
+
+    def iter_tasks(self, list_id: Optional[str] = None, workspace_id: Optional[str] = None,
+                   statuses: Optional[Iterable[TaskStatus]] = None, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> Iterator[Task]:
+        """Yields the tasks matching every given filter, picking candidates from the indexes.
+
+        `workspace_id` selects the lists of that workspace (category 'project_<id>'). A date
+        range keeps tasks whose start..due span overlaps it; either end may be left open.
+        """
+        if list_id is not None:
+            list_ids = {list_id}
+        elif workspace_id is not None:
+            list_ids = set(self._lists_by_category.get(f"project_{workspace_id}"))
+        else:
+            list_ids = None
+        status_set = set(statuses) if statuses is not None else None
+        if status_set is None or TaskStatus.DONE in status_set:
+            for an_id in list_ids if list_ids is not None else [None]:
+                self._load_finished_tasks(assigned_to=an_id, start_date=start_date, end_date=end_date)
+
+        if start_date is not None or end_date is not None:
+            low = start_date.toordinal() if start_date else 1
+            high = end_date.toordinal() if end_date else date.max.toordinal()
+            if list_ids is not None:
+                candidate_ids = [task_id for an_id in list_ids for task_id in self._task_spans.overlapping(low, high, an_id)]
+            else:
+                candidate_ids = self._task_spans.overlapping(low, high)
+        elif list_ids is not None:
+            candidate_ids = [task_id for an_id in list_ids for task_id in self._tasks_by_list.get(an_id)]
+        elif status_set is not None:
+            candidate_ids = [task_id for status in status_set for task_id in self._tasks_by_status.get(status)]
+        else:
+            candidate_ids = list(self.tasks)
+
+        for task_id in candidate_ids:
+            task = self.tasks.get(task_id)
+            if task is not None and (status_set is None or task.status in status_set):
+                yield task
+
+    def export_tasks(self, file_path: str, file_format: Optional[str] = None, comments: str = COMMENTS_NESTED,
+                     **filters) -> int:
+        """Streams the tasks selected by `filters` (see iter_tasks) to a CSV or NDJSON file.
+
+        `comments` is 'nested' (a list per task) or 'flat' (one record per comment).
+        Returns the number of records written.
+        """
+        file_format = file_format or detect_format(file_path)
+
+        def list_name(list_id):
+            task_list = self.task_lists.get(list_id)
+            return task_list.name if task_list else None
+
+        records = iter_export_records(self.iter_tasks(**filters), list_name, comments,
+                                      thread=lambda task: self._peek_thread(task.id))
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            if file_format == 'csv':
+                count = write_csv(records, f, comments)
+            else:
+                count = write_ndjson(records, f)
+        os.replace(tmp_path, file_path)
+        print(f"Exported {count} records to {file_path}")
+        return count
+
     def get_task_by_id(self, task_id: str) -> Optional[Task]:
-        return self.tasks.get(task_id)
+        task = self.tasks.get(task_id)
+        if task is None and self._partially_loaded: # Perhaps a finished task not read in yet
+            self._load_stored_tasks(lambda: [task_id])
+            task = self.tasks.get(task_id)
+        return task
 
     def get_tasks_for_task_list(self, list_id: str) -> List[Task]:
-        return [task for task in self.tasks.values() if task.assigned_to == list_id]
+        self._load_finished_tasks(assigned_to=list_id)
+        return [self.tasks[task_id] for task_id in self._tasks_by_list.get(list_id)]
+
+    def get_tasks_by_status(self, *statuses: TaskStatus) -> List[Task]:
+        """Returns the tasks with any of the given statuses. Asking for DONE reads in every finished task."""
+        if TaskStatus.DONE in statuses:
+            self._load_finished_tasks()
+        return [self.tasks[task_id] for status in statuses for task_id in self._tasks_by_status.get(status)]
+
+    @staticmethod
+    def is_task_on_date(task: Task, target_date: date) -> bool:
+        """Whether a task shows up on the given calendar day (the rule the date queries use)."""
+        span = _task_day_span(task)
+        return span is not None and span[0] <= target_date.toordinal() <= span[1]
 
     def get_tasks_for_task_list_on_date(self, list_id: str, target_date: date) -> List[Task]:
-        member_tasks = []
-        for task in self.tasks.values():
-            if task.assigned_to != list_id:
-                continue
-            
-            start_at = getattr(task, 'start_at', None)
-            due_at = task.due_at
-            if start_at and due_at:
-                if start_at.date() <= target_date <= due_at.date():
-                    member_tasks.append(task)
-            elif due_at and due_at.date() == target_date:
-                member_tasks.append(task)
-        return sorted(member_tasks, key=lambda t: t.created_at) # Sort by creation time
+        return self.get_tasks_in_range(target_date, target_date, list_id)
+
+    def get_tasks_for_week(self, day: date, list_id: Optional[str] = None) -> List[Task]:
+        """Returns tasks active on any day of the Monday-to-Sunday week containing `day`."""
+        monday = day - timedelta(days=day.weekday())
+        return self.get_tasks_in_range(monday, monday + timedelta(days=6), list_id)
+
+    def get_tasks_in_range(self, start_date: date, end_date: date, list_id: Optional[str] = None) -> List[Task]:
+        """Returns tasks whose start..due span overlaps [start_date, end_date], in one list or (list_id=None) in all.
+
+        A task with only a due time is active on its due day; a task without one is never listed.
+        """
+        self._load_finished_tasks(assigned_to=list_id, start_date=start_date, end_date=end_date)
+        key = IntervalIndex.ALL if list_id is None else list_id
+        task_ids = self._task_spans.overlapping(start_date.toordinal(), end_date.toordinal(), key)
+        return sorted((self.tasks[task_id] for task_id in task_ids), key=lambda t: t.created_at) # Sort by creation time
 
     def update_task(self, task: Task): # Takes a Task object
         if task and task.id in self.tasks:
-            self.tasks[task.id] = task # Replace the whole task object
-            self.save_data() # Ensure save is called
+            with self._lock:
+                before = self.tasks[task.id]
+                if before is not task:
+                    self._push_undo(lambda: self._undo_task(task.id, before))
+                self.tasks[task.id] = task # Replace the whole task object
+                # Refile under the current list and status, which may have been edited in place
+                self._index_task(task)
+                record = self._put_task_record(task)
+                if before is task: # Its earlier state is gone; see transaction()
+                    self._push_undo(lambda: record)
+            self._record_change(record)
+            self.events.emit(ChangeEvent(TASK_UPDATED, task=task))
         else:
             print(f"Error: Task with ID '{task.id}' not found for update.")
 
+    def take_due_alarms(self, now: Optional[datetime] = None) -> List[Task]:
+        """Returns the tasks whose alarm should go off now and remembers that it went off."""
+        with self._lock:
+            task_ids = self.alarms.pop_due(now or datetime.now())
+        if not task_ids:
+            return []
+        self.save_setting('fired_alarms', dict(self.alarms.fired))
+        return [self.tasks[task_id] for task_id in task_ids]
+
     def add_comment_to_task(self, task_id: str, comment_text: str, author_name: str) -> bool:
+        """Appends a comment to the task's thread without reading the thread if it is not cached."""
         task = self.get_task_by_id(task_id)
         if task:
             comment = Comment(text=comment_text, author=author_name)
-            task.comments.append(comment)
-            self.save_data() # Ensure save is called
+            with self._lock:
+                self._push_undo(lambda: self._undo_comment(task_id, comment))
+                thread = self.comment_threads.peek(task_id)
+                if thread is not None:
+                    thread.append(comment)
+                    self.comment_threads.mark_saved(task_id)
+            self._record_change({'op': 'add_comment', 'task_id': task_id, 'comment': comment.to_dict()})
+            self.events.emit(ChangeEvent(COMMENT_ADDED, task=task, comment=comment))
             return True
         return False
+
+    def _undo_comment(self, task_id: str, comment: Comment):
+        thread = self.comment_threads.peek(task_id)
+        if thread is not None and comment in thread:
+            thread.remove(comment)
+
+    def update_comment(self, task_id: str, comment: Comment, text: str) -> bool:
+        """Changes the text of one of a task's comments and saves its thread, cached or not.
+        `comment` may be a copy, e.g. one read before its thread was evicted."""
+        return self._replace_comment(task_id, comment, Comment(text=text, author=comment.author,
+                                                               timestamp=comment.timestamp))
+
+    def delete_comment(self, task_id: str, comment: Comment) -> bool:
+        return self._replace_comment(task_id, comment, None)
+
+    def _replace_comment(self, task_id: str, comment: Comment, replacement: Optional[Comment]) -> bool:
+        task = self.get_task_by_id(task_id)
+        if not task:
+            print(f"Error: Task with ID '{task_id}' not found for comment edit.")
+            return False
+        thread = self.comment_threads.thread(task_id) # Reads it first if it is not cached
+        with self._lock:
+            if comment not in thread:
+                print(f"Error: Comment not found on task '{task_id}'.")
+                return False
+            # Whatever the cache holds after a rollback, the next read rebuilds it from the records
+            self._push_undo(lambda: self.comment_threads.discard(task_id))
+            index = thread.index(comment)
+            thread[index:index + 1] = [replacement] if replacement is not None else []
+            self.comment_threads.put(task_id, thread) # Cached again and marked as saved
+            record = {'op': 'put_comments', 'task_id': task_id,
+                      'comments': [thread_comment.to_dict() for thread_comment in thread]}
+        self._record_change(record)
+        self.events.emit(ChangeEvent(TASK_UPDATED, task=task))
+        return True
@@ -1,8 +1,35 @@
+import sys
 import uuid
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Sequence, Union
+
+_EMPTY = () # Shared stand-in for every empty comment or attachment list
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """Accepts ISO strings (JSON storage) as well as datetime objects (binary snapshot)."""
+    if not value:
+        return None
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def _pack_datetime(value: datetime) -> Union[int, datetime]:
+    """Packs a naive datetime into microseconds since 1970 (an int is about half the size).
+
+    Aware datetimes are kept as they are, since the packed form has no room for a timezone.
+    """
+    if value.tzinfo is not None:
+        return value
+    return (value - _EPOCH) // _MICROSECOND
+
+def _unpack_datetime(value: Union[int, datetime]) -> datetime:
+    return value if isinstance(value, datetime) else _EPOCH + timedelta(microseconds=value)
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    # Authors and list ids repeat across many objects; interning keeps one copy of each
+    return sys.intern(value) if isinstance(value, str) else value
 
 class TaskStatus(Enum):
     PENDING = "Pending"
@@ -15,11 +42,31 @@ class TaskPriority(Enum):
     MEDIUM = "Medium"
     HIGH = "High"
 
-@dataclass
 class Comment:
-    text: str
-    author: str # Could be member_id or name
-    timestamp: datetime = field(default_factory=datetime.now)
+    __slots__ = ('text', 'author', '_timestamp')
+
+    def __init__(self, text: str, author: str, timestamp: Optional[datetime] = None):
+        self.text = text
+        self.author = _intern(author) # Could be member_id or name
+        self.timestamp = timestamp or datetime.now()
+
+    @property
+    def timestamp(self) -> datetime:
+        return _unpack_datetime(self._timestamp)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime):
+        self._timestamp = _pack_datetime(value)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.text, self.author, self._timestamp) == (other.text, other.author, other._timestamp)
+
+    __hash__ = None # Mutable, like the dataclass it replaced
+
+    def __repr__(self):
+        return f"Comment(text={self.text!r}, author={self.author!r}, timestamp={self.timestamp!r})"
 
     def to_dict(self):
         return {"text": self.text, "author": self.author, "timestamp": self.timestamp.isoformat()}
@@ -28,23 +75,221 @@ class Comment:
     def from_dict(cls, data):
         return cls(text=data["text"], author=data["author"], timestamp=datetime.fromisoformat(data["timestamp"]))
 
-@dataclass
+class CommentSource:
+    """Where a stored task's comments live. Such a task reads its thread from here on demand."""
+
+    def thread(self, task_id: str) -> List[Comment]:
+        raise NotImplementedError
+
 class Task:
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    description: str = ""
-    status: TaskStatus = TaskStatus.PENDING
-    comments: List[Comment] = field(default_factory=list)
-    attachments: List[str] = field(default_factory=list)
-    priority: TaskPriority = TaskPriority.MEDIUM
-    created_at: datetime = field(default_factory=datetime.now)
-    start_at: Optional[datetime] = None
-    due_at: Optional[datetime] = field(default=None) # New field for due time
-    assigned_to: Optional[str] = None # TaskList ID
-    is_pinned: bool = False
+    """A task. Slotted, with its memory kept small since there may be hundreds of thousands.
+
+    Tasks without comments or attachments share one empty tuple, which is swapped for a
+    list of their own the first time `comments` or `attachments` is read, so the
+    attributes can still be appended to. created_at is kept packed (see _pack_datetime).
+    Tasks held by DataManager keep no comments of their own; `comments` returns the
+    thread from the CommentSource they were handed to (see store_comments_in).
+    `version` counts the saved edits of the task; DataManager uses it to notice edits made
+    by another instance sharing the data folder.
+    """
+    __slots__ = ('id', 'description', 'status', '_comments', '_attachments', 'priority', '_created_at',
+                 'start_at', 'due_at', 'assigned_to', 'is_pinned', 'alarm_lead_minutes', 'version')
+
+    def __init__(self, id: Optional[str] = None, description: str = "", status: TaskStatus = TaskStatus.PENDING,
+                 comments: Optional[List[Comment]] = None, attachments: Optional[List[str]] = None,
+                 priority: TaskPriority = TaskPriority.MEDIUM, created_at: Optional[datetime] = None,
+                 start_at: Optional[datetime] = None, due_at: Optional[datetime] = None,
+                 assigned_to: Optional[str] = None, is_pinned: bool = False,
+                 alarm_lead_minutes: Optional[int] = None, version: int = 0):
+        self.id = id or str(uuid.uuid4())
+        self.description = description
+        self.status = status
+        self.comments = comments
+        self.attachments = attachments
+        self.priority = priority
+        self.created_at = created_at or datetime.now()
+        self.start_at = start_at
+        self.due_at = due_at # New field for due time
+        self.assigned_to = _intern(assigned_to) # TaskList ID
+        self.is_pinned = is_pinned
+        self.alarm_lead_minutes = alarm_lead_minutes # How long before due_at to remind; None uses the app default
+        self.version = version # Bumped on every save; 0 until first saved
+
+    @property
+    def comments(self) -> List[Comment]:
+        if self._comments is _EMPTY:
+            self._comments = []
+        elif isinstance(self._comments, CommentSource):
+            return self._comments.thread(self.id)
+        return self._comments
+
+    @comments.setter
+    def comments(self, value: Optional[List[Comment]]):
+        self._comments = value or _EMPTY
+
+    def store_comments_in(self, source: CommentSource):
+        """Drops the comments held by the task; `comments` reads them from `source` from now on."""
+        self._comments = source
+
+    def reads_comments_from(self, source: CommentSource) -> bool:
+        return self._comments is source
+
+    @property
+    def attachments(self) -> List[str]:
+        if self._attachments is _EMPTY:
+            self._attachments = []
+        return self._attachments
+
+    @attachments.setter
+    def attachments(self, value: Optional[List[str]]):
+        self._attachments = value or _EMPTY
+
+    def attachment_refs(self) -> Sequence[str]:
+        """The attachments, read-only, without giving the task a list of its own."""
+        return self._attachments
+
+    @property
+    def created_at(self) -> datetime:
+        return _unpack_datetime(self._created_at)
 
-@dataclass
+    @created_at.setter
+    def created_at(self, value: datetime):
+        self._created_at = _pack_datetime(value)
+
+    def _fields(self) -> tuple:
+        return (self.id, self.description, self.status, self.comments, self.attachments,
+                self.priority, self.created_at, self.start_at, self.due_at, self.assigned_to, self.is_pinned,
+                self.alarm_lead_minutes)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None # Mutable, like the dataclass it replaced
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}(id={self.id!r}, description={self.description!r}, "
+                f"status={self.status}, assigned_to={self.assigned_to!r}, due_at={self.due_at!r})")
+
+    def to_dict(self, include_comments: bool = True):
+        """The task as a dict. Without comments it is a header, as storage keeps it; see CommentSource."""
+        task_dict = {
+            "id": self.id,
+            "description": self.description,
+            "status": self.status.name, # Store enum name
+            "priority": self.priority.name, # Store enum name
+            "attachments": list(self._attachments),
+            "created_at": self._created_at_isoformat(),
+            "start_at": self.start_at.isoformat() if self.start_at else None,
+            "due_at": self.due_at.isoformat() if self.due_at else None,
+            "assigned_to": self.assigned_to,
+            "is_pinned": self.is_pinned,
+            "alarm_lead_minutes": self.alarm_lead_minutes,
+            "version": self.version
+        }
+        if include_comments:
+            task_dict["comments"] = self._comments_to_dicts()
+        return task_dict
+
+    @classmethod
+    def from_dict(cls, data):
+        # Missing keys fall back to defaults so that older data files still load.
+        return cls(
+            id=data['id'],
+            description=data['description'],
+            status=TaskStatus[data.get('status', TaskStatus.PENDING.name).upper()],
+            comments=[Comment.from_dict(c) for c in data.get('comments', ())],
+            attachments=list(data.get('attachments', ())),
+            priority=TaskPriority[data.get('priority', TaskPriority.MEDIUM.name).upper()],
+            created_at=_parse_datetime(data.get('created_at')) or datetime.now(),
+            start_at=_parse_datetime(data.get('start_at')),
+            due_at=_parse_datetime(data.get('due_at')),
+            assigned_to=data.get('assigned_to'),
+            is_pinned=data.get('is_pinned', False),
+            alarm_lead_minutes=data.get('alarm_lead_minutes'),
+            version=data.get('version', 0)
+        )
+
+    def _comments_to_dicts(self):
+        comments = self._comments
+        if isinstance(comments, CommentSource):
+            comments = comments.thread(self.id)
+        return [c.to_dict() for c in comments]
+
+    def _created_at_isoformat(self):
+        return self.created_at.isoformat()
+
+class LazyTask(Task):
+    """A Task loaded from storage whose created_at is decoded on first access.
+
+    Loading then only pays for the fields the calendar and list views need up front.
+    An undecoded created_at is saved back in its stored form, so saving never decodes it.
+    Comments are not kept here: DataManager moves them to the comment store before a
+    task is built, and a stored task reads its thread from there.
+    """
+    __slots__ = ('_raw_created_at',) # Set by Task.__init__ through the setter below
+
+    @property
+    def created_at(self) -> datetime:
+        if self._raw_created_at is not None:
+            self._created_at = _pack_datetime(datetime.fromisoformat(self._raw_created_at))
+            self._raw_created_at = None
+        return super().created_at
+
+    @created_at.setter
+    def created_at(self, value: datetime):
+        Task.created_at.fset(self, value)
+        self._raw_created_at = None
+
+    @classmethod
+    def from_dict(cls, data):
+        task = cls(
+            id=data['id'],
+            description=data['description'],
+            status=TaskStatus[data.get('status', TaskStatus.PENDING.name).upper()],
+            comments=[Comment.from_dict(c) for c in data.get('comments', ())],
+            attachments=list(data.get('attachments', ())),
+            priority=TaskPriority[data.get('priority', TaskPriority.MEDIUM.name).upper()],
+            start_at=_parse_datetime(data.get('start_at')),
+            due_at=_parse_datetime(data.get('due_at')),
+            assigned_to=data.get('assigned_to'),
+            is_pinned=data.get('is_pinned', False),
+            alarm_lead_minutes=data.get('alarm_lead_minutes'),
+            version=data.get('version', 0)
+        )
+        # Keep the stored form until someone reads it
+        if isinstance(data.get('created_at'), str):
+            task._raw_created_at = data['created_at']
+        elif data.get('created_at'):
+            task.created_at = data['created_at']
+        return task
+
+    def _created_at_isoformat(self):
+        if self._raw_created_at is not None:
+            return self._raw_created_at
+        return super()._created_at_isoformat()
+
+@dataclass(slots=True)
 class TaskList:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     name: str = ""
     category: str = 'default'
-    is_pinned: bool = False
\ No newline at end of file
+    is_pinned: bool = False
+
+    def __post_init__(self):
+        # Tasks refer to lists by id and lists to workspaces by category; share one copy of each
+        self.id = _intern(self.id)
+        self.category = _intern(self.category)
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "category": self.category, "is_pinned": self.is_pinned}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data['id'],
+            name=data['name'],
+            category=data.get('category', 'default'),
+            is_pinned=data.get('is_pinned', False)
+        )
@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from .data_models import Comment, Task, TaskList
+
+# Event kinds emitted by DataManager after it changed the in-memory data
+TASK_ADDED = 'task_added'
+TASK_UPDATED = 'task_updated'
+TASK_DELETED = 'task_deleted'
+COMMENT_ADDED = 'comment_added'
+LIST_ADDED = 'list_added'
+LIST_UPDATED = 'list_updated' # Renamed, pinned or otherwise edited
+LISTS_DELETED = 'lists_deleted' # Their tasks were unassigned
+RELOADED = 'reloaded' # Everything may have changed; views should rebuild
+
+
+@dataclass
+class ChangeEvent:
+    kind: str
+    task: Optional[Task] = None
+    task_list: Optional[TaskList] = None
+    comment: Optional[Comment] = None
+    ids: Tuple[str, ...] = () # Deleted task or list ids
+
+
+class EventBus:
+    """Delivers change events to subscribed callbacks, in subscription order, on the emitting thread."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[ChangeEvent], None]] = []
+        self._batch_depth = 0
+        self._batched = False # Whether an event was held back by the open batch
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None]):
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[ChangeEvent], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    @contextmanager
+    def batch(self):
+        """Holds back events for a bulk change and emits a single RELOADED at the end instead."""
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batched:
+                self._batched = False
+                self.emit(ChangeEvent(RELOADED))
+
+    def emit(self, event: ChangeEvent):
+        if self._batch_depth:
+            self._batched = True
+            return
+        for callback in list(self._subscribers): # Callbacks may unsubscribe themselves
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error: Change event handler {callback} failed for '{event.kind}': {e}")
@@ -5,9 +5,11 @@ from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QColor, QFont
 from ..data_manager import DataManager
 from ..data_models import TaskList, Task, TaskStatus, TaskPriority, Comment # AddTaskDialog is removed
+from ..events import ChangeEvent, TASK_ADDED, TASK_UPDATED, TASK_DELETED, COMMENT_ADDED, LIST_UPDATED, \
+    LISTS_DELETED, RELOADED
 from .dialogs import TaskEditDialog
 from datetime import date as py_date, datetime
-from typing import Optional
+from typing import Dict, Optional
 import re
 import html
 
@@ -24,6 +26,8 @@ class DailyTodoWidget(QWidget):
         self.current_task_list: Optional[TaskList] = None
         self.current_task_lists: Optional[list[TaskList]] = None # For combined view
         self.current_date: QDate = QDate.currentDate()
+        self._task_items: Dict[str, QTreeWidgetItem] = {} # Rows of the tasks shown, by task id
+        self._empty_item: Optional[QTreeWidgetItem] = None
 
         self.layout = QVBoxLayout(self)
 
@@ -57,6 +61,7 @@ class DailyTodoWidget(QWidget):
         self.show_placeholder_message("Select a workspace from the 'Team' menu to begin.")
 
         self.setLayout(self.layout)
+        self.data_manager.events.subscribe(self.on_data_changed)
 
     def on_date_changed(self, date: QDate):
         self.current_date = date
@@ -82,57 +87,120 @@ class DailyTodoWidget(QWidget):
         self.current_task_list = None
         self.title_label.setText(text)
         self.tasks_list_widget.clear()
+        self._task_items = {}
+        self._empty_item = None
         self.calendar.setVisible(False)
         self.add_task_button.setVisible(False)
 
     def load_tasks(self):
         self.tasks_list_widget.clear()
+        self._task_items = {}
+        self._empty_item = None
         py_target_date = self.current_date.toPyDate()
         tasks_for_day = []
 
         if self.current_task_list:
-            all_tasks = self.data_manager.get_tasks_for_task_list(self.current_task_list.id)
-            tasks_for_day = [task for task in all_tasks if self._is_task_for_date(task, py_target_date)]
+            tasks_for_day = self.data_manager.get_tasks_for_task_list_on_date(self.current_task_list.id, py_target_date)
         else:
             return
 
         if not tasks_for_day:
-            empty_item = QTreeWidgetItem(self.tasks_list_widget)
-            empty_item.setText(0, "No tasks for this day.")
-            empty_item.setDisabled(True)
+            self._show_empty_message()
             return
 
-        # Sort by pinned status first, then priority, then due date
-        tasks_for_day.sort(key=lambda t: (not getattr(t, 'is_pinned', False), t.priority.value, t.due_at or datetime.max))
-
+        tasks_for_day.sort(key=self._sort_key)
         for task in tasks_for_day:
-            # Create the top-level item for the task
-            task_item = self._create_task_tree_item(task)
-            self.tasks_list_widget.addTopLevelItem(task_item)
-
-            # Create child items for each comment
-            if task.comments:
-                for comment in task.comments:
-                    # Create a basic tree item to hold the data and widget
-                    comment_item = QTreeWidgetItem()
-                    comment_item.setData(0, Qt.ItemDataRole.UserRole, comment)
-                    task_item.addChild(comment_item)
-
-                    # Create and set the custom widget for the comment
-                    comment_widget = self._create_comment_widget(comment)
-                    self.tasks_list_widget.setItemWidget(comment_item, 0, comment_widget)
-                # Expand the task item to show comments by default
-                task_item.setExpanded(True)
+            self._insert_task_row(self.tasks_list_widget.topLevelItemCount(), task)
 
-    def _is_task_for_date(self, task: Task, target_date: py_date) -> bool:
-        start_date = task.start_at.date() if task.start_at else None
-        due_date = task.due_at.date() if task.due_at else None
+    @staticmethod
+    def _sort_key(task: Task):
+        # Sort by pinned status first, then priority, then due date
+        return (not getattr(task, 'is_pinned', False), task.priority.value, task.due_at or datetime.max)
+
+    def _show_empty_message(self):
+        self._empty_item = QTreeWidgetItem(self.tasks_list_widget)
+        self._empty_item.setText(0, "No tasks for this day.")
+        self._empty_item.setDisabled(True)
+
+    def _insert_task_row(self, index: int, task: Task):
+        # Create the top-level item for the task
+        task_item = self._create_task_tree_item(task)
+        self.tasks_list_widget.insertTopLevelItem(index, task_item)
+        self._task_items[task.id] = task_item
+
+        # Create child items for each comment
+        if task.comments:
+            for comment in task.comments:
+                self._add_comment_row(task_item, comment)
+            # Expand the task item to show comments by default
+            task_item.setExpanded(True)
+
+    def _add_comment_row(self, task_item: QTreeWidgetItem, comment: Comment):
+        # Create a basic tree item to hold the data and widget
+        comment_item = QTreeWidgetItem()
+        comment_item.setData(0, Qt.ItemDataRole.UserRole, comment)
+        task_item.addChild(comment_item)
+
+        # Create and set the custom widget for the comment
+        comment_widget = self._create_comment_widget(comment)
+        self.tasks_list_widget.setItemWidget(comment_item, 0, comment_widget)
+
+    def on_data_changed(self, event: ChangeEvent):
+        """Patches the rows affected by a data change instead of reloading the whole day."""
+        if event.kind == RELOADED:
+            if self.current_task_list:
+                # Reloading replaces the list objects, so look the shown list up again
+                task_list = self.data_manager.get_task_list_by_id(self.current_task_list.id)
+                if task_list:
+                    self.current_task_list = task_list
+                    self.load_tasks()
+                else:
+                    self.show_placeholder_message("This list no longer exists.")
+            return
+        if not self.current_task_list:
+            return
 
-        if start_date and due_date:
-            return start_date <= target_date <= due_date
-        if due_date:
-            return due_date == target_date
-        return False
+        if event.kind in (TASK_ADDED, TASK_UPDATED):
+            self._remove_task_row(event.task.id)
+            if (event.task.assigned_to == self.current_task_list.id
+                    and self.data_manager.is_task_on_date(event.task, self.current_date.toPyDate())):
+                self._place_task_row(event.task)
+        elif event.kind == TASK_DELETED:
+            self._remove_task_row(event.ids[0])
+        elif event.kind == COMMENT_ADDED:
+            task_item = self._task_items.get(event.task.id)
+            if task_item:
+                self._add_comment_row(task_item, event.comment)
+                task_item.setExpanded(True)
+        elif event.kind == LIST_UPDATED and event.task_list.id == self.current_task_list.id:
+            self.current_task_list = event.task_list
+            self.title_label.setText(f"Tasks for {event.task_list.name} on {self.current_date.toString('yyyy-MM-dd')}")
+        elif event.kind == LISTS_DELETED and self.current_task_list.id in event.ids:
+            self.show_placeholder_message("This list was deleted.")
+
+    def _remove_task_row(self, task_id: str):
+        task_item = self._task_items.pop(task_id, None)
+        if task_item is None:
+            return
+        self.tasks_list_widget.takeTopLevelItem(self.tasks_list_widget.indexOfTopLevelItem(task_item))
+        if not self._task_items:
+            self._show_empty_message()
+
+    def _place_task_row(self, task: Task):
+        """Inserts a row for the task at its sorted position (the rows are kept sorted)."""
+        if self._empty_item is not None:
+            self.tasks_list_widget.takeTopLevelItem(self.tasks_list_widget.indexOfTopLevelItem(self._empty_item))
+            self._empty_item = None
+        key = self._sort_key(task)
+        low, high = 0, self.tasks_list_widget.topLevelItemCount()
+        while low < high:
+            middle = (low + high) // 2
+            other = self.tasks_list_widget.topLevelItem(middle).data(0, Qt.ItemDataRole.UserRole)
+            if self._sort_key(other) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        self._insert_task_row(low, task)
 
     def _create_task_tree_item(self, task: Task) -> QTreeWidgetItem:
         item_text = self._format_task_item_text(task)
@@ -206,8 +274,7 @@ class DailyTodoWidget(QWidget):
             return
         
         dialog = TaskEditDialog(data_manager=self.data_manager, task_list_id=self.current_task_list.id, parent=self)
-        if dialog.exec():
-            self.load_tasks()
+        dialog.exec() # Saved changes arrive as change events
 
     def show_calendar_context_menu(self, position):
         """Shows a context menu on the calendar to add a task for the selected date."""
@@ -235,8 +302,7 @@ class DailyTodoWidget(QWidget):
             return
         
         dialog = TaskEditDialog(task=task, data_manager=self.data_manager, parent=self)
-        if dialog.exec():
-            self.load_tasks()
+        dialog.exec() # Saved changes arrive as change events
 
     def show_task_context_menu(self, position):
         item = self.tasks_list_widget.itemAt(position)
@@ -296,9 +362,7 @@ class DailyTodoWidget(QWidget):
         new_text, ok = QInputDialog.getText(self, "Edit Comment", "Comment:",
                                             QLineEdit.EchoMode.Normal, comment.text)
         if ok and new_text.strip():
-            comment.text = new_text.strip()
-            self.data_manager.update_task(task)
-            self.load_tasks()
+            self.data_manager.update_comment(task.id, comment, new_text.strip())
 
     def delete_comment(self, task: Task, comment: Comment):
         """Asks for confirmation and deletes a comment."""
@@ -307,9 +371,7 @@ class DailyTodoWidget(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            task.comments.remove(comment)
-            self.data_manager.update_task(task)
-            self.load_tasks()
+            self.data_manager.delete_comment(task.id, comment)
 
     def delete_task(self, task: Task):
         """Asks for confirmation and deletes a task."""
@@ -319,24 +381,19 @@ class DailyTodoWidget(QWidget):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if self.data_manager.delete_task(task.id):
-                self.load_tasks()
-            else:
+            if not self.data_manager.delete_task(task.id):
                 QMessageBox.warning(self, "Error", "Failed to delete the task.")
 
     def change_task_priority(self, task: Task, new_priority: TaskPriority):
         task.priority = new_priority
         self.data_manager.update_task(task)
-        self.load_tasks()
 
     def change_task_status(self, task: Task, new_status: TaskStatus):
         task.status = new_status
         self.data_manager.update_task(task)
-        self.load_tasks()
 
     def toggle_task_pin_status(self, task: Task):
         """Toggles the 'is_pinned' status of a task."""
         current_status = getattr(task, 'is_pinned', False)
         task.is_pinned = not current_status
-        self.data_manager.update_task(task)
-        self.load_tasks()
\ No newline at end of file
+        self.data_manager.update_task(task)
\ No newline at end of file
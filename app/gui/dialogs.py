@@ -3,17 +3,43 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QLineEdit, QDialogButtonBox, QLabel, QComboBox, QTextBrowser,
     QDateTimeEdit, QTextEdit, QFormLayout, QMessageBox, QListWidget, QPushButton, QHBoxLayout,
-    QListWidgetItem, QMenu, QInputDialog, QWidget, QFileDialog
+    QListWidgetItem, QMenu, QInputDialog, QWidget, QFileDialog, QSpinBox, QCheckBox, QDateEdit, QProgressBar, QStyle
 )
-from PyQt6.QtCore import QDateTime, Qt
+from PyQt6.QtCore import QDateTime, QDate, Qt, QTimer, QSize, QUrl
+from PyQt6.QtGui import QIcon, QImageReader, QDesktopServices
 from ..data_manager import DataManager
 from ..data_models import Task, TaskList, TaskStatus, TaskPriority, Comment
+from ..task_export import COMMENTS_NESTED, COMMENTS_FLAT
+from ..storage.attachment_store import attachment_name, blob_digest
+from ..attachment_transfers import AttachmentTransfer, DONE, FAILED
+from ..attachment_metadata import AttachmentMetadataCache, guess_mime_type
+from ..mapped_text import looks_like_text
+from .text_preview import TextPreviewDialog
+from ..utils import format_size
 from datetime import datetime
 import html
 import re
 import os
-import shutil
-from typing import Optional
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+THUMBNAIL_SIZE = AttachmentMetadataCache.THUMBNAIL_SIZE
+
+
+def _make_thumbnail(image_path: str, thumbnail_path: str) -> bool:
+    """Writes a small PNG of an image. Runs on the metadata thread, so it uses QImage, not QPixmap."""
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid(): # Formats like JPEG can decode straight to the small size
+        reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return False
+    if image.width() > THUMBNAIL_SIZE or image.height() > THUMBNAIL_SIZE:
+        image = image.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image.save(thumbnail_path, "PNG")
 
 class AddTaskListDialog(QDialog):
     """Dialog to add a new task list."""
@@ -43,6 +69,83 @@ class AddTaskListDialog(QDialog):
             return
         super().accept()
 
+class ExportTasksDialog(QDialog):
+    """Dialog to choose which tasks to export and how to write their comments."""
+    def __init__(self, data_manager: DataManager, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Export Tasks")
+        self.layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+
+        # Scope: everything, one workspace or one list
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItem("All tasks", {})
+        for workspace in sorted(data_manager.get_task_lists_by_category('project'), key=lambda tl: tl.name):
+            self.scope_combo.addItem(f"Workspace: {workspace.name}", {'workspace_id': workspace.id})
+        for task_list in sorted(data_manager.get_all_task_lists(), key=lambda tl: tl.name):
+            if task_list.category != 'project':
+                self.scope_combo.addItem(f"List: {task_list.name}", {'list_id': task_list.id})
+        form_layout.addRow("Tasks:", self.scope_combo)
+
+        status_layout = QHBoxLayout()
+        self.status_checks = {}
+        for status in TaskStatus:
+            check = QCheckBox(status.value)
+            check.setChecked(True)
+            self.status_checks[status] = check
+            status_layout.addWidget(check)
+        form_layout.addRow("Status:", status_layout)
+
+        date_layout = QHBoxLayout()
+        self.date_range_check = QCheckBox("Active between")
+        today = QDate.currentDate()
+        self.start_date_edit = QDateEdit(today.addDays(-(today.dayOfWeek() - 1))) # This week by default
+        self.end_date_edit = QDateEdit(self.start_date_edit.date().addDays(6))
+        for date_edit in (self.start_date_edit, self.end_date_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setEnabled(False)
+            self.date_range_check.toggled.connect(date_edit.setEnabled)
+        date_layout.addWidget(self.date_range_check)
+        date_layout.addWidget(self.start_date_edit)
+        date_layout.addWidget(QLabel("and"))
+        date_layout.addWidget(self.end_date_edit)
+        form_layout.addRow("Dates:", date_layout)
+
+        self.comments_combo = QComboBox()
+        self.comments_combo.addItem("Nested (one record per task)", COMMENTS_NESTED)
+        self.comments_combo.addItem("Flattened (one record per comment)", COMMENTS_FLAT)
+        form_layout.addRow("Comments:", self.comments_combo)
+        self.layout.addLayout(form_layout)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        self.layout.addWidget(self.button_box)
+
+    def get_filters(self) -> dict:
+        """Keyword arguments for DataManager.export_tasks."""
+        filters = dict(self.scope_combo.currentData())
+        statuses = [status for status, check in self.status_checks.items() if check.isChecked()]
+        if len(statuses) < len(self.status_checks):
+            filters['statuses'] = statuses
+        if self.date_range_check.isChecked():
+            filters['start_date'] = self.start_date_edit.date().toPyDate()
+            filters['end_date'] = self.end_date_edit.date().toPyDate()
+        return filters
+
+    def get_comments_mode(self) -> str:
+        return self.comments_combo.currentData()
+
+    def accept(self):
+        """Validate input before accepting."""
+        if not any(check.isChecked() for check in self.status_checks.values()):
+            QMessageBox.warning(self, "Input Error", "Select at least one status.")
+            return
+        if self.date_range_check.isChecked() and self.start_date_edit.date() > self.end_date_edit.date():
+            QMessageBox.warning(self, "Input Error", "The start date must not be after the end date.")
+            return
+        super().accept()
+
 class TaskEditDialog(QDialog):
     """A comprehensive dialog to add a new task or edit an existing one."""
     def __init__(self, data_manager: DataManager, task: Optional[Task] = None, task_list_id: Optional[str] = None, parent=None):
@@ -107,6 +210,16 @@ class TaskEditDialog(QDialog):
         self.due_at_edit.setCalendarPopup(True)
         form_layout.addRow("Due At:", self.due_at_edit)
 
+        # Alarm lead time; 0 shows as "Default" and falls back to the app-wide lead time
+        self.alarm_lead_spin = QSpinBox()
+        # -1 stands for the app default, so that 0 (remind at the due time) can be chosen
+        self.alarm_lead_spin.setRange(-1, 7 * 24 * 60)
+        self.alarm_lead_spin.setSuffix(" min")
+        self.alarm_lead_spin.setSpecialValueText("Default")
+        lead_minutes = self.task.alarm_lead_minutes
+        self.alarm_lead_spin.setValue(-1 if lead_minutes is None else lead_minutes)
+        form_layout.addRow("Remind Before Due:", self.alarm_lead_spin)
+
         self.layout.addLayout(form_layout)
 
         # --- Comments Section ---
@@ -133,7 +246,11 @@ class TaskEditDialog(QDialog):
         self.attachments_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.attachments_list.customContextMenuRequested.connect(self.show_attachment_context_menu)
         self.attachments_list.itemDoubleClicked.connect(self.open_attachment)
+        self.attachments_list.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
         self.layout.addWidget(self.attachments_list)
+        self._metadata_refresh: Optional[Future] = None # Details being read on a background thread
+        self.metadata_timer = QTimer(self)
+        self.metadata_timer.timeout.connect(self.update_metadata)
         self.load_attachments()
 
         attachment_layout = QHBoxLayout()
@@ -143,6 +260,25 @@ class TaskEditDialog(QDialog):
         attachment_layout.addWidget(self.attach_file_button)
         self.layout.addLayout(attachment_layout)
 
+        # Files are copied on worker threads; this row shows their progress while any are running
+        self.transfer_widget = QWidget()
+        transfer_layout = QHBoxLayout(self.transfer_widget)
+        transfer_layout.setContentsMargins(0, 0, 0, 0)
+        self.transfer_label = QLabel()
+        self.transfer_progress = QProgressBar()
+        self.transfer_progress.setRange(0, 1000) # Per mille, so files over 2 GB fit in the bar's int range
+        self.cancel_transfers_button = QPushButton("Cancel")
+        self.cancel_transfers_button.clicked.connect(self.cancel_transfers)
+        transfer_layout.addWidget(self.transfer_label)
+        transfer_layout.addWidget(self.transfer_progress, 1)
+        transfer_layout.addWidget(self.cancel_transfers_button)
+        self.transfer_widget.hide()
+        self.layout.addWidget(self.transfer_widget)
+        self._transfers: List[AttachmentTransfer] = []
+        self._replaced_refs: Dict[AttachmentTransfer, List[str]] = {} # Refs an attached file takes the place of
+        self.transfer_timer = QTimer(self)
+        self.transfer_timer.timeout.connect(self.update_transfers)
+
         # --- Main Dialog Buttons ---
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         
@@ -203,13 +339,12 @@ class TaskEditDialog(QDialog):
         # For now, we'll hardcode it.
         author = "CurrentUser"
         
-        new_comment = Comment(
-            author=author,
-            text=comment_text,
-            timestamp=datetime.now()
-        )
-        self.task.comments.append(new_comment)
-        self.data_manager.update_task(self.task)
+        if self.is_new_task:
+            # Staged on the temporary task until it is added
+            self.task.comments.append(Comment(author=author, text=comment_text, timestamp=datetime.now()))
+        else:
+            # Appends to the stored thread without saving the rest of the task
+            self.data_manager.add_comment_to_task(self.task.id, comment_text, author)
         self.load_comments()
         self.comment_edit.clear()
 
@@ -237,8 +372,10 @@ class TaskEditDialog(QDialog):
         new_text, ok = QInputDialog.getText(self, "Edit Comment", "Comment:",
                                             QLineEdit.EchoMode.Normal, comment.text)
         if ok and new_text.strip():
-            comment.text = new_text.strip()
-            self.data_manager.update_task(self.task)
+            if self.is_new_task: # Staged on the temporary task
+                comment.text = new_text.strip()
+            else:
+                self.data_manager.update_comment(self.task.id, comment, new_text.strip())
             self.load_comments()
 
     def delete_comment(self, comment: Comment):
@@ -248,34 +385,61 @@ class TaskEditDialog(QDialog):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            self.task.comments.remove(comment)
-            self.data_manager.update_task(self.task)
+            if self.is_new_task:
+                self.task.comments.remove(comment)
+            else:
+                self.data_manager.delete_comment(self.task.id, comment)
             self.load_comments()
 
     def load_attachments(self):
-        """Loads attachments into the list widget."""
+        """Loads attachments into the list widget, then refreshes their details in the background."""
+        self.show_attachments()
+        refs = list(self.task.attachment_refs())
+        if refs:
+            self._metadata_refresh = self.data_manager.attachment_metadata.refresh(refs, _make_thumbnail)
+            self.metadata_timer.start(100)
+
+    def show_attachments(self):
+        """Fills the attachment rows from the metadata cache, without reading the files."""
+        metadata = self.data_manager.attachment_metadata
+        file_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_FileIcon)
         self.attachments_list.clear()
         for rel_path in self.task.attachments:
-            # Display just the filename
-            filename = os.path.basename(rel_path)
-            item = QListWidgetItem(filename)
-            item.setData(Qt.ItemDataRole.UserRole, rel_path) # Store the relative path
+            # Display the filename, with its size and type once they are known
+            filename = attachment_name(rel_path)
+            info = metadata.get(rel_path)
+            item = QListWidgetItem(filename if info is None else f"{filename}  ({format_size(info.size)}, {info.mime_type})")
+            thumbnail = metadata.thumbnail_path(info) if info else None
+            item.setIcon(QIcon(thumbnail) if thumbnail else file_icon)
+            if info:
+                item.setToolTip(f"{info.size} bytes\nSHA-256: {info.sha256}")
+            item.setData(Qt.ItemDataRole.UserRole, rel_path) # Store the reference
             self.attachments_list.addItem(item)
 
+    def update_metadata(self):
+        if self._metadata_refresh is None or not self._metadata_refresh.done():
+            return
+        self.metadata_timer.stop()
+        refresh, self._metadata_refresh = self._metadata_refresh, None
+        if not refresh.cancelled() and refresh.exception() is None and refresh.result():
+            self.show_attachments()
+
     def attach_file(self):
         """Opens a file dialog to attach files to the task."""
         file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Files to Attach")
         if not file_paths:
             return
 
-        task_attachment_dir = os.path.join(self.data_manager.attachments_dir, self.task.id)
-        os.makedirs(task_attachment_dir, exist_ok=True)
+        self._copy_attachments(file_paths)
 
+    def _copy_attachments(self, file_paths):
+        # Files are stored once by content on worker threads; the task refers to a file
+        # only once its copy is complete and verified (see update_transfers)
         for src_path in file_paths:
             filename = os.path.basename(src_path)
-            dest_path = os.path.join(task_attachment_dir, filename)
+            existing = [ref for ref in self.task.attachments if attachment_name(ref) == filename]
 
-            if os.path.exists(dest_path):
+            if existing:
                 reply = QMessageBox.question(self, "File Exists",
                                              f"'{filename}' already exists. Overwrite?",
                                              QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
@@ -283,16 +447,65 @@ class TaskEditDialog(QDialog):
                     continue
 
             try:
-                shutil.copy(src_path, dest_path)
-                # Store relative path from the main 'attachments' folder
-                rel_path = os.path.join(self.task.id, filename)
-                if rel_path not in self.task.attachments:
-                    self.task.attachments.append(rel_path)
-            except Exception as e:
+                transfer = self.data_manager.attachment_transfers.attach(src_path)
+            except OSError as e:
                 QMessageBox.critical(self, "Error", f"Could not attach file: {e}")
+                continue
+            self._replaced_refs[transfer] = existing
+            self._watch_transfer(transfer)
+
+    def _watch_transfer(self, transfer: AttachmentTransfer):
+        self._transfers.append(transfer)
+        self.update_transfers()
+        self.transfer_timer.start(100)
+
+    def update_transfers(self):
+        """Shows the progress of running copies and records the files whose copy has finished."""
+        finished = [transfer for transfer in self._transfers if transfer.finished]
+        self._transfers = [transfer for transfer in self._transfers if not transfer.finished]
+        attached = False
+        for transfer in finished:
+            replaced = self._replaced_refs.pop(transfer, None)
+            if transfer.state == FAILED:
+                verb = "save" if transfer.dest_path else "attach"
+                QMessageBox.critical(self, "Error", f"Could not {verb} file: {transfer.error}")
+            elif transfer.state == DONE and replaced is not None:
+                attachments = [ref for ref in self.task.attachments if ref not in replaced]
+                attachments.append(transfer.ref)
+                self.task.attachments = attachments
+                attached = True
+        if attached:
+            if not self.is_new_task: # A new task gets its attachments when it is created
+                self.data_manager.update_task(self.task)
+            self.load_attachments()
 
-        self.data_manager.update_task(self.task)
-        self.load_attachments()
+        if not self._transfers:
+            self.transfer_timer.stop()
+            self.transfer_widget.hide()
+            self.button_box.button(QDialogButtonBox.StandardButton.Ok).setEnabled(True)
+            return
+        total = sum(transfer.total_bytes for transfer in self._transfers)
+        done = sum(transfer.done_bytes for transfer in self._transfers)
+        self.transfer_progress.setValue(int(1000 * done / total) if total else 0)
+        count = len(self._transfers)
+        self.transfer_label.setText(f"Copying {count} file{'s' if count != 1 else ''}...")
+        self.transfer_widget.show()
+        # Saving now would leave out attachments still being copied
+        self.button_box.button(QDialogButtonBox.StandardButton.Ok).setEnabled(not self._replaced_refs)
+
+    def cancel_transfers(self):
+        for transfer in self._transfers:
+            transfer.cancel()
+        self.update_transfers()
+
+    def done(self, result: int):
+        # Attachments still copying would never be recorded, so drop them (blobs already stored
+        # are collected later); saving copies out of the store carries on in the background
+        for transfer in self._replaced_refs:
+            transfer.cancel()
+        self.transfer_timer.stop()
+        self.metadata_timer.stop()
+        super().done(result)
 
     def show_attachment_context_menu(self, position):
         """Shows a context menu for opening or deleting an attachment."""
@@ -310,18 +523,25 @@ class TaskEditDialog(QDialog):
         menu.exec(self.attachments_list.mapToGlobal(position))
 
     def open_attachment(self, item: QListWidgetItem):
-        """Opens the selected attachment with the default system application."""
+        """Previews a text attachment in the app; opens anything else with the default system application."""
         rel_path = item.data(Qt.ItemDataRole.UserRole)
         if not rel_path: return
 
-        abs_path = os.path.join(self.data_manager.attachments_dir, rel_path)
-        if os.path.exists(abs_path):
+        abs_path = self.data_manager.attachment_store.path(rel_path)
+        if not os.path.exists(abs_path):
+            QMessageBox.warning(self, "File Not Found", "The attached file could not be found.")
+            return
+        info = self.data_manager.attachment_metadata.get(rel_path)
+        mime_type = info.mime_type if info else guess_mime_type(attachment_name(rel_path))
+        if mime_type.startswith("text/") or looks_like_text(abs_path):
             try:
-                os.startfile(abs_path)
-            except Exception as e:
+                TextPreviewDialog(abs_path, attachment_name(rel_path), self).exec()
+            except (OSError, ValueError) as e:
                 QMessageBox.critical(self, "Error", f"Could not open file: {e}")
-        else:
-            QMessageBox.warning(self, "File Not Found", "The attached file could not be found.")
+            return
+        if not QDesktopServices.openUrl(QUrl.fromLocalFile(abs_path)):
+            # Stored blobs have no file extension, so the system may not know what opens them
+            QMessageBox.critical(self, "Error", "Could not open file. Download a copy to open it under its own name.")
 
     def download_attachment(self, item: QListWidgetItem):
         """Prompts the user to save a copy of the attachment to a new location."""
@@ -329,18 +549,18 @@ class TaskEditDialog(QDialog):
         if not rel_path:
             return
 
-        src_path = os.path.join(self.data_manager.attachments_dir, rel_path)
+        src_path = self.data_manager.attachment_store.path(rel_path)
         if not os.path.exists(src_path):
             QMessageBox.warning(self, "File Not Found", "The attached file could not be found.")
             return
 
-        filename = os.path.basename(rel_path)
+        filename = attachment_name(rel_path)
         dest_path, _ = QFileDialog.getSaveFileName(self, "Save Attachment As...", filename)
 
         if dest_path:
             try:
-                shutil.copy(src_path, dest_path)
-            except Exception as e:
+                self._watch_transfer(self.data_manager.attachment_transfers.download(rel_path, dest_path))
+            except OSError as e:
                 QMessageBox.critical(self, "Error", f"Could not save file: {e}")
 
     def delete_attachment(self, item: QListWidgetItem):
@@ -349,10 +569,11 @@ class TaskEditDialog(QDialog):
         if not rel_path:
             return
 
-        filename = os.path.basename(rel_path)
+        filename = attachment_name(rel_path)
+        shared = blob_digest(rel_path) is not None # Other tasks may hold the same file
         reply = QMessageBox.question(self, "Confirm Deletion",
                                      f"Are you sure you want to delete the attachment '{filename}'?\n"
-                                     "This will permanently remove the file.",
+                                     + ("" if shared else "This will permanently remove the file."),
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
 
@@ -361,9 +582,10 @@ class TaskEditDialog(QDialog):
             if rel_path in self.task.attachments:
                 self.task.attachments.remove(rel_path)
 
-            # Delete the actual file from the filesystem
+            # Delete the actual file from the filesystem; a stored blob only loses this reference
+            # and goes once no task refers to it (DataManager.collect_attachment_blobs)
             abs_path = os.path.join(self.data_manager.attachments_dir, rel_path)
-            if os.path.exists(abs_path):
+            if not shared and os.path.exists(abs_path):
                 try:
                     os.remove(abs_path)
                 except Exception as e:
@@ -407,6 +629,8 @@ class TaskEditDialog(QDialog):
         self.task.priority = self.priority_combo.currentData()
         self.task.start_at = self.start_at_edit.dateTime().toPyDateTime()
         self.task.due_at = self.due_at_edit.dateTime().toPyDateTime()
+        lead_minutes = self.alarm_lead_spin.value()
+        self.task.alarm_lead_minutes = None if lead_minutes < 0 else lead_minutes
         
         if self.is_new_task:
             # This is a new task, we need to add it first to get an ID
@@ -422,7 +646,8 @@ class TaskEditDialog(QDialog):
                 start_at=self.task.start_at,
                 due_at=self.task.due_at,
                 comments=self.task.comments, # Pass staged comments
-                attachments=self.task.attachments # Pass staged attachments
+                attachments=self.task.attachments, # Pass staged attachments
+                alarm_lead_minutes=self.task.alarm_lead_minutes
             )
             if not created_task:
                 QMessageBox.critical(self, "Error", "Failed to create the task.")
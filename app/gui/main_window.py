@@ -1,14 +1,17 @@
 # c:\Users\xiongti\Documents\TeamTaskManager\app\gui\main_window.py
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QMenuBar, QMessageBox,
                              QStatusBar, QHBoxLayout, QMenu, QInputDialog, QLineEdit, QSplitter, QListWidget,
-                             QListWidgetItem, QPushButton)
+                             QListWidgetItem, QPushButton, QFileDialog)
 from PyQt6.QtGui import QAction, QKeySequence, QColor, QPixmap, QPalette, QBrush, QPainter, QFont
 from PyQt6.QtCore import Qt, QTimer, QDateTime, QRect, QDate
 from ..data_manager import DataManager # Import DataManager
-from .dialogs import AddTaskListDialog # QColorDialog is a standard widget, not from here
+from .dialogs import AddTaskListDialog, ExportTasksDialog # QColorDialog is a standard widget, not from here
 from .daily_todo_widget import DailyTodoWidget
 from .overview_window import OverviewWindow
 from ..data_models import TaskStatus, TaskList
+from ..settings_store import WorkspaceViewState
+from ..utils import format_size
+from ..events import ChangeEvent, LIST_ADDED, LIST_UPDATED, LISTS_DELETED, RELOADED
 # Attempt to import plyer for native notifications
 try:
     from plyer import notification
@@ -16,7 +19,7 @@ except ImportError:
     notification = None # Fallback if plyer is not installed
 
 import os # For path joining
-from typing import Optional
+from typing import Dict, Optional
 
 class TaskWorkspaceWidget(QWidget):
     """A widget that contains the list panel on the left and the task view on the right."""
@@ -25,6 +28,7 @@ class TaskWorkspaceWidget(QWidget):
         self.data_manager = data_manager
         self.current_context_id: Optional[str] = None
         self.current_context_category: str = 'default'
+        self._list_items: Dict[str, QListWidgetItem] = {} # Rows of the list panel, by list id
 
         # --- Layout ---
         self.main_layout = QHBoxLayout(self)
@@ -73,6 +77,7 @@ class TaskWorkspaceWidget(QWidget):
         self.main_layout.addWidget(splitter)
 
         self.list_panel.setVisible(False) # Initially hidden
+        self.data_manager.events.subscribe(self.on_data_changed)
 
     def load_context(self, context_id: Optional[str]):
         self.current_context_id = context_id
@@ -94,21 +99,14 @@ class TaskWorkspaceWidget(QWidget):
 
     def refresh_list_panel(self):
         self.list_widget.clear()
+        self._list_items = {}
         
-        all_lists = self.data_manager.get_all_task_lists()
-        lists_for_context = [
-            tl for tl in all_lists if getattr(tl, 'category', 'default') == self.current_context_category
-        ]
+        lists_for_context = self.data_manager.get_task_lists_by_category(self.current_context_category)
 
-        # Sort by pinned status first (True comes before False), then by name
-        sorted_lists = sorted(lists_for_context, key=lambda tl: (not getattr(tl, 'is_pinned', False), tl.name))
+        sorted_lists = sorted(lists_for_context, key=self._list_sort_key)
 
         for task_list in sorted_lists:
-            # Add pin indicator to the text if pinned
-            item_text = f"📌 {task_list.name}" if getattr(task_list, 'is_pinned', False) else task_list.name
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.ItemDataRole.UserRole, task_list)
-            self.list_widget.addItem(item)
+            self._insert_list_row(self.list_widget.count(), task_list)
         
         if sorted_lists:
             # Temporarily disconnect the signal to prevent on_list_selected from firing.
@@ -118,7 +116,10 @@ class TaskWorkspaceWidget(QWidget):
             except TypeError: # Signal was not connected
                 pass
 
-            first_item = self.list_widget.item(0)
+            # Reselect the list that was open the last time this workspace was shown, if any
+            selected_list_id = self.data_manager.get_view_state(self.current_context_id).selected_list_id
+            row = next((i for i, tl in enumerate(sorted_lists) if tl.id == selected_list_id), 0)
+            first_item = self.list_widget.item(row)
             if first_item:
                 self.list_widget.setCurrentItem(first_item)
 
@@ -132,10 +133,67 @@ class TaskWorkspaceWidget(QWidget):
             # If there are no lists, show a more helpful placeholder.
             self.daily_todo_widget.show_placeholder_message("This workspace is empty. Add a list to get started.")
     
+    @staticmethod
+    def _list_sort_key(task_list: TaskList):
+        # Sort by pinned status first (True comes before False), then by name
+        return (not getattr(task_list, 'is_pinned', False), task_list.name)
+
+    def _insert_list_row(self, row: int, task_list: TaskList) -> QListWidgetItem:
+        # Add pin indicator to the text if pinned
+        item_text = f"📌 {task_list.name}" if getattr(task_list, 'is_pinned', False) else task_list.name
+        item = QListWidgetItem(item_text)
+        item.setData(Qt.ItemDataRole.UserRole, task_list)
+        self.list_widget.insertItem(row, item)
+        self._list_items[task_list.id] = item
+        return item
+
+    def on_data_changed(self, event: ChangeEvent):
+        """Patches the list panel rows affected by a list change."""
+        if self.current_context_id is None:
+            return
+        if event.kind == RELOADED:
+            self.refresh_list_panel()
+        elif event.kind in (LIST_ADDED, LIST_UPDATED):
+            task_list = event.task_list
+            if task_list.id == self.current_context_id:
+                self.lists_label.setText(f"📦 {task_list.name}:")
+            old_item = self._list_items.pop(task_list.id, None)
+            was_selected = old_item is not None and old_item is self.list_widget.currentItem()
+            if old_item is not None:
+                self.list_widget.takeItem(self.list_widget.row(old_item))
+            if getattr(task_list, 'category', 'default') == self.current_context_category:
+                item = self._insert_list_row(self._sorted_list_row(task_list), task_list)
+                if was_selected:
+                    self.list_widget.setCurrentItem(item)
+        elif event.kind == LISTS_DELETED:
+            removed_selected = False
+            for list_id in event.ids:
+                item = self._list_items.pop(list_id, None)
+                if item is not None:
+                    removed_selected = removed_selected or item is self.list_widget.currentItem()
+                    self.list_widget.takeItem(self.list_widget.row(item))
+            if removed_selected and self.list_widget.count():
+                self.list_widget.setCurrentRow(0)
+                self.on_list_selected(self.list_widget.item(0))
+            elif not self.list_widget.count():
+                self.daily_todo_widget.show_placeholder_message("This workspace is empty. Add a list to get started.")
+
+    def _sorted_list_row(self, task_list: TaskList) -> int:
+        key = self._list_sort_key(task_list)
+        low, high = 0, self.list_widget.count()
+        while low < high:
+            middle = (low + high) // 2
+            if self._list_sort_key(self.list_widget.item(middle).data(Qt.ItemDataRole.UserRole)) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
     def on_list_selected(self, item: QListWidgetItem):
         task_list = item.data(Qt.ItemDataRole.UserRole)
         if task_list:
             self.daily_todo_widget.set_task_list_and_date(task_list, self.daily_todo_widget.current_date.toPyDate())
+            self.data_manager.save_view_state(self.current_context_id, WorkspaceViewState(selected_list_id=task_list.id))
 
     def add_list(self):
         dialog = AddTaskListDialog(self)
@@ -143,12 +201,11 @@ class TaskWorkspaceWidget(QWidget):
             name = dialog.get_name()
             task_list = self.data_manager.add_task_list(name, category=self.current_context_category)
             if task_list:
-                self.refresh_list_panel()
-                # Automatically select the new list
-                items = self.list_widget.findItems(task_list.name, Qt.MatchFlag.MatchExactly)
-                if items:
-                    self.list_widget.setCurrentItem(items[0])
-                    self.on_list_selected(items[0])
+                # The change event added its row; automatically select the new list
+                item = self._list_items.get(task_list.id)
+                if item:
+                    self.list_widget.setCurrentItem(item)
+                    self.on_list_selected(item)
             else:
                 QMessageBox.warning(self, "Failed", f"Could not add Task List '{name}'. It might already exist.")
 
@@ -191,15 +248,16 @@ class TaskWorkspaceWidget(QWidget):
     def rename_list(self, task_list: TaskList):
         # This method will be called by MainWindow to refresh the Team menu
         self.parent().rename_task_list(task_list.id)
-        self.refresh_list_panel()
 
     def delete_list(self, task_list: TaskList):
         # This method will be called by MainWindow to refresh the Team menu
         self.parent().delete_task_list(task_list.id)
-        self.refresh_list_panel()
 
 class MainWindow(QMainWindow):
-    _triggered_alarms: set[str] = set() # Class variable to track triggered alarms
+    MAX_REPORTED_IMPORT_ERRORS = 20 # Rows listed in the import summary; the rest are only counted
+
+    # Longest single wait of the alarm timer, so wall-clock jumps (sleep, DST) are caught up on
+    MAX_ALARM_WAIT_MS = 60 * 60 * 1000
     def __init__(self, data_manager: DataManager, parent=None):
         super().__init__(parent)
         self.data_manager = data_manager
@@ -216,6 +274,7 @@ class MainWindow(QMainWindow):
         self.overview_window = None
         self._create_central_widget()
         self._load_last_view()
+        self.data_manager.events.subscribe(self.on_data_changed)
 
         self.update_time_display()
         self.timer = QTimer(self)
@@ -225,10 +284,12 @@ class MainWindow(QMainWindow):
         # self._load_original_background_image() # No longer needed
         self.setAutoFillBackground(True)       # Crucial for QMainWindow to draw its background
 
-        # Alarm Timer
+        # Alarm Timer: a single shot armed for the next scheduled alarm, re-armed when the schedule changes
         self.alarm_timer = QTimer(self)
+        self.alarm_timer.setSingleShot(True)
         self.alarm_timer.timeout.connect(self.check_for_alarms)
-        self.alarm_timer.start(5 * 60 * 1000) # Check for alarms every 5 minutes
+        self.data_manager.alarms.on_schedule_changed = self._arm_alarm_timer
+        self._arm_alarm_timer()
 
 
         # Set QMainWindow's own background to light green
@@ -241,6 +302,15 @@ class MainWindow(QMainWindow):
         self.show_overview_action = QAction("&Show Overview", self)
         self.show_overview_action.triggered.connect(self.show_overview)
 
+        self.import_tasks_action = QAction("&Import Tasks...", self)
+        self.import_tasks_action.triggered.connect(self.import_tasks)
+
+        self.export_tasks_action = QAction("&Export Tasks...", self)
+        self.export_tasks_action.triggered.connect(self.export_tasks)
+
+        self.clean_up_attachments_action = QAction("&Clean Up Attachments...", self)
+        self.clean_up_attachments_action.triggered.connect(self.clean_up_attachments)
+
         self.exit_action = QAction("E&xit", self)
         self.exit_action.triggered.connect(self.close) # QMainWindow's close
         self.exit_action.setShortcut(QKeySequence.StandardKey.Quit)
@@ -280,6 +350,9 @@ class MainWindow(QMainWindow):
         file_menu = menu_bar.addMenu("&File")
 
         file_menu.addAction(self.show_overview_action)
+        file_menu.addAction(self.import_tasks_action)
+        file_menu.addAction(self.export_tasks_action)
+        file_menu.addAction(self.clean_up_attachments_action)
         file_menu.addSeparator()
         file_menu.addAction(self.exit_action)
 
@@ -344,14 +417,7 @@ class MainWindow(QMainWindow):
 
         if ok and new_name.strip() and new_name.strip() != task_list.name:
             stripped_name = new_name.strip()
-            if self.data_manager.update_task_list_name(list_id, stripped_name):
-                self.refresh_workspace_menu()
-                # The workspace will refresh its own list panel.
-                # We just need to handle if the active block itself was renamed.
-                if self.workspace.current_context_id == list_id:
-                    # Reload context to update titles etc. if needed (future enhancement)
-                    pass
-            else:
+            if not self.data_manager.update_task_list_name(list_id, stripped_name):
                 QMessageBox.warning(self, "Error", f"Could not rename Task List. A list with the name '{stripped_name}' might already exist.")
 
     def delete_task_list(self, list_id: str):
@@ -372,7 +438,6 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             if self.data_manager.delete_task_list(list_id):
                 QMessageBox.information(self, "Success", f"{item_type} '{task_list.name}' deleted.")
-                self.refresh_workspace_menu()
                 # If the deleted item was the active context, clear the workspace
                 if self.workspace.current_context_id == list_id:
                     self.data_manager.save_setting('last_selected_context_id', None)
@@ -390,12 +455,27 @@ class MainWindow(QMainWindow):
             current_status = getattr(task_list, 'is_pinned', False)
             task_list.is_pinned = not current_status
             self.data_manager.update_task_list(task_list)
-            self.workspace.refresh_list_panel()
 
     def update_time_display(self):
         now = QDateTime.currentDateTime()
         week_number = now.date().weekNumber()[0]
         self.time_label.setText(f"{now.toString('dddd, MMMM d, yyyy hh:mm:ss ap')} (Week {week_number})")
+        # Poll for changes other instances saved, and report conflicts found by the write-behind thread
+        self.data_manager.reload_changes()
+        self.check_for_conflicts()
+
+    def check_for_conflicts(self):
+        """Tells the user about changes that lost to another instance sharing the data folder."""
+        conflicts = self.data_manager.take_conflicts()
+        if not conflicts:
+            return
+        names = "\n".join(f"- {conflict.description}" for conflict in conflicts[:10])
+        more = f"\n...and {len(conflicts) - 10} more" if len(conflicts) > 10 else ""
+        QMessageBox.warning(self, "Changes Not Saved",
+                            "Someone else changed or deleted these tasks before your changes were saved, "
+                            f"so your changes were not applied:\n\n{names}{more}\n\n"
+                            f"Your versions are kept in {self.data_manager.conflicts_file}; "
+                            "the latest saved versions are shown now.")
 
     def show_overview(self):
         if not self.overview_window or not self.overview_window.isVisible():
@@ -406,6 +486,74 @@ class MainWindow(QMainWindow):
 
     # --- New methods for Task Blocks ---
 
+    def import_tasks(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Tasks", "",
+                                                   "Task files (*.csv *.ndjson *.jsonl);;All files (*)")
+        if not file_path:
+            return
+        try:
+            report = self.data_manager.import_tasks(file_path)
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.critical(self, "Import Failed", f"Could not read '{file_path}': {e}")
+            return
+
+        message = f"Imported {report.imported} tasks."
+        if report.created_lists:
+            message += f"\nCreated {len(report.created_lists)} new lists: {', '.join(report.created_lists)}"
+        if report.errors:
+            message += f"\n\nSkipped {len(report.errors)} rows:"
+            for row_number, error in report.errors[:self.MAX_REPORTED_IMPORT_ERRORS]:
+                message += f"\n  Row {row_number}: {error}"
+            if len(report.errors) > self.MAX_REPORTED_IMPORT_ERRORS:
+                message += "\n  ..."
+            QMessageBox.warning(self, "Import Finished", message)
+        else:
+            QMessageBox.information(self, "Import Finished", message)
+
+    def export_tasks(self):
+        dialog = ExportTasksDialog(self.data_manager, self)
+        if not dialog.exec():
+            return
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Export Tasks", "tasks.ndjson",
+                                                                 "NDJSON (*.ndjson);;CSV (*.csv)")
+        if not file_path:
+            return
+        file_format = 'csv' if selected_filter.startswith("CSV") or file_path.lower().endswith(".csv") else 'ndjson'
+        try:
+            count = self.data_manager.export_tasks(file_path, file_format, dialog.get_comments_mode(),
+                                                   **dialog.get_filters())
+        except OSError as e:
+            QMessageBox.critical(self, "Export Failed", f"Could not write '{file_path}': {e}")
+            return
+        QMessageBox.information(self, "Export Finished", f"Exported {count} records to {file_path}.")
+
+    def clean_up_attachments(self):
+        """Finds attachment files no task refers to and offers to move them to the quarantine folder."""
+        report = self.data_manager.collect_orphan_attachments()
+        if not report.orphans:
+            QMessageBox.information(self, "Clean Up Attachments",
+                                    f"No unused attachment files found ({report.scanned_files} files checked).")
+            return
+        reply = QMessageBox.question(self, "Clean Up Attachments",
+                                     f"{len(report.orphans)} of {report.scanned_files} attachment files are not used by any task "
+                                     f"({format_size(report.reclaimable_bytes)}).\n\n"
+                                     f"Move them to {self.data_manager.quarantine_dir}?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        report = self.data_manager.collect_orphan_attachments(remove=True)
+        message = f"Moved {report.removed} files ({format_size(report.reclaimable_bytes)}) to {report.quarantine_dir or self.data_manager.quarantine_dir}."
+        if report.errors:
+            message += f"\n\n{len(report.errors)} files could not be moved."
+            QMessageBox.warning(self, "Clean Up Attachments", message)
+        else:
+            QMessageBox.information(self, "Clean Up Attachments", message)
+
+    def on_data_changed(self, event: ChangeEvent):
+        # The workspace menu lists workspaces and whether any plain lists exist
+        if event.kind in (LIST_ADDED, LIST_UPDATED, LISTS_DELETED, RELOADED):
+            self.refresh_workspace_menu()
+
     def refresh_workspace_menu(self):
         self.workspace_menu.clear()
 
@@ -415,13 +563,8 @@ class MainWindow(QMainWindow):
         self.workspace_menu.addSeparator()
 
         # --- Get and sort lists into categories ---
-        default_lists = []
-        project_lists = []
-        for tl in self.data_manager.get_all_task_lists():
-            if getattr(tl, 'category', 'default') == 'project':
-                project_lists.append(tl)
-            else:
-                default_lists.append(tl)
+        project_lists = self.data_manager.get_task_lists_by_category('project')
+        has_default_lists = len(project_lists) < len(self.data_manager.task_lists)
 
         # --- Add the static "TaskLists" block ---
         # This is a single entry that represents all default lists combined.
@@ -443,7 +586,7 @@ class MainWindow(QMainWindow):
             delete_action.triggered.connect(lambda checked=False, l_id=task_block.id: self.delete_task_list(l_id))
 
         # --- Handle case where there's nothing but the "TaskLists" entry ---
-        if not default_lists and not project_lists:
+        if not has_default_lists and not project_lists:
             self.workspace_menu.addSeparator()
             no_items_action = self.workspace_menu.addAction("No lists or blocks yet")
             no_items_action.setEnabled(False)
@@ -455,44 +598,41 @@ class MainWindow(QMainWindow):
             task_list = self.data_manager.add_task_list(name.strip(), category='project')
             if task_list:
                 QMessageBox.information(self, "Success", f"Workspace '{task_list.name}' added.")
-                self.refresh_workspace_menu()
             else:
                 QMessageBox.warning(self, "Failed", f"Could not add Workspace '{name}'. It might already exist.")
 
     def check_for_alarms(self):
-        """Checks tasks for upcoming due times and triggers alarms."""
-        print(f"\n[{QDateTime.currentDateTime().toString('yyyy-MM-dd HH:mm:ss')}] Running check_for_alarms...")
+        """Shows the alarms that are due now, then re-arms the timer for the next one."""
         now = QDateTime.currentDateTime().toPyDateTime()
-        # Check tasks that are not done and have a due time
-        tasks_to_check = [
-            task for task in self.data_manager.tasks.values()
-            if task.status != TaskStatus.DONE and task.due_at is not None and task.id not in self._triggered_alarms
-        ]
-        print(f"Found {len(tasks_to_check)} tasks eligible for alarm check (not DONE, has due_at, alarm not yet triggered this session).")
-
-        for task in tasks_to_check:
-            print(f"  Checking task: '{task.description}' (ID: {task.id})")
-            print(f"    Status: {task.status.value}, Due at: {task.due_at}, Now: {now}")
-            time_until_due = task.due_at - now
-            seconds_until_due = time_until_due.total_seconds()
-            print(f"    Time until due: {time_until_due} (Seconds: {seconds_until_due})")
-            
-            # Trigger alarm if due within the next 12 hours (and not already due)
-            # Use a small epsilon to handle floating point comparisons near zero
-            if seconds_until_due > 0 and seconds_until_due <= 12 * 3600: # 12 hours = 43200 seconds
-                print(f"    ALARM TRIGGERING for task: {task.description}")
-                task_list = self.data_manager.get_task_list_by_id(task.assigned_to)
-                member_name = task_list.name if task_list else "an unassigned list"
-                
-                notification_title = "Team Task Due Soon!"
-                notification_message = f"Task '{task.description}' assigned to {member_name} is due within 12 hours ({task.due_at.strftime('%Y-%m-%d %H:%M')})."
-
-                # We will now always use the more assertive QMessageBox for alarms.
-                self._show_qmessagebox_alarm(notification_title, notification_message)
-
-                self._triggered_alarms.add(task.id) # Mark alarm as triggered for this session
-            else:
-                print(f"    No alarm for task: {task.description}. (Condition: {seconds_until_due > 0} and {seconds_until_due <= 12 * 3600})")
+        for task in self.data_manager.take_due_alarms(now):
+            print(f"ALARM TRIGGERING for task: {task.description}")
+            task_list = self.data_manager.get_task_list_by_id(task.assigned_to)
+            member_name = task_list.name if task_list else "an unassigned list"
+            lead_time = self.data_manager.alarms.lead_time(task)
+
+            notification_title = "Team Task Due Soon!"
+            notification_message = (f"Task '{task.description}' assigned to {member_name} is due within "
+                                    f"{self._format_lead_time(lead_time)} ({task.due_at.strftime('%Y-%m-%d %H:%M')}).")
+
+            # We will now always use the more assertive QMessageBox for alarms.
+            self._show_qmessagebox_alarm(notification_title, notification_message)
+        self._arm_alarm_timer()
+
+    def _arm_alarm_timer(self):
+        next_alarm = self.data_manager.alarms.next_alarm_time()
+        if next_alarm is None:
+            self.alarm_timer.stop()
+            return
+        wait_ms = (next_alarm - QDateTime.currentDateTime().toPyDateTime()).total_seconds() * 1000
+        self.alarm_timer.start(int(min(max(wait_ms, 0), self.MAX_ALARM_WAIT_MS)))
+
+    @staticmethod
+    def _format_lead_time(lead_time) -> str:
+        minutes = int(lead_time.total_seconds() // 60)
+        if minutes % 60:
+            return f"{minutes} minutes"
+        hours = minutes // 60
+        return "1 hour" if hours == 1 else f"{hours} hours"
 
     def _show_qmessagebox_alarm(self, title: str, message: str):
         """Displays a modeless, always-on-top QMessageBox alarm, ensuring only one is shown at a time."""
@@ -521,7 +661,11 @@ class MainWindow(QMainWindow):
         # No need for a dialog here if we always save on close,
         # but good practice if there are unsaved changes that aren't auto-saved.
         print("Saving data on exit...")
-        self.data_manager.save_data()
+        self.data_manager.alarms.on_schedule_changed = None
+        for subscriber in (self.on_data_changed, self.workspace.on_data_changed,
+                           self.workspace.daily_todo_widget.on_data_changed):
+            self.data_manager.events.unsubscribe(subscriber)
+        self.data_manager.close() # Flushes the write-behind saver and writes a final snapshot
         super().closeEvent(event) # Call the base class closeEvent
 
     # def _load_original_background_image(self): # No longer needed
@@ -1,22 +1,51 @@
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTreeWidget, QTreeWidgetItem, QDialogButtonBox, QMenu, QMessageBox
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem, QDialogButtonBox,
+                             QMenu, QMessageBox, QCheckBox, QLineEdit)
 from PyQt6.QtCore import Qt, QPoint
-from typing import Union, Optional
+from typing import Dict, Iterator, Union, Optional, Set, Tuple
+from itertools import islice
 from ..data_manager import DataManager
 from ..data_models import Task, TaskList, TaskStatus, TaskPriority
+from ..events import (ChangeEvent, TASK_ADDED, TASK_UPDATED, TASK_DELETED, LIST_ADDED, LIST_UPDATED,
+                      LISTS_DELETED, RELOADED)
 from .dialogs import TaskEditDialog
 from datetime import datetime
 
+# Archive rows keep (segment name, Task) or a segment name here, never under UserRole,
+# so nothing treats an archived task as a live one
+ARCHIVE_ROLE = Qt.ItemDataRole.UserRole + 1
+
 class OverviewWindow(QDialog):
+    ARCHIVE_PAGE_SIZE = 200 # Search results shown per "Load more" click
+
     def __init__(self, data_manager: DataManager, parent=None):
         super().__init__(parent)
         self.data_manager = data_manager
         self.setWindowTitle("Task Lists Overview")
         self.setGeometry(150, 150, 800, 600)
+        self._list_items: Dict[str, QTreeWidgetItem] = {} # Top-level rows, by list id
+        self._task_items: Dict[str, QTreeWidgetItem] = {} # Task rows, by task id
+        self._archive_item: Optional[QTreeWidgetItem] = None # Last top-level row, while the archive is included
+        self._loaded_segments: Set[str] = set() # Segments whose rows were read in
+        self._archive_results: Optional[Iterator[Tuple[str, Task]]] = None # The running archive search
 
         self.layout = QVBoxLayout(self)
+
+        # --- Archive ---
+        archive_layout = QHBoxLayout()
+        self.include_archive_checkbox = QCheckBox("Include archive")
+        self.include_archive_checkbox.toggled.connect(self.on_include_archive_toggled)
+        archive_layout.addWidget(self.include_archive_checkbox)
+        self.archive_search_edit = QLineEdit()
+        self.archive_search_edit.setPlaceholderText("Search archived tasks and comments, then press Enter")
+        self.archive_search_edit.setEnabled(False)
+        self.archive_search_edit.returnPressed.connect(self.load_archive_rows)
+        archive_layout.addWidget(self.archive_search_edit)
+        self.layout.addLayout(archive_layout)
+
         self.tree = QTreeWidget()
         self.tree.setHeaderLabels(["List / Task", "Status", "Priority", "Due Date"])
         self.tree.itemDoubleClicked.connect(self.on_item_double_clicked)
+        self.tree.itemExpanded.connect(self.on_item_expanded)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
         self.layout.addWidget(self.tree)
@@ -31,36 +60,52 @@ class OverviewWindow(QDialog):
 
     def load_overview_data(self):
         self.tree.clear()
+        self._list_items = {}
+        self._task_items = {}
+        self._archive_item = None
         all_task_lists = sorted(self.data_manager.get_all_task_lists(), key=lambda tl: tl.name)
 
         if not all_task_lists:
             self._add_empty_message("No task lists found.")
-            return
-
-        for task_list in all_task_lists:
-            self._add_task_list_to_tree(task_list)
+        else:
+            for task_list in all_task_lists:
+                self._add_task_list_to_tree(task_list)
 
-        self.tree.expandAll()
-        for i in range(self.tree.columnCount()):
-            self.tree.resizeColumnToContents(i)
+            self.tree.expandAll()
+            for i in range(self.tree.columnCount()):
+                self.tree.resizeColumnToContents(i)
+        if self.include_archive_checkbox.isChecked():
+            self.load_archive_rows() # Added after expandAll so no segment gets read yet
 
     def _add_task_list_to_tree(self, task_list: TaskList):
         """Adds a task list and its tasks to the tree view."""
         list_item = QTreeWidgetItem(self.tree)
         list_item.setText(0, task_list.name)
+        list_item.setData(0, Qt.ItemDataRole.UserRole, task_list)
+        self._list_items[task_list.id] = list_item
         
         tasks = self.data_manager.get_tasks_for_task_list(task_list.id)
         
         if not tasks:
             self._add_empty_message("No tasks in this list.", parent=list_item)
         else:
-            sorted_tasks = sorted(tasks, key=lambda t: (t.due_at or datetime.max, t.priority.value))
+            sorted_tasks = sorted(tasks, key=self._task_sort_key)
             for task in sorted_tasks:
                 self._add_task_to_tree(list_item, task)
+        return list_item
 
-    def _add_task_to_tree(self, parent_item: QTreeWidgetItem, task: Task):
-        """Adds a single task item to the tree under its parent list."""
-        task_item = QTreeWidgetItem(parent_item)
+    @staticmethod
+    def _task_sort_key(task: Task):
+        return (task.due_at or datetime.max, task.priority.value)
+
+    def _add_task_to_tree(self, parent_item: QTreeWidgetItem, task: Task, index: Optional[int] = None):
+        """Adds a single task item to the tree under its parent list, at the end or at `index`."""
+        task_item = QTreeWidgetItem()
+        if index is None:
+            parent_item.addChild(task_item)
+        else:
+            parent_item.insertChild(index, task_item)
+        self._task_items[task.id] = task_item
         task_item.setText(0, task.description)
         task_item.setText(1, task.status.value)
         task_item.setText(2, task.priority.value)
@@ -75,13 +120,182 @@ class OverviewWindow(QDialog):
         item.setText(0, text)
         item.setDisabled(True)
 
+    @staticmethod
+    def _sorted_index(count: int, item_at, key, sort_key) -> int:
+        """Binary search for where an item with `key` goes among `count` sorted sibling rows."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if sort_key(item_at(middle).data(0, Qt.ItemDataRole.UserRole)) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @staticmethod
+    def _clear_empty_message(parent_item: QTreeWidgetItem):
+        if parent_item.childCount() == 1 and parent_item.child(0).data(0, Qt.ItemDataRole.UserRole) is None:
+            parent_item.takeChild(0)
+
+    def on_data_changed(self, event: ChangeEvent):
+        """Patches the rows affected by a change instead of rebuilding the whole tree."""
+        if event.kind == RELOADED:
+            self.load_overview_data()
+        elif event.kind in (TASK_ADDED, TASK_UPDATED):
+            self._remove_task_row(event.task.id)
+            list_item = self._list_items.get(event.task.assigned_to)
+            if list_item is not None:
+                self._clear_empty_message(list_item)
+                index = self._sorted_index(list_item.childCount(), list_item.child,
+                                           self._task_sort_key(event.task), self._task_sort_key)
+                self._add_task_to_tree(list_item, event.task, index)
+        elif event.kind == TASK_DELETED:
+            for task_id in event.ids:
+                self._remove_task_row(task_id)
+        elif event.kind in (LIST_ADDED, LIST_UPDATED):
+            self._place_list_row(event.task_list)
+        elif event.kind == LISTS_DELETED:
+            for list_id in event.ids:
+                list_item = self._list_items.pop(list_id, None)
+                if list_item is None:
+                    continue
+                # Its tasks were unassigned, so their rows leave with it
+                for i in range(list_item.childCount()):
+                    task = list_item.child(i).data(0, Qt.ItemDataRole.UserRole)
+                    if isinstance(task, Task):
+                        self._task_items.pop(task.id, None)
+                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(list_item))
+            if not self._list_items:
+                self.load_overview_data()
+
+    def _remove_task_row(self, task_id: str):
+        task_item = self._task_items.pop(task_id, None)
+        if task_item is None:
+            return
+        list_item = task_item.parent()
+        list_item.removeChild(task_item)
+        if list_item.childCount() == 0:
+            self._add_empty_message("No tasks in this list.", parent=list_item)
+
+    def _place_list_row(self, task_list: TaskList):
+        list_item = self._list_items.pop(task_list.id, None)
+        if list_item is None:
+            if not self._list_items:
+                self.load_overview_data() # Drops the "No task lists found." message
+                return
+            list_item = self._add_task_list_to_tree(task_list)
+            del self._list_items[task_list.id] # Counted again once placed
+            list_item.setExpanded(True)
+        list_item.setText(0, task_list.name)
+        list_item.setData(0, Qt.ItemDataRole.UserRole, task_list)
+        # Move the row to its place in name order
+        expanded = list_item.isExpanded()
+        self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(list_item))
+        index = self._sorted_index(len(self._list_items), self.tree.topLevelItem, # List rows come first
+                                   task_list.name, lambda tl: tl.name)
+        self.tree.insertTopLevelItem(index, list_item)
+        list_item.setExpanded(expanded)
+        self._list_items[task_list.id] = list_item
+
+    # --- Archive ---
+    def on_include_archive_toggled(self, checked: bool):
+        self.archive_search_edit.setEnabled(checked)
+        if checked:
+            self.load_archive_rows()
+        elif self._archive_item is not None:
+            self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(self._archive_item))
+            self._archive_item = None
+
+    def load_archive_rows(self):
+        """(Re)builds the archive row: one collapsed row per segment, or the first page of search results.
+
+        Segments are only read when their row is expanded, so including the archive costs
+        nothing until a segment is opened.
+        """
+        if not self.include_archive_checkbox.isChecked():
+            return
+        if self._archive_item is None:
+            self._archive_item = QTreeWidgetItem(self.tree)
+            self._archive_item.setText(0, "Archive")
+        self._archive_item.takeChildren()
+        self._loaded_segments = set()
+        self._archive_results = None
+        search_text = self.archive_search_edit.text().strip()
+        if search_text:
+            self._archive_item.setText(1, f"Matching '{search_text}'")
+            self._archive_results = self.data_manager.search_archive(search_text)
+            self._add_archive_results_page()
+        else:
+            segments = list(reversed(self.data_manager.archive.segments())) # Newest first
+            self._archive_item.setText(1, f"{sum(segment.live_count for segment in segments)} tasks")
+            for segment in segments:
+                segment_item = QTreeWidgetItem(self._archive_item)
+                days = f"{segment.first_day} to {segment.last_day}" if segment.first_day else "Undated"
+                segment_item.setText(0, days)
+                segment_item.setText(1, f"{segment.live_count} tasks")
+                segment_item.setData(0, ARCHIVE_ROLE, segment.name)
+                segment_item.setChildIndicatorPolicy(QTreeWidgetItem.ChildIndicatorPolicy.ShowIndicator)
+            if not segments:
+                self._add_empty_message("No archived tasks.", parent=self._archive_item)
+        self._archive_item.setExpanded(bool(search_text))
+
+    def on_item_expanded(self, item: QTreeWidgetItem):
+        """Reads a segment's tasks the first time its row is opened."""
+        segment_name = item.data(0, ARCHIVE_ROLE)
+        if not isinstance(segment_name, str) or segment_name in self._loaded_segments:
+            return
+        self._loaded_segments.add(segment_name)
+        tasks = sorted(self.data_manager.read_archive_segment(segment_name), key=self._task_sort_key)
+        for task in tasks:
+            self._add_archived_task_row(item, segment_name, task)
+        if not tasks:
+            self._add_empty_message("No tasks in this segment.", parent=item)
+
+    def _add_archive_results_page(self):
+        """Appends the next page of archive search results, reading segments only as far as needed."""
+        parent_item = self._archive_item
+        if parent_item.childCount() and parent_item.child(parent_item.childCount() - 1).data(0, ARCHIVE_ROLE) is None:
+            parent_item.takeChild(parent_item.childCount() - 1) # The "Load more" row
+        page = list(islice(self._archive_results, self.ARCHIVE_PAGE_SIZE))
+        for segment_name, task in page:
+            self._add_archived_task_row(parent_item, segment_name, task)
+        if len(page) == self.ARCHIVE_PAGE_SIZE:
+            more_item = QTreeWidgetItem(parent_item)
+            more_item.setText(0, "Load more results... (double-click)")
+        elif not parent_item.childCount():
+            self._add_empty_message("No archived tasks match.", parent=parent_item)
+
+    def _add_archived_task_row(self, parent_item: QTreeWidgetItem, segment_name: str, task: Task):
+        task_item = QTreeWidgetItem(parent_item)
+        task_item.setText(0, task.description)
+        task_item.setText(1, task.status.value)
+        task_item.setText(2, task.priority.value)
+        task_item.setText(3, task.due_at.strftime('%Y-%m-%d %H:%M') if task.due_at else "N/A")
+        task_item.setData(0, ARCHIVE_ROLE, (segment_name, task))
+        task_item.setForeground(0, Qt.GlobalColor.gray)
+
+    def restore_task(self, item: QTreeWidgetItem):
+        """Moves an archived task back into its list; the live row arrives as a change event."""
+        segment_name, task = item.data(0, ARCHIVE_ROLE)
+        if self.data_manager.restore_archived_task(task.id, segment_name) is None:
+            QMessageBox.warning(self, "Restore Failed", f"Could not restore the task '{task.description}'.")
+            return
+        parent_item = item.parent()
+        parent_item.removeChild(item)
+        segment = self.data_manager.archive.get_segment(parent_item.data(0, ARCHIVE_ROLE) or "")
+        if segment is not None:
+            parent_item.setText(1, f"{segment.live_count} tasks")
+
     def on_item_double_clicked(self, item: QTreeWidgetItem, column: int):
         """Handle double-clicking on a task to edit it."""
+        if (self._archive_results is not None and item.parent() is self._archive_item
+                and item.data(0, ARCHIVE_ROLE) is None and not item.isDisabled()):
+            self._add_archive_results_page()
+            return
         task = item.data(0, Qt.ItemDataRole.UserRole)
         if isinstance(task, Task):
             dialog = TaskEditDialog(task=task, data_manager=self.data_manager, parent=self)
-            if dialog.exec():
-                self.load_overview_data() # Refresh data in case of changes
+            dialog.exec() # Saved changes arrive as change events
 
     def show_context_menu(self, position: QPoint):
         """Shows a context menu for tasks in the overview."""
@@ -89,6 +303,14 @@ class OverviewWindow(QDialog):
         if not item:
             return
 
+        archived = item.data(0, ARCHIVE_ROLE)
+        if isinstance(archived, tuple):
+            menu = QMenu()
+            restore_action = menu.addAction("Restore Task")
+            restore_action.triggered.connect(lambda: self.restore_task(item))
+            menu.exec(self.tree.mapToGlobal(position))
+            return
+
         task = item.data(0, Qt.ItemDataRole.UserRole)
         if not isinstance(task, Task):
             return
@@ -110,10 +332,14 @@ class OverviewWindow(QDialog):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            if self.data_manager.delete_task(task.id):
-                self.load_overview_data() # Refresh the overview
+            self.data_manager.delete_task(task.id) # The row is removed by the change event
 
     def showEvent(self, event):
-        """Reload data when the window is shown."""
+        """Reload data when the window is shown, then follow changes while it stays open."""
         self.load_overview_data()
+        self.data_manager.events.subscribe(self.on_data_changed)
         super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.data_manager.events.unsubscribe(self.on_data_changed)
+        super().hideEvent(event)
@@ -0,0 +1,195 @@
+from PyQt6.QtWidgets import (QAbstractScrollArea, QDialog, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
+                             QCheckBox, QLabel, QDialogButtonBox)
+from PyQt6.QtGui import QPainter, QFontDatabase, QColor, QKeySequence, QShortcut
+from PyQt6.QtCore import Qt, QTimer
+from typing import Optional
+from ..mapped_text import MappedTextFile
+from ..utils import format_size
+
+
+class TextPreviewView(QAbstractScrollArea):
+    """Draws only the lines of a MappedTextFile that fit in the viewport, with line numbers."""
+
+    GUTTER_PADDING = 8
+
+    def __init__(self, text_file: MappedTextFile, parent=None):
+        super().__init__(parent)
+        self.text_file = text_file
+        self.highlight_line: Optional[int] = None # The line of the current search match
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.verticalScrollBar().valueChanged.connect(self.viewport().update)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        self.update_scroll_range()
+
+    def visible_line_count(self) -> int:
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+    def update_scroll_range(self):
+        """Called as the index grows, so the scroll bar covers the lines found so far."""
+        visible = self.visible_line_count()
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setRange(0, max(0, self.text_file.indexed_lines - visible))
+        scroll_bar.setPageStep(visible)
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+        self.horizontalScrollBar().setSingleStep(self.fontMetrics().horizontalAdvance("M") * 4)
+
+    def scroll_to_line(self, line_number: int):
+        self.text_file.line_offset(line_number) # Indexes up to the line, so the range reaches it
+        self.update_scroll_range()
+        self.verticalScrollBar().setValue(line_number - self.visible_line_count() // 2)
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scroll_range()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        metrics = self.fontMetrics()
+        line_height = metrics.lineSpacing()
+        first = self.verticalScrollBar().value()
+        lines = self.text_file.lines(first, self.visible_line_count() + 1)
+        gutter = metrics.horizontalAdvance(str(max(self.text_file.indexed_lines, first + len(lines)))) + self.GUTTER_PADDING
+        painter.fillRect(0, 0, gutter, self.viewport().height(), self.palette().window())
+
+        widest = 0
+        x_offset = self.horizontalScrollBar().value()
+        for row, text in enumerate(lines):
+            line_number = first + row
+            top = row * line_height
+            if line_number == self.highlight_line:
+                painter.fillRect(gutter, top, self.viewport().width() - gutter, line_height, QColor(255, 235, 150))
+            painter.setPen(self.palette().placeholderText().color())
+            painter.drawText(0, top, gutter - self.GUTTER_PADDING // 2, line_height,
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, str(line_number + 1))
+            painter.setPen(self.palette().text().color())
+            painter.setClipRect(gutter, 0, self.viewport().width() - gutter, self.viewport().height())
+            painter.drawText(gutter + self.GUTTER_PADDING // 2 - x_offset, top + metrics.ascent(), text)
+            painter.setClipping(False)
+            widest = max(widest, metrics.horizontalAdvance(text))
+        # The horizontal range follows the widest line on screen, since lines elsewhere are never measured
+        self.horizontalScrollBar().setRange(0, max(0, widest + gutter + self.GUTTER_PADDING - self.viewport().width(),
+                                                   self.horizontalScrollBar().value()))
+
+
+class TextPreviewDialog(QDialog):
+    """A read-only preview of a text attachment, however large.
+
+    The file is memory-mapped and only the visible lines are decoded. The line index
+    is built a slice at a time from a timer, and searches run the same way, so the
+    dialog stays responsive while a multi-gigabyte log is indexed or searched.
+    """
+    TICK_MS = 0 # Timer interval for indexing and search slices; 0 runs them whenever the event loop is idle
+    SEARCH_CHUNK = 32 << 20 # Bytes searched per slice
+
+    def __init__(self, file_path: str, title: str, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Preview - {title}")
+        self.resize(900, 650)
+        self.text_file = MappedTextFile(file_path)
+        self._search_at = 0 # Where the next search slice starts
+        self._searched = 0 # Bytes the running search has covered
+        self._next_search_from = 0 # Just past the last match
+        self._search_message = "" # Shown after the file size and line count
+        self._pending_match: Optional[int] = None # A match found before the index reached it
+
+        self.layout = QVBoxLayout(self)
+
+        search_layout = QHBoxLayout()
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Find in file, then press Enter")
+        self.search_edit.returnPressed.connect(self.find_next)
+        self.search_edit.textChanged.connect(self.stop_search)
+        self.match_case_checkbox = QCheckBox("Match case")
+        self.find_button = QPushButton("Find Next")
+        self.find_button.clicked.connect(self.find_next)
+        search_layout.addWidget(self.search_edit, 1)
+        search_layout.addWidget(self.match_case_checkbox)
+        search_layout.addWidget(self.find_button)
+        self.layout.addLayout(search_layout)
+        QShortcut(QKeySequence.StandardKey.Find, self, self.search_edit.setFocus)
+
+        self.view = TextPreviewView(self.text_file)
+        self.layout.addWidget(self.view, 1)
+
+        self.status_label = QLabel()
+        self.layout.addWidget(self.status_label)
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.button_box.rejected.connect(self.reject)
+        self.layout.addWidget(self.button_box)
+
+        self.index_timer = QTimer(self)
+        self.index_timer.timeout.connect(self.index_more)
+        self.index_timer.start(self.TICK_MS)
+        self.search_timer = QTimer(self)
+        self.search_timer.timeout.connect(self.search_more)
+        self.update_status()
+
+    def index_more(self):
+        if not self.text_file.index_more():
+            self.index_timer.stop()
+        self.view.update_scroll_range()
+        if self._pending_match is not None and self._pending_match < self.text_file.indexed_bytes:
+            self.show_match(self._pending_match)
+        else:
+            self.update_status()
+
+    def update_status(self, message: Optional[str] = None):
+        if message is not None:
+            self._search_message = message
+        text_file = self.text_file
+        status = f"{format_size(text_file.size)}, "
+        if text_file.fully_indexed:
+            status += f"{text_file.indexed_lines} lines"
+        else:
+            status += f"{text_file.indexed_lines}+ lines (counting, {100 * text_file.indexed_bytes // text_file.size}%)"
+        self.status_label.setText(f"{status}    {self._search_message}" if self._search_message else status)
+
+    def find_next(self):
+        """Starts searching from just past the last match, wrapping around at the end of the file."""
+        if not self.search_edit.text():
+            return
+        self._search_at = self._next_search_from if self._next_search_from < self.text_file.size else 0
+        self._searched = 0
+        self._pending_match = None
+        self.search_timer.start(self.TICK_MS)
+        self.update_status("Searching...")
+
+    def stop_search(self):
+        self.search_timer.stop()
+        self._next_search_from = 0
+        self._pending_match = None
+        self.update_status("")
+
+    def search_more(self):
+        text_file = self.text_file
+        end = min(self._search_at + self.SEARCH_CHUNK, text_file.size)
+        found = text_file.find(self.search_edit.text(), self._search_at, end, self.match_case_checkbox.isChecked())
+        self._searched += end - self._search_at
+        if found is not None:
+            self.search_timer.stop()
+            self._next_search_from = found + 1
+            if found < text_file.indexed_bytes:
+                self.show_match(found)
+            else: # Search runs ahead of the index; index_more() shows the match once lines are counted that far
+                self._pending_match = found
+                self.update_status("Match found, counting lines up to it...")
+        elif self._searched >= text_file.size:
+            self.search_timer.stop()
+            self.update_status("No matches")
+        else:
+            self._search_at = end if end < text_file.size else 0
+            self.update_status(f"Searching... {100 * self._searched // text_file.size}%")
+
+    def show_match(self, offset: int):
+        self._pending_match = None
+        line_number = self.text_file.line_at(offset)
+        self.view.highlight_line = line_number
+        self.view.scroll_to_line(line_number)
+        self.update_status(f"Match on line {line_number + 1}")
+
+    def done(self, result: int):
+        self.index_timer.stop()
+        self.search_timer.stop()
+        super().done(result)
+        self.text_file.close()
@@ -0,0 +1,211 @@
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+class SecondaryIndex:
+    """Maps a key computed from each item (e.g. a task's list id) to the ids of the items having it.
+
+    The index remembers the key each id was filed under, so after an item's attributes
+    were edited in place, update() moves it from its old key to its new one.
+    Ids under a key keep their insertion order.
+    """
+
+    def __init__(self, key_func: Callable[[Any], Hashable]):
+        self._key_func = key_func
+        self._ids_by_key: Dict[Hashable, Dict[str, None]] = {} # Dicts used as ordered sets
+        self._key_by_id: Dict[str, Hashable] = {}
+
+    def rebuild(self, items: Iterable[Tuple[str, Any]]):
+        self._ids_by_key.clear()
+        self._key_by_id.clear()
+        for item_id, item in items:
+            self.update(item_id, item)
+
+    def update(self, item_id: str, item):
+        """Adds an item, or refiles it if its key changed since it was last indexed."""
+        new_key = self._key_func(item)
+        if item_id in self._key_by_id:
+            old_key = self._key_by_id[item_id]
+            if old_key == new_key:
+                return
+            self._discard(item_id, old_key)
+        self._key_by_id[item_id] = new_key
+        self._ids_by_key.setdefault(new_key, {})[item_id] = None
+
+    def remove(self, item_id: str):
+        if item_id in self._key_by_id:
+            self._discard(item_id, self._key_by_id.pop(item_id))
+
+    def _discard(self, item_id: str, key: Hashable):
+        ids = self._ids_by_key.get(key)
+        if ids is not None:
+            ids.pop(item_id, None)
+            if not ids:
+                del self._ids_by_key[key]
+
+    def get(self, key: Hashable) -> List[str]:
+        return list(self._ids_by_key.get(key, ()))
+
+    def count(self, key: Hashable) -> int:
+        return len(self._ids_by_key.get(key, ()))
+
+
+class ReferenceCounter:
+    """Counts how many items refer to each key (e.g. how many tasks hold each attachment blob).
+
+    Like SecondaryIndex, it remembers the keys each id was counted under, so update()
+    after an in-place edit moves only the difference. An item counts once per key.
+    """
+
+    def __init__(self, keys_func: Callable[[Any], Iterable[Hashable]]):
+        self._keys_func = keys_func
+        self._counts: Dict[Hashable, int] = {}
+        self._keys_by_id: Dict[str, frozenset] = {}
+
+    def rebuild(self, items: Iterable[Tuple[str, Any]]):
+        self._counts.clear()
+        self._keys_by_id.clear()
+        for item_id, item in items:
+            self.update(item_id, item)
+
+    def update(self, item_id: str, item):
+        new_keys = frozenset(self._keys_func(item))
+        old_keys = self._keys_by_id.get(item_id, frozenset())
+        if new_keys == old_keys:
+            return
+        self._release(old_keys - new_keys)
+        for key in new_keys - old_keys:
+            self._counts[key] = self._counts.get(key, 0) + 1
+        if new_keys:
+            self._keys_by_id[item_id] = new_keys
+        else:
+            self._keys_by_id.pop(item_id, None)
+
+    def remove(self, item_id: str):
+        self._release(self._keys_by_id.pop(item_id, frozenset()))
+
+    def _release(self, keys: Iterable[Hashable]):
+        for key in keys:
+            count = self._counts[key] - 1
+            if count:
+                self._counts[key] = count
+            else:
+                del self._counts[key]
+
+    def count(self, key: Hashable) -> int:
+        return self._counts.get(key, 0)
+
+
+class _IntervalTree:
+    """Static centered interval tree over (start, end, item_id) triples with inclusive integer bounds."""
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, intervals: List[Tuple[int, int, str]]):
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = endpoints[len(endpoints) // 2]
+        overlapping, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                overlapping.append(interval)
+        self.by_start = sorted(overlapping, key=lambda interval: interval[0])
+        self.by_end = sorted(overlapping, key=lambda interval: interval[1], reverse=True)
+        self.left = _IntervalTree(left) if left else None
+        self.right = _IntervalTree(right) if right else None
+
+    def overlapping(self, low: int, high: int, found: List[str]):
+        node = self
+        while node is not None:
+            if high < node.center:
+                # Everything stored here reaches the center, so only the start bound matters
+                for start, _, item_id in node.by_start:
+                    if start > high:
+                        break
+                    found.append(item_id)
+                node = node.left
+            elif low > node.center:
+                for _, end, item_id in node.by_end:
+                    if end < low:
+                        break
+                    found.append(item_id)
+                node = node.right
+            else:
+                found.extend(item_id for _, _, item_id in node.by_start)
+                if node.left is not None:
+                    node.left.overlapping(low, high, found)
+                node = node.right
+
+
+class IntervalIndex:
+    """Indexes items by an inclusive (start, end) integer span, both globally and per group key.
+
+    Spans are kept in plain dicts; the interval tree for a group (or for all items) is built
+    on the first query after that group changed, so repeated queries over unchanged data
+    cost O(log n + k).
+    """
+
+    ALL = object() # Group key meaning "every item"
+
+    def __init__(self, key_func: Callable[[Any], Hashable], span_func: Callable[[Any], Optional[Tuple[int, int]]]):
+        self._key_func = key_func
+        self._span_func = span_func
+        self._spans_by_key: Dict[Hashable, Dict[str, Tuple[int, int]]] = {}
+        self._entry_by_id: Dict[str, Tuple[Hashable, Tuple[int, int]]] = {}
+        self._trees: Dict[Hashable, Optional[_IntervalTree]] = {} # Built lazily, dropped on change
+
+    def rebuild(self, items: Iterable[Tuple[str, Any]]):
+        self._spans_by_key.clear()
+        self._entry_by_id.clear()
+        self._trees.clear()
+        for item_id, item in items:
+            self.update(item_id, item)
+
+    def update(self, item_id: str, item):
+        """Adds an item, or refiles it if its group or span changed since it was last indexed."""
+        span = self._span_func(item)
+        key = self._key_func(item)
+        old_entry = self._entry_by_id.get(item_id)
+        if old_entry == (key, span):
+            return
+        if old_entry is not None:
+            self.remove(item_id)
+        if span is None:
+            return
+        self._entry_by_id[item_id] = (key, span)
+        self._spans_by_key.setdefault(key, {})[item_id] = span
+        self._invalidate(key)
+
+    def remove(self, item_id: str):
+        entry = self._entry_by_id.pop(item_id, None)
+        if entry is None:
+            return
+        key = entry[0]
+        spans = self._spans_by_key[key]
+        del spans[item_id]
+        if not spans:
+            del self._spans_by_key[key]
+        self._invalidate(key)
+
+    def _invalidate(self, key: Hashable):
+        self._trees.pop(key, None)
+        self._trees.pop(self.ALL, None)
+
+    def _tree(self, key: Hashable) -> Optional[_IntervalTree]:
+        if key not in self._trees:
+            if key is self.ALL:
+                intervals = [(span[0], span[1], item_id) for item_id, (_, span) in self._entry_by_id.items()]
+            else:
+                intervals = [(span[0], span[1], item_id) for item_id, span in self._spans_by_key.get(key, {}).items()]
+            self._trees[key] = _IntervalTree(intervals) if intervals else None
+        return self._trees[key]
+
+    def overlapping(self, low: int, high: int, key: Hashable = ALL) -> List[str]:
+        """Returns the ids of items whose span shares at least one point with [low, high]."""
+        found: List[str] = []
+        tree = self._tree(key)
+        if tree is not None and low <= high:
+            tree.overlapping(low, high, found)
+        return found
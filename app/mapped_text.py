@@ -0,0 +1,157 @@
+import bisect
+import mmap
+import os
+import re
+from array import array
+from typing import List, Optional
+
+
+class MappedTextFile:
+    """A read-only view of a text file of any size, by line number, through a memory map.
+
+    Nothing is read up front: the file is mapped, and a sparse index of line start
+    offsets (every STRIDE-th line) is extended as far as it is needed, or a chunk at a
+    time by index_more() while the file is shown. Reading a line walks at most STRIDE
+    lines from the nearest indexed one, so the index stays small for very long files.
+    """
+
+    STRIDE = 64 # Lines between indexed offsets
+    INDEX_CHUNK = 4 << 20 # Bytes scanned per index_more() call
+    LOOKUP_CHUNK = 64 << 10 # Bytes scanned at a time to reach a line that is not indexed yet
+    _STRIDE_LINES = re.compile(rb"(?:[^\n]*\n){%d}" % STRIDE) # One match per STRIDE lines
+    MAX_LINE_CHARS = 4096 # Longer lines are cut when shown
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # An empty file cannot be mapped; it reads as a single empty line
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._checkpoints = array('Q', [0]) # Start offset of lines 0, STRIDE, 2 * STRIDE, ...
+        self._indexed_lines = 0 # Lines whose ends were found
+        self._indexed_to = 0 # Bytes scanned
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def fully_indexed(self) -> bool:
+        return self._indexed_to >= self.size
+
+    @property
+    def indexed_bytes(self) -> int:
+        return self._indexed_to
+
+    @property
+    def indexed_lines(self) -> int:
+        """Lines known so far; the total once fully_indexed (a last line without a newline counts)."""
+        if self.fully_indexed and (self.size == 0 or self._data[self.size - 1:self.size] != b"\n"):
+            return self._indexed_lines + 1
+        return self._indexed_lines
+
+    def index_more(self, max_bytes: int = INDEX_CHUNK) -> bool:
+        """Scans up to `max_bytes` more of the file for line ends. Returns False once the whole file is indexed."""
+        if self.fully_indexed:
+            return False
+        end = min(self.size, self._indexed_to + max_bytes)
+        for start in range(self._indexed_to, end, self.INDEX_CHUNK): # Copies at most INDEX_CHUNK bytes at a time
+            self._indexed_lines += self._data[start:min(end, start + self.INDEX_CHUNK)].count(b"\n")
+        self._indexed_to = end
+        if self._indexed_lines >= len(self._checkpoints) * self.STRIDE:
+            # The regex steps over STRIDE lines per match in C, from the last checkpoint on;
+            # a group cut off by the end of the chunk is matched again next time
+            matches = self._STRIDE_LINES.finditer(self._data, self._checkpoints[-1], end)
+            self._checkpoints.extend(match.end() for match in matches)
+        return not self.fully_indexed
+
+    def _index_until_line(self, line_number: int):
+        while self._indexed_lines <= line_number and self.index_more(self.LOOKUP_CHUNK): # Until the line's end is known
+            pass
+
+    def _index_until_offset(self, offset: int):
+        if self._indexed_to <= offset:
+            self.index_more(offset + 1 - self._indexed_to)
+
+    def line_offset(self, line_number: int) -> Optional[int]:
+        """Where a line starts, or None past the end of the file."""
+        self._index_until_line(line_number)
+        if line_number >= self.indexed_lines:
+            return None
+        offset = self._checkpoints[line_number // self.STRIDE]
+        for _ in range(line_number % self.STRIDE):
+            offset = self._data.find(b"\n", offset) + 1
+        return offset
+
+    def lines(self, first: int, count: int) -> List[str]:
+        """Up to `count` lines from line `first` on, decoded, without their line ends."""
+        offset = self.line_offset(first)
+        lines = []
+        while offset is not None and len(lines) < count and (offset < self.size or not lines and self.size == 0):
+            end = self._data.find(b"\n", offset)
+            if end < 0:
+                end = self.size
+            raw = self._data[offset:min(end, offset + self.MAX_LINE_CHARS)]
+            text = raw.decode('utf-8', errors='replace').rstrip("\r")
+            lines.append(text + " …" if end - offset > self.MAX_LINE_CHARS else text)
+            offset = end + 1
+        return lines
+
+    def line_at(self, offset: int) -> int:
+        """The number of the line holding byte `offset`.
+
+        Indexes up to the offset first, which reads everything before it; callers on the
+        GUI thread wait until `indexed_bytes` has passed it instead.
+        """
+        self._index_until_offset(offset)
+        checkpoint = bisect.bisect_right(self._checkpoints, offset) - 1
+        line_start = self._checkpoints[checkpoint]
+        return checkpoint * self.STRIDE + self._data[line_start:offset].count(b"\n")
+
+    def find(self, text: str, start_offset: int = 0, end_offset: Optional[int] = None,
+             match_case: bool = False) -> Optional[int]:
+        """The byte offset of the first match of `text` starting in [start_offset, end_offset), or None.
+
+        Searching a large file in slices (see TextPreviewDialog) keeps each call short.
+        Without `match_case`, only ASCII letters match regardless of case.
+        """
+        needle = text.encode('utf-8')
+        end_offset = self.size if end_offset is None else min(end_offset, self.size)
+        if not needle or start_offset >= end_offset:
+            return None
+        # A match may run up to len(needle) - 1 bytes past end_offset
+        if match_case:
+            found = self._data.find(needle, start_offset, end_offset + len(needle) - 1)
+            return found if found >= 0 else None
+        needle = needle.lower()
+        offset = start_offset
+        while offset < end_offset:
+            chunk_end = min(end_offset, offset + self.INDEX_CHUNK)
+            found = self._data[offset:chunk_end + len(needle) - 1].lower().find(needle)
+            if found >= 0:
+                return offset + found
+            offset = chunk_end
+        return None
+
+
+def looks_like_text(file_path: str, sample_size: int = 8192) -> bool:
+    """Whether a file reads as text: no NUL bytes near its start, and valid UTF-8 there."""
+    try:
+        with open(file_path, 'rb') as f:
+            sample = f.read(sample_size)
+    except OSError:
+        return False
+    if b"\0" in sample:
+        return False
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return e.start >= len(sample) - 3 # A character cut off at the end of the sample
+    return True
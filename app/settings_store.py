@@ -0,0 +1,89 @@
+import os
+import json
+import threading
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class WorkspaceViewState:
+    """Per-workspace UI state that is restored when the workspace is opened again."""
+    selected_list_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        # Ignore keys written by other versions of the app
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+class SettingsStore:
+    """settings.json, read once and served from memory.
+
+    Writes only update the in-memory copy and mark it dirty; flush() writes the file
+    atomically, and is normally called by DataManager's write-behind saver.
+    """
+
+    VIEW_STATE_KEY = "workspace_view_state"
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self._settings: Dict[str, Any] = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict:
+        try:
+            with open(self.file_path, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._settings.get(key, default)
+
+    def set(self, key: str, value) -> bool:
+        """Updates a setting in memory. Returns True if the value changed."""
+        with self._lock:
+            if key in self._settings and self._settings[key] == value:
+                return False
+            self._settings[key] = value
+            self._dirty = True
+            return True
+
+    def get_view_state(self, workspace_id: str) -> WorkspaceViewState:
+        with self._lock:
+            state = self._settings.get(self.VIEW_STATE_KEY, {}).get(workspace_id, {})
+        return WorkspaceViewState.from_dict(state)
+
+    def set_view_state(self, workspace_id: str, state: WorkspaceViewState) -> bool:
+        with self._lock:
+            all_states = self._settings.setdefault(self.VIEW_STATE_KEY, {})
+            new_state = asdict(state)
+            if all_states.get(workspace_id) == new_state:
+                return False
+            all_states[workspace_id] = new_state
+            self._dirty = True
+            return True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._settings, indent=4)
+            self._dirty = False
+        tmp_path = self.file_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.file_path)
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+            with self._lock:
+                self._dirty = True # Try again on the next flush
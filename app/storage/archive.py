@@ -0,0 +1,215 @@
+import gzip
+import io
+import json
+import lzma
+import os
+from dataclasses import dataclass, field, asdict
+from typing import Iterator, List, Optional, Tuple
+
+# Compression per segment, picked by file extension so older segments stay readable after a switch
+COMPRESSIONS = {
+    'gzip': (gzip.open, ".jsonl.gz"),
+    'lzma': (lzma.open, ".jsonl.xz"),
+}
+
+
+@dataclass
+class ArchiveSegment:
+    name: str # File name inside the archive folder
+    count: int = 0 # Tasks written to the segment, restored ones included
+    size: int = 0 # Bytes written by committed appends; anything past it is a torn append
+    first_day: Optional[str] = None # Range of the archived tasks' due (or creation) days, ISO dates
+    last_day: Optional[str] = None
+    restored: List[str] = field(default_factory=list) # Ids taken back out of the segment
+
+    @property
+    def live_count(self) -> int:
+        return self.count - len(self.restored)
+
+
+class _CommittedBytes(io.RawIOBase):
+    """Reads a segment file only up to its committed size, so a torn append is never seen."""
+
+    def __init__(self, path: str, size: int):
+        self._file = open(path, 'rb')
+        self._left = size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = min(len(buffer), self._left)
+        if count <= 0:
+            return 0
+        read = self._file.readinto(memoryview(buffer)[:count])
+        self._left -= read
+        return read
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _task_day(task_dict: dict) -> Optional[str]:
+    timestamp = task_dict.get('due_at') or task_dict.get('created_at')
+    return timestamp[:10] if timestamp else None
+
+
+class TaskArchive:
+    """Cold storage for finished tasks: compressed, append-only segments of task dicts.
+
+    Archived tasks are stored whole, comments included, one JSON object per line. New
+    tasks are appended to the newest segment as another compressed member until it holds
+    SEGMENT_MAX_TASKS, then a new segment is started. A manifest records each segment's
+    size after every committed append: readers ignore anything past it, and the next
+    append cuts off what a crash mid-append left behind. Restoring a task only records its id in the manifest; a segment is deleted once
+    every task in it was restored. Nothing is read until the archive is first used.
+    """
+
+    SEGMENT_MAX_TASKS = 1000
+    MANIFEST = "manifest.json"
+
+    def __init__(self, archive_dir: str, compression: str = 'gzip'):
+        self.archive_dir = archive_dir
+        if compression not in COMPRESSIONS:
+            print(f"Warning: Unknown archive compression '{compression}'. Using gzip.")
+            compression = 'gzip'
+        self.compression = compression
+        self._segments: Optional[List[ArchiveSegment]] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, name)
+
+    def _open(self, name: str, mode: str, fileobj=None):
+        for opener, extension in COMPRESSIONS.values():
+            if name.endswith(extension):
+                return opener(fileobj or self._path(name), mode)
+        raise ValueError(f"Unknown archive segment type: {name}")
+
+    # --- Manifest ---
+    def segments(self) -> List[ArchiveSegment]:
+        """The segments, oldest first."""
+        if self._segments is None:
+            self._segments = self._load_manifest()
+        return self._segments
+
+    def reload(self):
+        """Forgets the cached manifest, e.g. to see segments another instance appended."""
+        self._segments = None
+
+    def _load_manifest(self) -> List[ArchiveSegment]:
+        try:
+            with open(self._path(self.MANIFEST), 'r', encoding='utf-8') as f:
+                segments = [ArchiveSegment(**entry) for entry in json.load(f).get("segments", [])]
+        except FileNotFoundError:
+            return []
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"Error: Could not read archive manifest {self._path(self.MANIFEST)}: {e}")
+            return []
+        return segments
+
+    def _save_manifest(self):
+        file_path = self._path(self.MANIFEST)
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"segments": [asdict(segment) for segment in self.segments()]}, f, indent=4)
+        os.replace(tmp_path, file_path)
+
+    # --- Writing ---
+    def append(self, task_dicts: List[dict]) -> bool:
+        """Appends tasks to the archive. Returns True once they are on disk and in the manifest.
+
+        With a shared data folder, callers hold the folder lock: only a writer may cut off
+        a torn append, since to anyone else it looks like an append in progress.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        segments = self.segments()
+        try:
+            position = 0
+            while position < len(task_dicts):
+                segment = segments[-1] if segments else None
+                if segment is None or segment.count >= self.SEGMENT_MAX_TASKS:
+                    segment = ArchiveSegment(name=f"segment-{self._next_number():06d}{COMPRESSIONS[self.compression][1]}")
+                    segments.append(segment)
+                elif os.path.getsize(self._path(segment.name)) > segment.size:
+                    # Cut off an append that was interrupted before the manifest recorded it
+                    os.truncate(self._path(segment.name), segment.size)
+                batch = task_dicts[position:position + self.SEGMENT_MAX_TASKS - segment.count]
+                with self._open(segment.name, 'at') as f: # A new compressed member at the end
+                    for task_dict in batch:
+                        f.write(json.dumps(task_dict, ensure_ascii=False, separators=(',', ':')) + "\n")
+                segment.size = os.path.getsize(self._path(segment.name))
+                segment.count += len(batch)
+                days = [day for day in map(_task_day, batch) if day]
+                if days:
+                    segment.first_day = min(days + [segment.first_day or days[0]])
+                    segment.last_day = max(days + [segment.last_day or days[0]])
+                position += len(batch)
+            self._save_manifest()
+            return True
+        except (OSError, TypeError) as e:
+            print(f"Error: Could not write to the archive in {self.archive_dir}: {e}")
+            self._segments = None # Re-read the last committed state
+            return False
+
+    def _next_number(self) -> int:
+        segments = self.segments()
+        return int(segments[-1].name.split("-")[1].split(".")[0]) + 1 if segments else 1
+
+    def remove(self, segment_name: str, task_id: str):
+        """Takes a task out of the archive, e.g. after it was restored."""
+        segment = self.get_segment(segment_name)
+        if segment is None or task_id in segment.restored:
+            return
+        segment.restored.append(task_id)
+        if segment.live_count <= 0:
+            self.segments().remove(segment)
+            self._save_manifest()
+            try:
+                os.remove(self._path(segment.name))
+            except FileNotFoundError:
+                pass
+        else:
+            self._save_manifest()
+
+    # --- Reading ---
+    def get_segment(self, name: str) -> Optional[ArchiveSegment]:
+        return next((segment for segment in self.segments() if segment.name == name), None)
+
+    def read_segment(self, segment: ArchiveSegment) -> Iterator[dict]:
+        """Yields the tasks still archived in one segment, decompressing as it goes."""
+        restored = set(segment.restored)
+        try:
+            with io.BufferedReader(_CommittedBytes(self._path(segment.name), segment.size)) as committed, \
+                    self._open(segment.name, 'rt', committed) as f:
+                for line in f:
+                    task_dict = json.loads(line)
+                    if task_dict['id'] not in restored:
+                        yield task_dict
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            print(f"Error: Could not read archive segment {segment.name}: {e}")
+
+    def search(self, text: Optional[str] = None, list_id: Optional[str] = None) -> Iterator[Tuple[ArchiveSegment, dict]]:
+        """Yields (segment, task) for archived tasks matching every given filter, newest segment first.
+
+        `text` is matched, ignoring case, against the description and the comments.
+        """
+        needle = text.casefold() if text else None
+        for segment in reversed(self.segments()):
+            for task_dict in self.read_segment(segment):
+                if list_id is not None and task_dict.get('assigned_to') != list_id:
+                    continue
+                if needle and needle not in task_dict['description'].casefold() and not any(
+                        needle in comment['text'].casefold() for comment in task_dict.get('comments', [])):
+                    continue
+                yield segment, task_dict
+
+    def find(self, task_id: str, segment_name: Optional[str] = None) -> Optional[Tuple[ArchiveSegment, dict]]:
+        segments = [self.get_segment(segment_name)] if segment_name else list(reversed(self.segments()))
+        for segment in segments:
+            if segment is None:
+                continue
+            for task_dict in self.read_segment(segment):
+                if task_dict['id'] == task_id:
+                    return segment, task_dict
+        return None
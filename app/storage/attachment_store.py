@@ -0,0 +1,160 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+# References to stored blobs look like "sha256:<hex digest>/<file name>"
+BLOB_PREFIX = "sha256:"
+CHUNK_SIZE = 1 << 20
+
+
+# Called with the number of bytes just read, so callers can show progress
+ProgressCallback = Callable[[int], None]
+
+
+class TransferCancelled(Exception):
+    """Raised when a copy into or out of the store is cancelled part way."""
+
+
+def _chunks(f: BinaryIO, progress: Optional[ProgressCallback], cancel: Optional[threading.Event]) -> Iterator[bytes]:
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelled()
+        yield chunk
+        if progress:
+            progress(len(chunk))
+
+
+def blob_digest(ref: str) -> Optional[str]:
+    """The content hash a reference points to, or None for an older per-task file path."""
+    if ref.startswith(BLOB_PREFIX):
+        return ref[len(BLOB_PREFIX):].split("/", 1)[0]
+    return None
+
+
+def attachment_name(ref: str) -> str:
+    """The file name to show for an attachment reference."""
+    if ref.startswith(BLOB_PREFIX):
+        return ref.split("/", 1)[1]
+    return os.path.basename(ref)
+
+
+class AttachmentStore:
+    """Attachment files stored once per content, named by their SHA-256 hash.
+
+    Blobs live in attachments/blobs/<first two hex digits>/<hex digest>. Tasks hold
+    references ("sha256:<hex digest>/<file name>") instead of copies, so a file attached
+    to many tasks is stored once. DataManager counts the references; blobs nothing refers
+    to any more are removed by DataManager.collect_attachment_blobs. Files attached before
+    the store existed keep their `<task_id>/<file name>` paths and resolve as before.
+    """
+
+    def __init__(self, attachments_dir: str):
+        self.attachments_dir = attachments_dir
+        self.blobs_dir = os.path.join(attachments_dir, "blobs")
+        # (path, size, mtime_ns) -> digest, so attaching the same file again skips hashing it
+        self._digests_by_source: Dict[Tuple[str, int, int], str] = {}
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def path(self, ref: str) -> str:
+        """The file an attachment reference points to."""
+        digest = blob_digest(ref)
+        if digest is not None:
+            return self.blob_path(digest)
+        return os.path.join(self.attachments_dir, ref)
+
+    def add_file(self, src_path: str, progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[threading.Event] = None) -> str:
+        """Stores a file unless its content is stored already, and returns a reference to it.
+
+        The file is read in chunks: once to hash it and, if its content is new, once more
+        to copy it, so `progress` is told up to twice the file size in total. Setting
+        `cancel` stops the work between chunks with TransferCancelled. Raises OSError
+        if the file cannot be read or stored.
+        """
+        stat = os.stat(src_path)
+        source_key = (os.path.abspath(src_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests_by_source.get(source_key)
+        if digest is None:
+            digest = self._hash_file(src_path, progress, cancel)
+        elif progress:
+            progress(stat.st_size)
+        blob_path = self.blob_path(digest)
+        if os.path.exists(blob_path):
+            os.utime(blob_path) # Recently used; the collector leaves young blobs alone
+            if progress:
+                progress(stat.st_size)
+        else:
+            self._copy_in(src_path, digest, progress, cancel)
+        self._digests_by_source[source_key] = digest
+        return f"{BLOB_PREFIX}{digest}/{os.path.basename(src_path)}"
+
+    @staticmethod
+    def _hash_file(file_path: str, progress: Optional[ProgressCallback] = None,
+                   cancel: Optional[threading.Event] = None) -> str:
+        # Hashing first means a file that is stored already is only read, never written
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in _chunks(f, progress, cancel):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _copy_in(self, src_path: str, digest: str, progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[threading.Event] = None):
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        # Copy under a temporary name and check the content, so a blob is never partial or wrong
+        self._copy_verified(src_path, blob_path, digest, progress, cancel)
+
+    def copy_out(self, ref: str, dest_path: str, progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[threading.Event] = None):
+        """Copies an attachment to `dest_path`, which only appears once the whole file is there."""
+        self._copy_verified(self.path(ref), dest_path, blob_digest(ref), progress, cancel)
+
+    @staticmethod
+    def _copy_verified(src_path: str, dest_path: str, digest: Optional[str],
+                       progress: Optional[ProgressCallback], cancel: Optional[threading.Event]):
+        # The copy is written under a temporary name next to `dest_path`, flushed to disk and
+        # checked (size, and content hash when known) before it takes the final name
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dest_path)), suffix=".tmp")
+        try:
+            sha256 = hashlib.sha256()
+            written = 0
+            with open(src_path, 'rb') as src, os.fdopen(fd, 'wb') as dest:
+                for chunk in _chunks(src, progress, cancel):
+                    sha256.update(chunk)
+                    dest.write(chunk)
+                    written += len(chunk)
+                dest.flush()
+                os.fsync(dest.fileno())
+            if digest is not None and sha256.hexdigest() != digest:
+                raise OSError(f"{src_path} changed while it was being copied")
+            if os.path.getsize(tmp_path) != written:
+                raise OSError(f"The copy of {src_path} is incomplete")
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """Yields (digest, path, stat) for every stored blob."""
+        try:
+            fan_out_dirs = [entry.path for entry in os.scandir(self.blobs_dir) if entry.is_dir()]
+        except FileNotFoundError:
+            return
+        for fan_out_dir in fan_out_dirs:
+            for entry in os.scandir(fan_out_dir):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    yield entry.name, entry.path, entry.stat()
+
+    def remove_blob(self, digest: str):
+        try:
+            os.remove(self.blob_path(digest))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,100 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from .merge import apply_record
+
+
+class StorageBackend:
+    """Persistence layer behind DataManager.
+
+    DataManager keeps the working data in memory and talks to a backend in plain dicts
+    (TaskList.to_dict / Task.to_dict) and change records. Change records are the same
+    dicts the journal stores: put_list, delete_lists, put_task, delete_task, add_comment
+    and put_comments (which replaces a task's whole comment thread).
+
+    Comments are stored apart from the tasks and read one thread at a time through
+    load_comments(). Task dicts are headers without a 'comments' key; one that does carry
+    comments (older data, or data being migrated) replaces the task's thread with them.
+    """
+
+    # Whether DataManager.close() should write a full snapshot before closing the backend.
+    snapshot_on_close = False
+    # Whether load() leaves out finished (DONE) tasks, which DataManager then reads on demand
+    # through query_task_ids() and load_tasks(). Such a backend must not get snapshots of
+    # partly loaded data, since write_snapshot() drops the tasks it is not given.
+    finished_on_demand = False
+
+    def load(self) -> Tuple[Iterable[dict], Iterable[dict]]:
+        """Returns the stored task lists and tasks as dicts. Either may be a one-shot iterator."""
+        raise NotImplementedError
+
+    def query_task_ids(self, assigned_to: Optional[str] = None, status: Optional[str] = None,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None,
+                       older_than: Optional[datetime] = None) -> List[str]:
+        """Returns the ids of stored tasks matching every given filter (finished_on_demand backends)."""
+        raise NotImplementedError
+
+    def load_tasks(self, task_ids: List[str]) -> List[dict]:
+        """Returns the stored tasks with the given ids, in that order (finished_on_demand backends)."""
+        raise NotImplementedError
+
+    def load_attachment_refs(self, status: str) -> List[str]:
+        """Returns the attachment references of every stored task with the given status
+        (finished_on_demand backends)."""
+        raise NotImplementedError
+
+    def load_comments(self, task_id: str) -> List[dict]:
+        """Returns one task's comments, oldest first."""
+        raise NotImplementedError
+
+    def load_versions(self) -> Dict[str, int]:
+        """Returns the stored version of every task, changes included. Backends that can
+        read the versions without loading whole tasks should override this."""
+        task_lists_data, tasks_data = self.load()
+        task_lists = {list_dict['id']: list_dict for list_dict in task_lists_data}
+        tasks = {task_dict['id']: task_dict for task_dict in tasks_data}
+        for record in self.load_changes():
+            apply_record(task_lists, tasks, record)
+        return {task_id: task_dict.get('version', 0) for task_id, task_dict in tasks.items()}
+
+    def load_diff(self, known_versions: Dict[str, int]) -> Tuple[List[dict], List[dict], List[str]]:
+        """Compares the stored tasks with `known_versions` (task id -> version held in memory).
+
+        Returns every stored task list, the stored tasks that are not known or whose version
+        differs, and the ids of known tasks that are no longer stored. Backends that can
+        compare versions without loading whole tasks should override this. A finished_on_demand
+        backend leaves out the finished tasks that are not known, as its load() does.
+        """
+        task_lists_data, tasks_data = self.load()
+        task_lists = {list_dict['id']: list_dict for list_dict in task_lists_data}
+        tasks = {task_dict['id']: task_dict for task_dict in tasks_data}
+        for record in self.load_changes():
+            apply_record(task_lists, tasks, record)
+        changed_tasks = [task_dict for task_id, task_dict in tasks.items()
+                         if known_versions.get(task_id) != task_dict.get('version', 0)]
+        removed_ids = [task_id for task_id in known_versions if task_id not in tasks]
+        return list(task_lists.values()), changed_tasks, removed_ids
+
+    def load_changes(self) -> List[dict]:
+        """Returns change records written after the last snapshot, to replay on top of load()."""
+        return []
+
+    def is_empty(self) -> bool:
+        raise NotImplementedError
+
+    def write_changes(self, records: List[dict]):
+        """Persists a batch of change records."""
+        raise NotImplementedError
+
+    def needs_snapshot(self) -> bool:
+        """True if the backend wants a full write_snapshot() after the last write_changes()."""
+        return False
+
+    def write_snapshot(self, task_lists: List[dict], tasks: List[dict]) -> bool:
+        """Replaces the stored lists and task headers. Returns True on success.
+
+        The comment threads of the given tasks are kept; those of other tasks may be dropped.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
@@ -0,0 +1,82 @@
+import json
+import os
+from typing import List
+
+
+# Change records that touch comment threads. delete_task drops the task's thread.
+THREAD_OPS = ('add_comment', 'put_comments', 'delete_task')
+
+
+def task_header(task_dict: dict) -> dict:
+    """The task dict without its comments, as the JSON backends store it."""
+    return {key: value for key, value in task_dict.items() if key != 'comments'}
+
+
+class CommentStore:
+    """Keeps each task's comments in its own file, `<task_id>.ndjson`, one comment per line.
+
+    The JSON backends store task headers without comments and keep the threads here, so
+    loading the tasks never reads a comment, a thread is read only when it is shown, and
+    adding a comment appends one line to one file.
+    """
+
+    def __init__(self, comments_dir: str):
+        self.comments_dir = comments_dir
+        os.makedirs(self.comments_dir, exist_ok=True)
+
+    def _thread_path(self, task_id: str) -> str:
+        return os.path.join(self.comments_dir, f"{task_id}.ndjson")
+
+    def load(self, task_id: str) -> List[dict]:
+        comments = []
+        try:
+            with open(self._thread_path(task_id), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        comments.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line means we crashed mid-append; the comments before it are intact.
+                        print(f"Warning: Skipping unreadable comment in {self._thread_path(task_id)}")
+        except FileNotFoundError:
+            pass
+        return comments
+
+    def append(self, task_id: str, comments: List[dict]):
+        try:
+            with open(self._thread_path(task_id), 'a', encoding='utf-8') as f:
+                f.write("".join(json.dumps(comment, separators=(',', ':')) + "\n" for comment in comments))
+        except IOError as e:
+            print(f"IOError: Could not append to comment thread {self._thread_path(task_id)}. Error: {e}")
+
+    def replace(self, task_id: str, comments: List[dict]):
+        if not comments:
+            self.remove(task_id)
+            return
+        file_path = self._thread_path(task_id)
+        tmp_path = file_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("".join(json.dumps(comment, separators=(',', ':')) + "\n" for comment in comments))
+            os.replace(tmp_path, file_path)
+        except IOError as e:
+            print(f"IOError: Could not write comment thread {file_path}. Error: {e}")
+
+    def remove(self, task_id: str):
+        try:
+            os.remove(self._thread_path(task_id))
+        except FileNotFoundError:
+            pass
+
+    def apply(self, record: dict):
+        """Applies a change record that touches a thread. Task headers carrying comments replace their thread."""
+        op = record.get('op')
+        if op == 'add_comment':
+            self.append(record['task_id'], [record['comment']])
+        elif op == 'put_comments':
+            self.replace(record['task_id'], record['comments'])
+        elif op == 'delete_task':
+            self.remove(record['id'])
+        elif op == 'put_task' and 'comments' in record['task']:
+            self.replace(record['task']['id'], list(record['task']['comments']))
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class DataFolderLock:
+    """An exclusive lock shared by every instance of the app that uses the same data folder.
+
+    It is an OS-level lock on a small file, held only while data is read from or written
+    to the folder, so waiting for it costs little even with many instances. The file also
+    holds a write generation: a counter bumped before every write, so an instance can
+    tell whether anyone else wrote since it last looked. Re-entrant within a process.
+    """
+
+    def __init__(self, lock_file: str):
+        self.lock_file = lock_file
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.lock_file, 'a+b')
+                self._lock_file()
+            except BaseException:
+                if self._file:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock_file()
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def _lock_file(self):
+        if os.name == 'nt':
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1) # Retries for about 10 seconds
+                    return
+                except OSError:
+                    time.sleep(0.05)
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(self):
+        if os.name == 'nt':
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def generation(self) -> int:
+        """The write generation. Only call this while holding the lock."""
+        self._file.seek(0)
+        try:
+            return int(self._file.read().decode('ascii') or 0)
+        except ValueError:
+            return 0
+
+    def bump_generation(self) -> int:
+        """Announces a write to the other instances. Only call this while holding the lock."""
+        generation = self.generation() + 1
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(generation).encode('ascii'))
+        self._file.flush()
+        return generation
@@ -0,0 +1,54 @@
+import json
+from typing import List
+
+
+class ChangeJournal:
+    """Append-only log of DataManager mutations, stored as one JSON record per line.
+
+    The journal sits next to the JSON snapshot files. Every mutation appends a small
+    record instead of rewriting the snapshot, and a compaction (a full save) folds the
+    records back into the snapshot and truncates the log.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.record_count = 0 # Records appended since the last compaction
+
+    def append(self, records: List[dict]):
+        if not records:
+            return
+        lines = "".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records)
+        try:
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+            self.record_count += len(records)
+        except IOError as e:
+            print(f"IOError: Could not append to journal {self.file_path}. Error: {e}")
+
+    def read(self) -> List[dict]:
+        records = []
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line means we crashed mid-append; everything before it is intact.
+                        print(f"Warning: Skipping unreadable journal record at {self.file_path}:{line_number}")
+        except FileNotFoundError:
+            pass
+        self.record_count = len(records)
+        return records
+
+    def truncate(self):
+        try:
+            with open(self.file_path, 'w', encoding='utf-8'):
+                pass
+            self.record_count = 0
+        except IOError as e:
+            print(f"IOError: Could not truncate journal {self.file_path}. Error: {e}")
+
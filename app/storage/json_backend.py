@@ -0,0 +1,161 @@
+import os
+import json
+from typing import Iterator, List, Optional, Tuple
+from .base import StorageBackend
+from .comment_store import CommentStore, THREAD_OPS, task_header
+from .journal import ChangeJournal
+from .snapshot import load_binary_snapshot, save_binary_snapshot
+
+
+def iter_json_array(file_path: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    """Yields the elements of a top-level JSON array one at a time.
+
+    The file is read in chunks, so neither the whole text nor the whole list of decoded
+    elements has to be held in memory at once.
+    """
+    decoder = json.JSONDecoder()
+    try:
+        with open(file_path, 'r') as f:
+            buffer = f.read(chunk_size).lstrip()
+            if not buffer:
+                return
+            if not buffer.startswith('['):
+                print(f"Error: Expected a JSON list in {file_path}. Ignoring its contents.")
+                return
+            pos = 1
+            at_eof = False
+            while True:
+                # Skip whitespace and separators between elements
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) and buffer[pos] == ']':
+                    return
+                element = None
+                if pos < len(buffer):
+                    try:
+                        element, end = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        pass # Most likely the element continues past the end of the buffer
+                if element is None:
+                    if at_eof:
+                        print(f"Error: Could not decode JSON from {file_path}. Stopped after the last complete entry.")
+                        return
+                    chunk = f.read(chunk_size)
+                    at_eof = not chunk
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+                yield element
+                pos = end
+    except FileNotFoundError:
+        print(f"Info: File {file_path} not found. Will be created on save.")
+
+
+class JsonBackend(StorageBackend):
+    """The original task_lists.json / tasks.json files, optionally with a change journal.
+
+    Without a journal every change means a full rewrite of both files. With one, changes
+    are appended to the journal and folded into the files once it grows large. With a
+    snapshot file, every full save also writes a binary copy that loads much faster and
+    is preferred on load for as long as the JSON files have not changed since. Comments
+    are kept out of tasks.json, in a CommentStore next to it.
+    """
+
+    # Number of journal records after which the journal is folded back into the snapshot files.
+    JOURNAL_COMPACT_THRESHOLD = 500
+    snapshot_on_close = True
+
+    def __init__(self, task_lists_file: str, tasks_file: str, journal_file: Optional[str] = None,
+                 snapshot_file: Optional[str] = None, comments_dir: Optional[str] = None):
+        self.task_lists_file = task_lists_file
+        self.tasks_file = tasks_file
+        self.journal: Optional[ChangeJournal] = ChangeJournal(journal_file) if journal_file else None
+        self.snapshot_file = snapshot_file
+        self.comments = CommentStore(comments_dir or os.path.join(os.path.dirname(tasks_file), "comments"))
+
+    def _load_json(self, file_path: str) -> list:
+        try:
+            with open(file_path, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, list) else [] # Ensure it's a list
+        except FileNotFoundError:
+            print(f"Info: File {file_path} not found. Will be created on save.")
+            return []
+        except json.JSONDecodeError:
+            print(f"Error: Could not decode JSON from {file_path}. Returning empty list.")
+            return []
+        except Exception as e:
+            print(f"An unexpected error occurred while loading {file_path}: {e}")
+            return []
+
+    def _save_json(self, file_path: str, data: list) -> bool:
+        # Write to a temporary file first and rename it over the target, so a crash
+        # mid-write never leaves a truncated data file behind.
+        tmp_path = file_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, file_path)
+            print(f"Data successfully saved to {file_path}")
+            return True
+        except IOError as e:
+            print(f"IOError: Could not write to file {file_path}. Error: {e}")
+        except TypeError as e:
+            print(f"TypeError: Could not serialize data to JSON for {file_path}. Error: {e}")
+        except Exception as e:
+            print(f"An unexpected error occurred while saving to {file_path}. Error: {e}")
+        return False
+
+    def load(self) -> Tuple[List[dict], Iterator[dict]]:
+        if self.snapshot_file:
+            snapshot = load_binary_snapshot(self.snapshot_file, [self.task_lists_file, self.tasks_file])
+            if snapshot is not None:
+                return snapshot
+            print(f"Info: Binary snapshot {self.snapshot_file} is missing or stale. Loading JSON files.")
+        # Tasks are streamed; the (small) task list file is read in one go.
+        return self._load_json(self.task_lists_file), iter_json_array(self.tasks_file)
+
+    def load_comments(self, task_id: str) -> List[dict]:
+        return self.comments.load(task_id)
+
+    def load_changes(self) -> List[dict]:
+        return self.journal.read() if self.journal else []
+
+    def is_empty(self) -> bool:
+        journal_empty = (self.journal is None or not os.path.exists(self.journal.file_path)
+                         or os.path.getsize(self.journal.file_path) == 0)
+        return not os.path.exists(self.task_lists_file) and not os.path.exists(self.tasks_file) and journal_empty
+
+    def write_changes(self, records: List[dict]):
+        journal_records = []
+        for record in records:
+            # Threads are written straight to their files; only task and list changes are journaled
+            self.comments.apply(record)
+            op = record.get('op')
+            if op == 'put_task' and 'comments' in record['task']:
+                record = dict(record, task=task_header(record['task']))
+            if op not in THREAD_OPS or op == 'delete_task':
+                journal_records.append(record)
+        if self.journal:
+            self.journal.append(journal_records)
+
+    def needs_snapshot(self) -> bool:
+        if self.journal is None:
+            return True # Without a journal the snapshot is the only place changes go
+        return self.journal.record_count >= self.JOURNAL_COMPACT_THRESHOLD
+
+    def write_snapshot(self, task_lists: List[dict], tasks: List[dict]) -> bool:
+        for i, task_dict in enumerate(tasks):
+            if 'comments' in task_dict: # Moved out of the task headers
+                self.comments.replace(task_dict['id'], list(task_dict['comments']))
+                tasks[i] = task_header(task_dict)
+        lists_saved = self._save_json(self.task_lists_file, task_lists)
+        tasks_saved = self._save_json(self.tasks_file, tasks)
+
+        # The snapshot now contains everything the journal described.
+        # Keep the journal if either write failed, so the next startup can replay it.
+        if self.journal and lists_saved and tasks_saved:
+            self.journal.truncate()
+        if self.snapshot_file and lists_saved and tasks_saved:
+            save_binary_snapshot(self.snapshot_file, task_lists, tasks, [self.task_lists_file, self.tasks_file])
+        return lists_saved and tasks_saved
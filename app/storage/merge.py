@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from .comment_store import task_header
+
+
+@dataclass
+class TaskConflict:
+    """A change to a task that was not saved because another instance changed the task first."""
+    task_id: str
+    ours: Optional[dict] # The task header we tried to save; None if we tried to delete it
+    stored_version: Optional[int] # The version on disk; None if the task was deleted there
+
+    @property
+    def description(self) -> str:
+        return self.ours['description'] if self.ours else self.task_id
+
+
+def apply_record(task_lists: Dict[str, dict], tasks: Dict[str, dict], record: dict):
+    """Applies a change record to lists and task headers kept as dicts, by id."""
+    op = record.get('op')
+    if op == 'put_list':
+        task_lists[record['list']['id']] = record['list']
+    elif op == 'delete_lists':
+        ids = set(record['ids'])
+        for list_id in ids:
+            task_lists.pop(list_id, None)
+        for task_id, task_dict in tasks.items():
+            if task_dict.get('assigned_to') in ids:
+                tasks[task_id] = dict(task_dict, assigned_to=None)
+    elif op == 'put_task':
+        tasks[record['task']['id']] = task_header(record['task'])
+    elif op == 'delete_task':
+        tasks.pop(record['id'], None)
+
+
+def check_versions(records: List[dict], stored_versions: Dict[str, int]) -> Tuple[List[dict], List[TaskConflict]]:
+    """Splits change records into those that apply cleanly on top of the stored data and the conflicts.
+
+    A put_task saves version n of a task and applies only if version n - 1 is stored, or
+    the task is not stored at all and n is 1. A delete_task applies if the version it
+    was made against is still the stored one, or the task is gone already. All other
+    records apply as they are. `stored_versions` is updated with the records that apply.
+    """
+    accepted, conflicts = [], {}
+    for record in records:
+        op = record.get('op')
+        if op == 'put_task':
+            task_id = record['task']['id']
+            base_version = record['task'].get('version', 1) - 1
+            stored_version = stored_versions.get(task_id)
+            if stored_version != base_version and not (stored_version is None and base_version == 0):
+                conflicts[task_id] = TaskConflict(task_id, task_header(record['task']), stored_version)
+                continue
+            stored_versions[task_id] = record['task'].get('version', 1)
+        elif op == 'delete_task':
+            stored_version = stored_versions.get(record['id'])
+            if stored_version is not None and stored_version != record.get('version', stored_version):
+                conflicts[record['id']] = TaskConflict(record['id'], None, stored_version)
+                continue
+            stored_versions.pop(record['id'], None)
+        accepted.append(record)
+    return accepted, list(conflicts.values())
@@ -0,0 +1,147 @@
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+from .base import StorageBackend
+from .comment_store import CommentStore, task_header
+
+
+class ShardedJsonBackend(StorageBackend):
+    """Stores each task list and its tasks in its own file under data/lists/.
+
+    A shard is `<list_id>.json` holding {"list": ..., "tasks": [...]}; tasks without a
+    list live in `_unassigned.json`. A batch of changes only reads and rewrites the
+    shards it touches, so saving an edit costs the size of one list, not the dataset.
+    Comments are kept out of the shards, in a CommentStore.
+    """
+
+    UNASSIGNED_SHARD = "_unassigned"
+
+    def __init__(self, lists_dir: str, comments_dir: Optional[str] = None):
+        self.lists_dir = lists_dir
+        os.makedirs(self.lists_dir, exist_ok=True)
+        self.comments = CommentStore(comments_dir or os.path.join(os.path.dirname(lists_dir), "comments"))
+        self._shard_of: Dict[str, str] = {} # task id -> shard id
+
+    def _shard_path(self, shard_id: str) -> str:
+        return os.path.join(self.lists_dir, f"{shard_id}.json")
+
+    def _shard_ids_on_disk(self) -> List[str]:
+        return [name[:-len(".json")] for name in os.listdir(self.lists_dir) if name.endswith(".json")]
+
+    def _read_shard(self, shard_id: str) -> dict:
+        try:
+            with open(self._shard_path(shard_id), 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError:
+            print(f"Error: Could not decode JSON from {self._shard_path(shard_id)}. Treating shard as empty.")
+            data = {}
+        # Keep tasks keyed by id while a batch is applied
+        return {"list": data.get("list"), "tasks": {t['id']: t for t in data.get("tasks", [])}}
+
+    def _write_shard(self, shard_id: str, shard: dict) -> bool:
+        file_path = self._shard_path(shard_id)
+        tmp_path = file_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({"list": shard["list"], "tasks": list(shard["tasks"].values())}, f, indent=4)
+            os.replace(tmp_path, file_path)
+            return True
+        except (IOError, TypeError) as e:
+            print(f"Error: Could not write shard {file_path}. Error: {e}")
+            return False
+
+    def _drop_shard(self, shard_id: str):
+        try:
+            os.remove(self._shard_path(shard_id))
+        except FileNotFoundError:
+            pass
+
+    # --- Loading ---
+    def load(self) -> Tuple[List[dict], List[dict]]:
+        task_lists, tasks = [], []
+        self._shard_of.clear()
+        for shard_id in self._shard_ids_on_disk():
+            shard = self._read_shard(shard_id)
+            if shard["list"]:
+                task_lists.append(shard["list"])
+            for task_id, task_dict in shard["tasks"].items():
+                self._shard_of[task_id] = shard_id
+                tasks.append(task_dict)
+        return task_lists, tasks
+
+    def load_comments(self, task_id: str) -> List[dict]:
+        return self.comments.load(task_id)
+
+    def is_empty(self) -> bool:
+        return not self._shard_ids_on_disk()
+
+    # --- Writing ---
+    def write_changes(self, records: List[dict]):
+        shards: Dict[str, dict] = {} # Dirty shards, read from disk on first touch
+        dropped = set()
+
+        def shard(shard_id: str) -> dict:
+            if shard_id not in shards:
+                shards[shard_id] = self._read_shard(shard_id)
+                dropped.discard(shard_id)
+            return shards[shard_id]
+
+        for record in records:
+            self.comments.apply(record)
+            op = record.get('op')
+            if op == 'put_list':
+                shard(record['list']['id'])["list"] = record['list']
+            elif op == 'delete_lists':
+                for list_id in record['ids']:
+                    # Tasks outlive their list as unassigned tasks
+                    for task_id, task_dict in shard(list_id)["tasks"].items():
+                        task_dict['assigned_to'] = None
+                        shard(self.UNASSIGNED_SHARD)["tasks"][task_id] = task_dict
+                        self._shard_of[task_id] = self.UNASSIGNED_SHARD
+                    del shards[list_id]
+                    dropped.add(list_id)
+            elif op == 'put_task':
+                task_dict = task_header(record['task'])
+                new_shard_id = task_dict.get('assigned_to') or self.UNASSIGNED_SHARD
+                old_shard_id = self._shard_of.get(task_dict['id'])
+                if old_shard_id and old_shard_id != new_shard_id:
+                    shard(old_shard_id)["tasks"].pop(task_dict['id'], None)
+                shard(new_shard_id)["tasks"][task_dict['id']] = task_dict
+                self._shard_of[task_dict['id']] = new_shard_id
+            elif op == 'delete_task':
+                old_shard_id = self._shard_of.pop(record['id'], None)
+                if old_shard_id:
+                    shard(old_shard_id)["tasks"].pop(record['id'], None)
+            elif op in ('add_comment', 'put_comments'):
+                pass # Only the comment store changes
+            else:
+                print(f"Warning: Ignoring unknown change record: {record}")
+
+        for shard_id, shard_data in shards.items():
+            if shard_data["list"] is None and not shard_data["tasks"]:
+                self._drop_shard(shard_id) # e.g. the unassigned shard after its last task was deleted
+            else:
+                self._write_shard(shard_id, shard_data)
+        for shard_id in dropped:
+            self._drop_shard(shard_id)
+
+    def write_snapshot(self, task_lists: List[dict], tasks: List[dict]) -> bool:
+        shards: Dict[str, dict] = {list_dict['id']: {"list": list_dict, "tasks": {}} for list_dict in task_lists}
+        self._shard_of.clear()
+        for task_dict in tasks:
+            if 'comments' in task_dict:
+                self.comments.replace(task_dict['id'], list(task_dict['comments']))
+                task_dict = task_header(task_dict)
+            shard_id = task_dict.get('assigned_to')
+            if shard_id not in shards:
+                shard_id = self.UNASSIGNED_SHARD
+                shards.setdefault(shard_id, {"list": None, "tasks": {}})
+            shards[shard_id]["tasks"][task_dict['id']] = task_dict
+            self._shard_of[task_dict['id']] = shard_id
+
+        saved = all([self._write_shard(shard_id, shard) for shard_id, shard in shards.items()])
+        for stale_shard_id in set(self._shard_ids_on_disk()) - set(shards):
+            self._drop_shard(stale_shard_id)
+        return saved
@@ -0,0 +1,187 @@
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from ..data_models import TaskStatus, TaskPriority
+
+# Binary snapshot layout (little endian):
+#   header | source fingerprints | string offsets | string blob | lists | tasks | attachments
+# Every string is stored once in the string table and referenced by index. Enums are
+# stored as their position in the enum, datetimes as microseconds since 1970-01-01
+# (naive, like the datetimes the app uses), and lists/tasks as fixed-size records.
+# Comments live in the comment store, not in the snapshot.
+MAGIC = b"MTSNAP04"
+_OLDER_MAGIC = b"MTSNAP" # Snapshots of an older layout are treated as stale and rewritten
+_HEADER = struct.Struct("<8sIIIIIQ") # magic, sources, strings, lists, tasks, attachments, blob bytes
+_SOURCE = struct.Struct("<qq") # mtime_ns, size of a file the snapshot was written from
+_LIST = struct.Struct("<IIIB") # id, name, category, is_pinned
+_TASK = struct.Struct("<IIBBBqqqIIIiI") # id, description, status, priority, is_pinned, created_at, start_at,
+                                        # due_at, assigned_to, first attachment, attachment count,
+                                        # alarm lead minutes (NO_LEAD if unset), version
+
+NO_STRING = 0xFFFFFFFF
+NO_TIME = -(1 << 63)
+NO_LEAD = -1
+EPOCH = datetime(1970, 1, 1)
+_STATUSES = list(TaskStatus)
+_PRIORITIES = list(TaskPriority)
+
+
+def _source_fingerprints(source_files: List[str]) -> List[Tuple[int, int]]:
+    fingerprints = []
+    for file_path in source_files:
+        stat = os.stat(file_path)
+        fingerprints.append((stat.st_mtime_ns, stat.st_size))
+    return fingerprints
+
+
+def _to_micros(value: Optional[str]) -> int:
+    if not value:
+        return NO_TIME
+    return (datetime.fromisoformat(value) - EPOCH) // timedelta(microseconds=1)
+
+
+def save_binary_snapshot(file_path: str, task_lists: List[dict], tasks: List[dict], source_files: List[str]) -> bool:
+    """Writes lists and tasks (as produced by to_dict) into a compact binary snapshot.
+
+    `source_files` are the files the data was just saved to; their size and mtime are
+    recorded so that a later load can tell whether the snapshot still matches them.
+    """
+    string_index = {}
+    strings = []
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        index = string_index.get(value)
+        if index is None:
+            index = string_index[value] = len(strings)
+            strings.append(value)
+        return index
+
+    try:
+        list_records = bytearray()
+        for list_dict in task_lists:
+            list_records += _LIST.pack(intern(list_dict['id']), intern(list_dict['name']),
+                                       intern(list_dict.get('category', 'default')), list_dict.get('is_pinned', False))
+
+        task_records = bytearray()
+        attachment_refs = array('I')
+        for task_dict in tasks:
+            attachments = task_dict.get('attachments', [])
+            task_records += _TASK.pack(
+                intern(task_dict['id']), intern(task_dict['description']),
+                _STATUSES.index(TaskStatus[task_dict['status']]),
+                _PRIORITIES.index(TaskPriority[task_dict['priority']]),
+                task_dict.get('is_pinned', False),
+                _to_micros(task_dict.get('created_at')), _to_micros(task_dict.get('start_at')),
+                _to_micros(task_dict.get('due_at')), intern(task_dict.get('assigned_to')),
+                len(attachment_refs), len(attachments),
+                NO_LEAD if task_dict.get('alarm_lead_minutes') is None else task_dict['alarm_lead_minutes'],
+                task_dict.get('version', 0))
+            attachment_refs.extend(intern(path) for path in attachments)
+
+        # Offsets are character positions in the decoded blob, so a reader decodes it once and slices.
+        offsets = array('I', [0])
+        for value in strings:
+            offsets.append(offsets[-1] + len(value))
+        blob = "".join(strings).encode('utf-8')
+        fingerprints = _source_fingerprints(source_files)
+
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, len(fingerprints), len(strings), len(task_lists), len(tasks),
+                                 len(attachment_refs), len(blob)))
+            for mtime_ns, size in fingerprints:
+                f.write(_SOURCE.pack(mtime_ns, size))
+            f.write(offsets.tobytes())
+            f.write(blob)
+            f.write(list_records)
+            f.write(task_records)
+            f.write(attachment_refs.tobytes())
+        os.replace(tmp_path, file_path)
+        return True
+    except (OSError, KeyError, ValueError, TypeError, OverflowError, struct.error) as e:
+        print(f"Error: Could not write binary snapshot {file_path}. Error: {e}")
+        return False
+
+
+def load_binary_snapshot(file_path: str, source_files: List[str]) -> Optional[Tuple[List[dict], List[dict]]]:
+    """Reads a snapshot back into list and task dicts, or returns None if it is missing or stale.
+
+    Task datetimes come back as datetime objects, which Task.from_dict accepts directly,
+    and without comments, which the snapshot does not keep.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _decode_snapshot(memoryview(mm), source_files)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, IndexError, BufferError, struct.error) as e:
+        print(f"Warning: Ignoring unreadable binary snapshot {file_path}. Error: {e}")
+        return None
+
+
+def _decode_snapshot(view: memoryview, source_files: List[str]) -> Optional[Tuple[List[dict], List[dict]]]:
+    try:
+        (magic, source_count, string_count, list_count, task_count,
+         attachment_count, blob_size) = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            if magic.startswith(_OLDER_MAGIC):
+                return None
+            raise ValueError("not a MyTasks snapshot")
+        pos = _HEADER.size
+        fingerprints = [_SOURCE.unpack_from(view, pos + i * _SOURCE.size) for i in range(source_count)]
+        pos += source_count * _SOURCE.size
+        try:
+            if fingerprints != _source_fingerprints(source_files):
+                return None # The JSON files changed since the snapshot was written
+        except FileNotFoundError:
+            return None
+
+        offsets = array('I')
+        offsets.frombytes(view[pos:pos + (string_count + 1) * offsets.itemsize])
+        pos += (string_count + 1) * offsets.itemsize
+        text = str(view[pos:pos + blob_size], 'utf-8')
+        pos += blob_size
+        strings = [text[offsets[i]:offsets[i + 1]] for i in range(string_count)]
+
+        task_lists = []
+        end = pos + list_count * _LIST.size
+        for id_index, name_index, category_index, is_pinned in _LIST.iter_unpack(view[pos:end]):
+            task_lists.append({"id": strings[id_index], "name": strings[name_index],
+                               "category": strings[category_index], "is_pinned": bool(is_pinned)})
+        pos = end
+
+        task_records = view[pos:pos + task_count * _TASK.size].tobytes()
+        pos += task_count * _TASK.size
+        attachment_refs = array('I')
+        attachment_refs.frombytes(view[pos:pos + attachment_count * attachment_refs.itemsize])
+    finally:
+        view.release()
+
+    statuses = [status.name for status in _STATUSES]
+    priorities = [priority.name for priority in _PRIORITIES]
+    tasks = []
+    for (id_index, description_index, status, priority, is_pinned, created_at, start_at, due_at,
+         assigned_to, first_attachment, attachments_len,
+         alarm_lead_minutes, version) in _TASK.iter_unpack(task_records):
+        tasks.append({
+            "id": strings[id_index],
+            "description": strings[description_index],
+            "status": statuses[status],
+            "priority": priorities[priority],
+            "attachments": [strings[i] for i in attachment_refs[first_attachment:first_attachment + attachments_len]]
+                           if attachments_len else [],
+            "created_at": None if created_at == NO_TIME else EPOCH + timedelta(0, 0, created_at),
+            "start_at": None if start_at == NO_TIME else EPOCH + timedelta(0, 0, start_at),
+            "due_at": None if due_at == NO_TIME else EPOCH + timedelta(0, 0, due_at),
+            "assigned_to": None if assigned_to == NO_STRING else strings[assigned_to],
+            "is_pinned": bool(is_pinned),
+            "alarm_lead_minutes": None if alarm_lead_minutes == NO_LEAD else alarm_lead_minutes,
+            "version": version
+        })
+    return task_lists, tasks
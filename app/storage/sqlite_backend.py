@@ -0,0 +1,282 @@
+import json
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from .base import StorageBackend
+from ..data_models import TaskStatus
+
+
+class SqliteBackend(StorageBackend):
+    """Stores task lists, tasks and comments as rows in a WAL-mode SQLite database.
+
+    Every change record becomes a handful of row-level statements in one transaction,
+    so the cost of a save no longer depends on the size of the dataset. Comments are only
+    read one task's thread at a time, and load() leaves out finished tasks, the bulk of a
+    long history: DataManager reads those through the indexed query_task_ids() when a
+    list, a date range or the DONE status is asked for. Timestamps are stored as ISO
+    strings, which sort chronologically, so the date indexes can serve range queries.
+    """
+
+    finished_on_demand = True
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS task_lists (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT 'default',
+            is_pinned INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            attachments TEXT NOT NULL DEFAULT '[]',
+            created_at TEXT NOT NULL,
+            start_at TEXT,
+            due_at TEXT,
+            assigned_to TEXT,
+            is_pinned INTEGER NOT NULL DEFAULT 0,
+            alarm_lead_minutes INTEGER,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS comments (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            text TEXT NOT NULL,
+            author TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_assigned_to ON tasks (assigned_to);
+        CREATE INDEX IF NOT EXISTS idx_tasks_due_at ON tasks (due_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_start_at ON tasks (start_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+        CREATE INDEX IF NOT EXISTS idx_task_lists_category ON task_lists (category);
+        CREATE INDEX IF NOT EXISTS idx_comments_task_id ON comments (task_id);
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # The connection is shared by the GUI thread and the write-behind saver thread.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        """Upgrades databases created before a column was added to the schema."""
+        task_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'alarm_lead_minutes' not in task_columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN alarm_lead_minutes INTEGER")
+        if 'version' not in task_columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    TASK_COLUMNS = ("id, description, status, priority, attachments, created_at, start_at, due_at, "
+                    "assigned_to, is_pinned, alarm_lead_minutes, version")
+    # Most ids bound in one IN (...) query; SQLite limits the number of parameters
+    MAX_QUERY_IDS = 500
+
+    FINISHED = TaskStatus.DONE.name
+    # Listed rather than 'status != DONE', so that the status index is used
+    UNFINISHED = tuple(status.name for status in TaskStatus if status != TaskStatus.DONE)
+
+    # --- Loading ---
+    def load(self) -> Tuple[List[dict], List[dict]]:
+        """Returns every task list and the tasks that are not finished."""
+        with self._lock:
+            list_rows = self._conn.execute(
+                "SELECT id, name, category, is_pinned FROM task_lists").fetchall()
+            task_rows = self._conn.execute(
+                f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE status IN ({','.join('?' * len(self.UNFINISHED))}) "
+                "ORDER BY rowid", self.UNFINISHED).fetchall()
+
+        task_lists = [self._list_row_to_dict(row) for row in list_rows]
+        tasks = [self._task_row_to_dict(row) for row in task_rows]
+        return task_lists, tasks
+
+    def load_tasks(self, task_ids: List[str]) -> List[dict]:
+        with self._lock:
+            tasks = {task_dict['id']: task_dict for task_dict in self._load_task_rows(task_ids)}
+        return [tasks[task_id] for task_id in task_ids if task_id in tasks] # In the order asked for
+
+    def _load_task_rows(self, task_ids: List[str]) -> List[dict]:
+        tasks = []
+        for start in range(0, len(task_ids), self.MAX_QUERY_IDS):
+            ids = task_ids[start:start + self.MAX_QUERY_IDS]
+            rows = self._conn.execute(f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE id IN "
+                                      f"({','.join('?' * len(ids))})", ids).fetchall()
+            tasks.extend(self._task_row_to_dict(row) for row in rows)
+        return tasks
+
+    def query_task_ids(self, assigned_to: Optional[str] = None, status: Optional[str] = None,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None,
+                       older_than: Optional[datetime] = None) -> List[str]:
+        """Returns ids of tasks matching all given filters, ordered by creation time.
+
+        `status` is a TaskStatus name. A date range keeps tasks whose start..due days overlap
+        it, like DataManager.get_tasks_in_range; either end may be left open. `older_than`
+        keeps tasks due (or, without a due time, created) before it.
+        """
+        clauses, params = [], []
+        if assigned_to is not None:
+            clauses.append("assigned_to = ?")
+            params.append(assigned_to)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if start_date is not None or end_date is not None:
+            # Tasks starting after their due day show up on no day at all
+            clauses.append("due_at IS NOT NULL AND (start_at IS NULL OR substr(start_at, 1, 10) <= substr(due_at, 1, 10))")
+        if start_date is not None:
+            clauses.append("due_at >= ?")
+            params.append(start_date.isoformat())
+        if end_date is not None:
+            next_day = (end_date + timedelta(days=1)).isoformat()
+            clauses.append("(start_at < ? OR (start_at IS NULL AND due_at < ?))")
+            params.extend([next_day, next_day])
+        if older_than is not None:
+            clauses.append("COALESCE(due_at, created_at) < ?")
+            params.append(older_than.isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id FROM tasks{where} ORDER BY created_at", params).fetchall()
+        return [row[0] for row in rows]
+
+    def query_list_ids(self, category: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM task_lists WHERE category = ?", (category,)).fetchall()
+        return [row[0] for row in rows]
+
+    def load_attachment_refs(self, status: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT attachments FROM tasks WHERE status = ? AND attachments != '[]'",
+                                      (status,)).fetchall()
+        return [ref for row in rows for ref in json.loads(row[0])]
+
+    def load_versions(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, version FROM tasks").fetchall())
+
+    def load_diff(self, known_versions: Dict[str, int]) -> Tuple[List[dict], List[dict], List[str]]:
+        # Compares versions first, then reads only the rows that changed
+        with self._lock:
+            version_rows = self._conn.execute("SELECT id, version, status = ? FROM tasks", (self.FINISHED,)).fetchall()
+        changed_ids = [task_id for task_id, version, finished in version_rows
+                       if known_versions.get(task_id) != version and (not finished or task_id in known_versions)]
+        stored_ids = {row[0] for row in version_rows}
+        removed_ids = [task_id for task_id in known_versions if task_id not in stored_ids]
+        with self._lock:
+            list_rows = self._conn.execute(
+                "SELECT id, name, category, is_pinned FROM task_lists").fetchall()
+            changed_tasks = self._load_task_rows(changed_ids)
+        return [self._list_row_to_dict(row) for row in list_rows], changed_tasks, removed_ids
+
+    def load_comments(self, task_id: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text, author, timestamp FROM comments WHERE task_id = ? ORDER BY seq", (task_id,)).fetchall()
+        return [{"text": text, "author": author, "timestamp": timestamp} for text, author, timestamp in rows]
+
+    @staticmethod
+    def _list_row_to_dict(row) -> dict:
+        return {"id": row[0], "name": row[1], "category": row[2], "is_pinned": bool(row[3])}
+
+    def _task_row_to_dict(self, row) -> dict:
+        return {
+            "id": row[0],
+            "description": row[1],
+            "status": row[2],
+            "priority": row[3],
+            "attachments": json.loads(row[4]),
+            "created_at": row[5],
+            "start_at": row[6],
+            "due_at": row[7],
+            "assigned_to": row[8],
+            "is_pinned": bool(row[9]),
+            "alarm_lead_minutes": row[10],
+            "version": row[11]
+        }
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT EXISTS(SELECT 1 FROM task_lists) OR EXISTS(SELECT 1 FROM tasks)").fetchone()
+        return not row[0]
+
+    # --- Writing ---
+    def write_changes(self, records: List[dict]):
+        with self._lock, self._conn: # One transaction per batch
+            for record in records:
+                self._apply_record(record)
+
+    def write_snapshot(self, task_lists: List[dict], tasks: List[dict]) -> bool:
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM tasks")
+                self._conn.execute("DELETE FROM task_lists")
+                for list_dict in task_lists:
+                    self._put_list(list_dict)
+                for task_dict in tasks:
+                    self._put_task(task_dict)
+                # Threads of the kept tasks stay as they are
+                self._conn.execute("DELETE FROM comments WHERE task_id NOT IN (SELECT id FROM tasks)")
+            return True
+        except sqlite3.Error as e:
+            print(f"Error: Could not write snapshot to {self.db_path}. Error: {e}")
+            return False
+
+    def _apply_record(self, record: dict):
+        op = record.get('op')
+        if op == 'put_list':
+            self._put_list(record['list'])
+        elif op == 'delete_lists':
+            ids = list(record['ids'])
+            placeholders = ",".join("?" * len(ids))
+            self._conn.execute(f"UPDATE tasks SET assigned_to = NULL WHERE assigned_to IN ({placeholders})", ids)
+            self._conn.execute(f"DELETE FROM task_lists WHERE id IN ({placeholders})", ids)
+        elif op == 'put_task':
+            self._put_task(record['task'])
+        elif op == 'delete_task':
+            self._conn.execute("DELETE FROM comments WHERE task_id = ?", (record['id'],))
+            self._conn.execute("DELETE FROM tasks WHERE id = ?", (record['id'],))
+        elif op == 'add_comment':
+            self._insert_comment(record['task_id'], record['comment'])
+        elif op == 'put_comments':
+            self._put_comments(record['task_id'], record['comments'])
+        else:
+            print(f"Warning: Ignoring unknown change record: {record}")
+
+    def _put_list(self, list_dict: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO task_lists (id, name, category, is_pinned) VALUES (?, ?, ?, ?)",
+            (list_dict['id'], list_dict['name'], list_dict.get('category', 'default'),
+             int(list_dict.get('is_pinned', False))))
+
+    def _put_task(self, task_dict: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tasks (id, description, status, priority, attachments, created_at, "
+            "start_at, due_at, assigned_to, is_pinned, alarm_lead_minutes, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (task_dict['id'], task_dict['description'], task_dict['status'], task_dict['priority'],
+             json.dumps(task_dict.get('attachments', [])), task_dict['created_at'], task_dict.get('start_at'),
+             task_dict.get('due_at'), task_dict.get('assigned_to'), int(task_dict.get('is_pinned', False)),
+             task_dict.get('alarm_lead_minutes'), task_dict.get('version', 0)))
+        if 'comments' in task_dict: # Not a header only; its comments replace the thread
+            self._put_comments(task_dict['id'], task_dict['comments'])
+
+    def _put_comments(self, task_id: str, comments: List[dict]):
+        self._conn.execute("DELETE FROM comments WHERE task_id = ?", (task_id,))
+        for comment_dict in comments:
+            self._insert_comment(task_id, comment_dict)
+
+    def _insert_comment(self, task_id: str, comment_dict: dict):
+        self._conn.execute(
+            "INSERT INTO comments (task_id, text, author, timestamp) VALUES (?, ?, ?, ?)",
+            (task_id, comment_dict['text'], comment_dict['author'], comment_dict['timestamp']))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
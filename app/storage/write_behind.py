@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class WriteBehindSaver(threading.Thread):
+    """Background thread that coalesces bursts of changes into a single save.
+
+    Callers invoke mark_dirty() after every mutation. The flush callback runs on this
+    thread once no new change arrived for `quiet_period` seconds, or at the latest
+    `max_delay` seconds after the first unsaved change, which bounds how many edits a
+    crash can lose.
+    """
+
+    def __init__(self, flush_callback: Callable[[], None], quiet_period: float = 1.0, max_delay: float = 5.0):
+        super().__init__(name="WriteBehindSaver", daemon=True)
+        self._flush_callback = flush_callback
+        self.quiet_period = quiet_period
+        self.max_delay = max(max_delay, quiet_period)
+        self._condition = threading.Condition()
+        self._dirty_since: Optional[float] = None # Time of the oldest unsaved change
+        self._last_change: Optional[float] = None
+        self._stopping = False
+
+    def mark_dirty(self):
+        with self._condition:
+            now = time.monotonic()
+            if self._dirty_since is None:
+                self._dirty_since = now
+            self._last_change = now
+            self._condition.notify()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Flushes anything still pending and waits for the thread to exit."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.join(timeout)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and self._dirty_since is None:
+                    self._condition.wait()
+                if self._dirty_since is None: # Stopping with nothing left to save
+                    return
+                # Wait for the burst to go quiet, but never longer than max_delay overall.
+                while not self._stopping:
+                    deadline = min(self._last_change + self.quiet_period, self._dirty_since + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                self._dirty_since = None
+                self._last_change = None
+            try:
+                self._flush_callback()
+            except Exception as e:
+                print(f"Error in write-behind save: {e}")
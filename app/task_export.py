@@ -0,0 +1,72 @@
+import csv
+import json
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+from .data_models import Comment, Task
+
+# Task columns, in output order. They match the importer's fields, so an export can be imported again.
+EXPORT_FIELDS = ["id", "description", "list", "list_id", "status", "priority", "created_at", "start_at", "due_at",
+                 "is_pinned", "alarm_lead_minutes", "attachments"]
+COMMENT_FIELDS = ["comment_author", "comment_timestamp", "comment_text"]
+
+COMMENTS_NESTED = 'nested' # One record per task with a list of comments
+COMMENTS_FLAT = 'flat' # One record per comment, repeating the task's columns (tasks without comments get one)
+
+
+def _isoformat(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def iter_export_records(tasks: Iterable[Task], list_name: Callable[[Optional[str]], Optional[str]],
+                        comments: str = COMMENTS_NESTED,
+                        thread: Callable[[Task], Sequence[Comment]] = lambda task: task.comments) -> Iterator[dict]:
+    """Turns tasks into flat export records one at a time. `list_name` maps a list id to its name
+    and `thread` a task to its comments."""
+    for task in tasks:
+        record = {
+            "id": task.id,
+            "description": task.description,
+            "list": list_name(task.assigned_to),
+            "list_id": task.assigned_to,
+            "status": task.status.name,
+            "priority": task.priority.name,
+            "created_at": _isoformat(task.created_at),
+            "start_at": _isoformat(task.start_at),
+            "due_at": _isoformat(task.due_at),
+            "is_pinned": task.is_pinned,
+            "alarm_lead_minutes": task.alarm_lead_minutes,
+            "attachments": task.attachment_refs(),
+        }
+        if comments == COMMENTS_FLAT:
+            task_comments = thread(task)
+            if not task_comments:
+                yield dict(record, comment_author=None, comment_timestamp=None, comment_text=None)
+            for comment in task_comments:
+                yield dict(record, comment_author=comment.author, comment_timestamp=_isoformat(comment.timestamp),
+                           comment_text=comment.text)
+        else:
+            record["comments"] = [comment.to_dict() for comment in thread(task)]
+            yield record
+
+
+def write_ndjson(records: Iterable[dict], f) -> int:
+    count = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_csv(records: Iterable[dict], f, comments: str = COMMENTS_NESTED) -> int:
+    """Writes records as CSV rows. List-valued cells (attachments, nested comments) are written as JSON."""
+    extra_fields = COMMENT_FIELDS if comments == COMMENTS_FLAT else ["comments"]
+    writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS + extra_fields)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        for key in ("attachments", "comments"):
+            if key in record:
+                record[key] = json.dumps(record[key], ensure_ascii=False) if record[key] else ""
+        writer.writerow(record)
+        count += 1
+    return count
@@ -0,0 +1,143 @@
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+from .data_models import Comment, TaskPriority, TaskStatus
+
+# Columns (CSV) or keys (NDJSON) understood by the importer. Only description and a list are required;
+# the list is given by name ("list", created if missing) or by id ("list_id").
+IMPORT_FIELDS = ["description", "list", "list_id", "status", "priority", "start_at", "due_at",
+                 "is_pinned", "alarm_lead_minutes", "comments"]
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    created_lists: List[str] = field(default_factory=list)
+    errors: List[Tuple[int, str]] = field(default_factory=list) # (row number, message)
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the import skips it and carries on."""
+
+
+def detect_format(file_path: str) -> str:
+    extension = os.path.splitext(file_path)[1].lower()
+    return 'csv' if extension == '.csv' else 'ndjson'
+
+
+def iter_rows(file_path: str, file_format: Optional[str] = None) -> Iterator[Tuple[int, object]]:
+    """Yields (row number, row) pairs one at a time. Malformed NDJSON lines are yielded as RowError."""
+    file_format = file_format or detect_format(file_path)
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, RowError(f"Invalid JSON: {e}")
+
+
+def _parse_enum(enum_class, value, default):
+    if value in (None, ""):
+        return default
+    try:
+        return enum_class[str(value).strip().upper()]
+    except KeyError:
+        names = ", ".join(member.name for member in enum_class)
+        raise RowError(f"Unknown {enum_class.__name__} '{value}' (expected one of {names})")
+
+
+def _parse_datetime(value, field_name: str) -> Optional[datetime]:
+    if value in (None, ""):
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        raise RowError(f"Invalid {field_name} '{value}' (expected an ISO date or date-time)")
+    # Tasks hold naive local times; an offset would make them incomparable with the rest
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def _parse_text(value, field_name: str) -> str:
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise RowError(f"{field_name} must be text, not {value!r}")
+    return value.strip()
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _parse_comments(value) -> List[Comment]:
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        if value.lstrip().startswith("["): # A JSON list, as written by the CSV export
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+        if isinstance(value, str): # Otherwise the cell holds a single comment's text
+            return [Comment(text=value, author="Import")]
+    if not isinstance(value, list):
+        raise RowError("comments must be a list")
+    comments = []
+    for item in value:
+        if isinstance(item, str):
+            comments.append(Comment(text=item, author="Import"))
+        elif isinstance(item, dict) and isinstance(item.get('text'), str):
+            comments.append(Comment(text=item['text'], author=_parse_text(item.get('author'), "comment author") or "Import",
+                                    timestamp=_parse_datetime(item.get('timestamp'), "comment timestamp") or datetime.now()))
+        else:
+            raise RowError(f"Invalid comment: {item!r}")
+    return comments
+
+
+def parse_task_row(row) -> dict:
+    """Validates one row and returns add_task keyword arguments plus 'list'/'list_id' for list resolution."""
+    if isinstance(row, RowError):
+        raise row
+    if not isinstance(row, dict):
+        raise RowError("Row is not an object")
+    description = _parse_text(row.get('description'), "description")
+    if not description:
+        raise RowError("Missing description")
+    list_name = _parse_text(row.get('list'), "list")
+    list_id = _parse_text(row.get('list_id'), "list_id")
+    start_at = _parse_datetime(row.get('start_at'), "start_at")
+    due_at = _parse_datetime(row.get('due_at'), "due_at")
+    if start_at and due_at and start_at > due_at:
+        raise RowError("start_at is after due_at")
+    alarm_lead_minutes = row.get('alarm_lead_minutes')
+    if alarm_lead_minutes in (None, ""):
+        alarm_lead_minutes = None
+    else:
+        try:
+            alarm_lead_minutes = int(alarm_lead_minutes)
+        except (TypeError, ValueError):
+            raise RowError(f"Invalid alarm_lead_minutes '{alarm_lead_minutes}'")
+    return {
+        "list": list_name,
+        "list_id": list_id,
+        "description": description,
+        "status": _parse_enum(TaskStatus, row.get('status'), TaskStatus.PENDING),
+        "priority": _parse_enum(TaskPriority, row.get('priority'), TaskPriority.MEDIUM),
+        "start_at": start_at,
+        "due_at": due_at,
+        "is_pinned": _parse_bool(row.get('is_pinned', False)),
+        "alarm_lead_minutes": alarm_lead_minutes,
+        "comments": _parse_comments(row.get('comments')),
+    }
@@ -3,4 +3,12 @@ from datetime import datetime
 DATE_FORMAT = "%Y-%m-%d"
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+def format_size(num_bytes: int) -> str:
+    """A byte count for display, e.g. '512 B' or '3.4 MB'."""
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
 # Add other constants or utility functions as needed
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""Compares the memory held by loaded tasks in the compact models against plain dataclasses.
+
+Usage: python -m benchmarks.bench_memory [--sizes 10000,100000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from app.data_models import LazyTask, Task, TaskPriority, TaskStatus
+from benchmarks.bench_snapshot import make_tasks
+
+
+# The models as they were before they were slotted, for comparison
+@dataclass
+class DataclassComment:
+    text: str
+    author: str
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class DataclassTask:
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    description: str = ""
+    status: TaskStatus = TaskStatus.PENDING
+    comments: List[DataclassComment] = field(default_factory=list)
+    attachments: List[str] = field(default_factory=list)
+    priority: TaskPriority = TaskPriority.MEDIUM
+    created_at: datetime = field(default_factory=datetime.now)
+    start_at: Optional[datetime] = None
+    due_at: Optional[datetime] = None
+    assigned_to: Optional[str] = None
+    is_pinned: bool = False
+    alarm_lead_minutes: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data['id'],
+            description=data['description'],
+            status=TaskStatus[data['status']],
+            comments=[DataclassComment(text=c['text'], author=c['author'],
+                                       timestamp=datetime.fromisoformat(c['timestamp'])) for c in data['comments']],
+            attachments=list(data['attachments']),
+            priority=TaskPriority[data['priority']],
+            created_at=datetime.fromisoformat(data['created_at']),
+            start_at=datetime.fromisoformat(data['start_at']) if data['start_at'] else None,
+            due_at=datetime.fromisoformat(data['due_at']) if data['due_at'] else None,
+            assigned_to=data['assigned_to'],
+            is_pinned=data['is_pinned'],
+            alarm_lead_minutes=data['alarm_lead_minutes']
+        )
+
+
+def measure(task_class, lines: List[str], hydrate: bool) -> int:
+    """Bytes still allocated after loading every task (as from a freshly parsed file)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Parse each task on its own, like the streaming loader, so no strings are shared by accident
+        tasks = [task_class.from_dict(json.loads(line)) for line in lines]
+        if hydrate: # What the views read: every task's comments and attachments
+            for task in tasks:
+                task.comments, task.attachments
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del tasks
+    return current
+
+
+def run(count: int):
+    list_ids = [str(uuid.uuid4()) for _ in range(50)]
+    lines = [json.dumps(task) for task in make_tasks(count, list_ids)]
+    baseline = measure(DataclassTask, lines, hydrate=False)
+    print(f"{count:>9} tasks | dataclass {baseline / 1e6:8.1f} MB")
+    for name, task_class, hydrate in (("compact Task", Task, False), ("compact Task, read", Task, True),
+                                      ("LazyTask", LazyTask, False), ("LazyTask, read", LazyTask, True)):
+        used = measure(task_class, lines, hydrate)
+        print(f"{'':>15} | {name:<20} {used / 1e6:8.1f} MB | {100 * (1 - used / baseline):5.1f}% smaller")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma separated task counts (default: %(default)s)")
+    args = parser.parse_args()
+    for count in (int(size) for size in args.sizes.split(",")):
+        run(count)
+
+
+if __name__ == "__main__":
+    main()
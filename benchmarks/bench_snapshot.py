@@ -0,0 +1,82 @@
+"""Compares cold-load time and file size of tasks.json against the binary snapshot.
+
+Usage: python -m benchmarks.bench_snapshot [--sizes 10000,100000,1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.data_models import Comment, LazyTask, Task, TaskPriority, TaskStatus
+from app.storage.json_backend import iter_json_array
+from app.storage.snapshot import load_binary_snapshot, save_binary_snapshot
+
+AUTHORS = ["Alice", "Bob", "Carol", "Dana"]
+
+
+def make_tasks(count: int, list_ids: list) -> list:
+    rng = random.Random(count)
+    start = datetime(2023, 1, 1, 9, 0)
+    tasks = []
+    for i in range(count):
+        start_at = start + timedelta(hours=rng.randrange(3 * 365 * 24))
+        comments = [Comment(text=f"Update {j} on task {i}", author=rng.choice(AUTHORS), timestamp=start_at)
+                    for j in range(rng.randrange(4))]
+        tasks.append(Task(description=f"Task {i}", status=rng.choice(list(TaskStatus)),
+                          priority=rng.choice(list(TaskPriority)), comments=comments,
+                          start_at=start_at, due_at=start_at + timedelta(hours=rng.randrange(1, 72)),
+                          assigned_to=rng.choice(list_ids)).to_dict())
+    return tasks
+
+
+def timed(func):
+    # DataManager.load_data pauses the garbage collector while loading; do the same here.
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def run(count: int, work_dir: str):
+    list_dicts = [{"id": f"list-{i}", "name": f"List {i}", "category": "default", "is_pinned": False}
+                  for i in range(50)]
+    task_dicts = make_tasks(count, [l["id"] for l in list_dicts])
+    json_path = os.path.join(work_dir, f"tasks_{count}.json")
+    snap_path = os.path.join(work_dir, f"tasks_{count}.snap")
+    with open(json_path, 'w') as f:
+        json.dump(task_dicts, f, indent=4)
+    save_binary_snapshot(snap_path, list_dicts, task_dicts, [json_path])
+    del task_dicts
+
+    # Build the same LazyTask records DataManager.load_data builds
+    _, json_seconds = timed(lambda: [LazyTask.from_dict(t) for t in iter_json_array(json_path)])
+    _, snap_seconds = timed(lambda: [LazyTask.from_dict(t) for t in load_binary_snapshot(snap_path, [json_path])[1]])
+    print(f"{count:>9} tasks | json {os.path.getsize(json_path) / 1e6:8.1f} MB {json_seconds:7.2f} s"
+          f" | snapshot {os.path.getsize(snap_path) / 1e6:8.1f} MB {snap_seconds:7.2f} s"
+          f" | {json_seconds / snap_seconds:4.1f}x faster")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000",
+                        help="comma separated task counts (default: %(default)s)")
+    args = parser.parse_args()
+    work_dir = tempfile.mkdtemp(prefix="mytasks-bench-")
+    try:
+        for count in (int(size) for size in args.sizes.split(",")):
+            run(count, work_dir)
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import sys
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from app.gui.main_window import MainWindow
 from app.data_manager import DataManager
 
@@ -10,10 +11,14 @@ def main():
     # Initialize data manager
     data_manager = DataManager("data/")
     data_manager.load_data() # Load existing data on startup
+    data_manager.archive_done_tasks() # Move old finished tasks to the archive (see the 'archive_after_days' setting)
+    data_manager.start_write_behind() # Save edits on a background thread, off the GUI thread
 
     # Create and show the main window
     main_window = MainWindow(data_manager)
     main_window.show()
+    # Free attachment files no task refers to any more, on a background thread once the window is up
+    QTimer.singleShot(0, data_manager.start_attachment_collection)
 
     # Save data on exit
     sys.exit(app.exec())
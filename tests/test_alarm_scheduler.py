@@ -0,0 +1,91 @@
+import unittest
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from app.alarm_scheduler import AlarmScheduler
+from app.data_manager import DataManager
+from app.data_models import Task, TaskStatus
+
+NOW = datetime(2024, 5, 1, 9, 0)
+
+class TestAlarmScheduler(unittest.TestCase):
+
+    def test_alarms_pop_in_time_order_with_per_task_lead(self):
+        scheduler = AlarmScheduler(default_lead_minutes=60)
+        late = Task(description="late", due_at=NOW + timedelta(hours=3))
+        soon = Task(description="soon", due_at=NOW + timedelta(hours=3), alarm_lead_minutes=240)
+        scheduler.rebuild([late, soon])
+
+        self.assertEqual(scheduler.next_alarm_time(), NOW - timedelta(hours=1))
+        self.assertEqual(scheduler.pop_due(NOW), [soon.id])
+        self.assertEqual(scheduler.next_alarm_time(), NOW + timedelta(hours=2))
+        self.assertEqual(scheduler.pop_due(NOW + timedelta(hours=2)), [late.id])
+        self.assertIsNone(scheduler.next_alarm_time())
+
+    def test_updates_reschedule_and_unschedule(self):
+        scheduler = AlarmScheduler(default_lead_minutes=60)
+        changes = []
+        scheduler.on_schedule_changed = lambda: changes.append(scheduler.next_alarm_time())
+        task = Task(description="t", due_at=NOW + timedelta(hours=5))
+        scheduler.update(task)
+        scheduler.update(task) # Unchanged, so no notification
+        self.assertEqual(changes, [NOW + timedelta(hours=4)])
+
+        task.due_at = NOW + timedelta(hours=2)
+        scheduler.update(task)
+        self.assertEqual(scheduler.next_alarm_time(), NOW + timedelta(hours=1))
+
+        task.status = TaskStatus.DONE
+        scheduler.update(task)
+        self.assertIsNone(scheduler.next_alarm_time())
+        self.assertEqual(scheduler.pop_due(NOW + timedelta(hours=10)), [])
+
+    def test_fired_alarm_rearms_only_when_rescheduled(self):
+        scheduler = AlarmScheduler(default_lead_minutes=60)
+        task = Task(description="t", due_at=NOW + timedelta(minutes=30))
+        scheduler.update(task)
+        self.assertEqual(scheduler.pop_due(NOW), [task.id])
+
+        scheduler.rebuild([task]) # As after a restart
+        self.assertIsNone(scheduler.next_alarm_time())
+
+        task.due_at = NOW + timedelta(days=1)
+        scheduler.update(task)
+        self.assertEqual(scheduler.next_alarm_time(), NOW + timedelta(days=1, hours=-1))
+
+    def test_past_due_alarm_is_dropped(self):
+        scheduler = AlarmScheduler()
+        task = Task(description="t", due_at=NOW - timedelta(minutes=1))
+        scheduler.update(task)
+        self.assertEqual(scheduler.pop_due(NOW), [])
+        self.assertNotIn(task.id, scheduler.fired)
+
+class TestDataManagerAlarms(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_fired_alarms_survive_restart(self):
+        data_manager = DataManager(self.test_dir)
+        task_list = data_manager.add_task_list("Work")
+        due_at = datetime.now() + timedelta(hours=1)
+        task = data_manager.add_task("Report", task_list.id, due_at=due_at, alarm_lead_minutes=90)
+        other = data_manager.add_task("Later", task_list.id, due_at=due_at + timedelta(days=2))
+        self.assertEqual(data_manager.take_due_alarms(), [task])
+        data_manager.close()
+
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        self.assertEqual(reloaded.tasks[task.id].alarm_lead_minutes, 90)
+        self.assertEqual(reloaded.take_due_alarms(), [])
+        self.assertEqual(reloaded.alarms.next_alarm_time(), other.due_at - timedelta(hours=12))
+
+        reloaded.delete_task(other.id)
+        self.assertIsNone(reloaded.alarms.next_alarm_time())
+
+if __name__ == '__main__':
+    unittest.main()
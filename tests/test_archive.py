@@ -0,0 +1,114 @@
+import unittest
+import gzip
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+from app.storage.archive import TaskArchive
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = self._open()
+        self.task_list = self.data_manager.add_task_list("Inbox")
+        self.now = datetime(2025, 6, 1, 12, 0)
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.test_dir)
+
+    def _open(self) -> DataManager:
+        data_manager = DataManager(self.test_dir)
+        data_manager.load_data()
+        return data_manager
+
+    def _add_done(self, description: str, days_ago: int, status: TaskStatus = TaskStatus.DONE):
+        return self.data_manager.add_task(description, self.task_list.id, status=status,
+                                          due_at=self.now - timedelta(days=days_ago))
+
+    def test_only_old_finished_tasks_are_archived(self):
+        old = self._add_done("Old", 40)
+        recent = self._add_done("Recent", 5)
+        pending = self._add_done("Pending", 40, status=TaskStatus.PENDING)
+        self.data_manager.add_comment_to_task(old.id, "Wrapped up", "Ann")
+
+        self.assertEqual(self.data_manager.archive_done_tasks(now=self.now), 1)
+        self.assertEqual(set(self.data_manager.tasks), {recent.id, pending.id})
+
+        reopened = self._open()
+        self.assertEqual(set(reopened.tasks), {recent.id, pending.id})
+        archived = reopened.read_archive_segment(reopened.archive.segments()[0].name)
+        self.assertEqual([task.description for task in archived], ["Old"])
+        self.assertEqual([c.text for c in archived[0].comments], ["Wrapped up"])
+
+    def test_archive_age_comes_from_the_settings(self):
+        self._add_done("Old", 10)
+        self.data_manager.save_setting('archive_after_days', None) # Off
+        self.assertEqual(self.data_manager.archive_done_tasks(now=self.now), 0)
+        self.data_manager.save_setting('archive_after_days', 7)
+        self.assertEqual(self.data_manager.archive_done_tasks(now=self.now), 1)
+
+    def test_search_and_restore(self):
+        task = self._add_done("Quarterly report", 60)
+        self._add_done("Something else", 60)
+        self.data_manager.add_comment_to_task(task.id, "Sent to finance", "Ann")
+        self.data_manager.archive_done_tasks(now=self.now)
+
+        found = list(self.data_manager.search_archive("FINANCE"))
+        self.assertEqual([t.id for _, t in found], [task.id])
+
+        restored = self.data_manager.restore_archived_task(task.id)
+        self.assertEqual(restored.assigned_to, self.task_list.id)
+        self.assertEqual([c.text for c in restored.comments], ["Sent to finance"])
+        self.assertEqual(list(self.data_manager.search_archive("finance")), [])
+
+        reopened = self._open()
+        self.assertIn(task.id, reopened.tasks)
+        self.assertEqual(reopened.archive.segments()[0].live_count, 1)
+
+    def test_restoring_every_task_removes_the_segment(self):
+        task = self._add_done("Only one", 60)
+        self.data_manager.archive_done_tasks(now=self.now)
+        segment_path = os.path.join(self.data_manager.archive_dir, self.data_manager.archive.segments()[0].name)
+        self.data_manager.restore_archived_task(task.id)
+        self.assertFalse(os.path.exists(segment_path))
+        self.assertEqual(self.data_manager.archive.segments(), [])
+
+    def test_segments_fill_up_by_appending(self):
+        archive = TaskArchive(os.path.join(self.test_dir, "cold"))
+        archive.SEGMENT_MAX_TASKS = 3
+        archive.append([{'id': str(i), 'description': f"Task {i}"} for i in range(2)])
+        archive.append([{'id': str(i), 'description': f"Task {i}"} for i in range(2, 7)])
+        self.assertEqual([segment.count for segment in archive.segments()], [3, 3, 1])
+
+        reopened = TaskArchive(archive.archive_dir, compression='lzma') # Older gzip segments stay readable
+        self.assertEqual([t['id'] for s in reopened.segments() for t in reopened.read_segment(s)],
+                         [str(i) for i in range(7)])
+        reopened.append([{'id': '7', 'description': "Task 7"}])
+        self.assertTrue(reopened.segments()[-1].name.endswith(".jsonl.gz")) # Still room in the last segment
+
+    def test_torn_append_is_cut_off(self):
+        archive = TaskArchive(os.path.join(self.test_dir, "cold"))
+        archive.append([{'id': '1', 'description': "Kept"}])
+        segment = archive.segments()[0]
+        # An append that crashed before the manifest was written
+        with gzip.open(os.path.join(archive.archive_dir, segment.name), 'at') as f:
+            f.write('{"id": "2", "description": "Lost"}\n')
+
+        torn_size = os.path.getsize(os.path.join(archive.archive_dir, segment.name))
+
+        reopened = TaskArchive(archive.archive_dir)
+        self.assertEqual([t['id'] for t in reopened.read_segment(reopened.segments()[0])], ['1'])
+        # Reading leaves the file alone; it may be another instance's append in progress
+        self.assertEqual(os.path.getsize(os.path.join(archive.archive_dir, segment.name)), torn_size)
+
+        reopened.append([{'id': '3', 'description': "Next"}]) # The next writer cuts it off
+        self.assertEqual([t['id'] for t in TaskArchive(archive.archive_dir).read_segment(reopened.segments()[0])],
+                         ['1', '3'])
+
+if __name__ == '__main__':
+    unittest.main()
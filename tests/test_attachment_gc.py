@@ -0,0 +1,78 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.attachment_gc import find_orphans, referenced_paths, remove_orphans
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+
+class TestAttachmentGC(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.data_manager.load_data()
+        self.task_list = self.data_manager.add_task_list("Team")
+        self.later = time.time() + 7200 # Past the grace period
+
+    def tearDown(self):
+        self.data_manager.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, rel_path: str, text: str = "data") -> str:
+        path = os.path.join(self.data_manager.attachments_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+
+    def _stored(self, name: str, text: str) -> str:
+        source = os.path.join(self.test_dir, name)
+        with open(source, 'w') as f:
+            f.write(text)
+        return self.data_manager.attachment_store.add_file(source)
+
+    def test_orphans_are_reported_and_quarantined(self):
+        kept_ref = self._stored("kept.txt", "Kept")
+        self.data_manager.add_task("Kept", self.task_list.id, attachments=[kept_ref, os.path.join("old-task", "notes.txt")])
+        self._write(os.path.join("old-task", "notes.txt"))
+        self._write(os.path.join("old-task", "stray.txt"), "stray") # In a used folder but not referenced
+        self._write(os.path.join("gone-task", "a.txt"), "aaa")
+        self._write(os.path.join("gone-task", "sub", "b.txt"), "bb")
+        unused_ref = self._stored("unused.txt", "Unused blob")
+        archived_ref = self._stored("archived.txt", "Archived")
+        self.data_manager.add_task("Done", self.task_list.id, status=TaskStatus.DONE, attachments=[archived_ref])
+        self.assertEqual(self.data_manager.archive_done_tasks(older_than_days=0, now=datetime.now() + timedelta(days=1)), 1)
+
+        self.assertEqual(self.data_manager.collect_orphan_attachments().orphans, []) # All within the grace period
+        report = self.data_manager.collect_orphan_attachments(now=self.later)
+        self.assertEqual(report.scanned_files, 7)
+        unused_path = os.path.relpath(self.data_manager.attachment_store.path(unused_ref), self.data_manager.attachments_dir)
+        self.assertEqual(sorted(path for path, _ in report.orphans),
+                         sorted([os.path.join("gone-task", "a.txt"), os.path.join("gone-task", "sub", "b.txt"),
+                                 os.path.join("old-task", "stray.txt"), unused_path]))
+        self.assertEqual(report.reclaimable_bytes, 3 + 2 + 5 + len("Unused blob"))
+
+        report = self.data_manager.collect_orphan_attachments(remove=True, now=self.later)
+        self.assertEqual((report.removed, report.errors), (4, []))
+        self.assertTrue(os.path.exists(os.path.join(report.quarantine_dir, "gone-task", "sub", "b.txt")))
+        self.assertFalse(os.path.exists(os.path.join(self.data_manager.attachments_dir, "gone-task")))
+        self.assertTrue(os.path.exists(self.data_manager.attachment_store.path(kept_ref)))
+        self.assertTrue(os.path.exists(self.data_manager.attachment_store.path(archived_ref)))
+        self.assertEqual(self.data_manager.collect_orphan_attachments(now=self.later).orphans, [])
+
+    def test_delete_removes_orphans_in_parallel(self):
+        for i in range(200):
+            self._write(os.path.join(f"task-{i % 20}", f"file-{i}.txt"))
+        digests, legacy_paths = referenced_paths([os.path.join("task-0", "file-0.txt")])
+        report = find_orphans(self.data_manager.attachments_dir, digests, legacy_paths, now=self.later, workers=4)
+        self.assertEqual((report.scanned_files, len(report.orphans)), (200, 199))
+        remove_orphans(self.data_manager.attachments_dir, report)
+        self.assertEqual(report.removed, 199)
+        self.assertEqual(sorted(os.listdir(self.data_manager.attachments_dir)), ["task-0"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import hashlib
+import os
+import shutil
+import tempfile
+
+from app.attachment_metadata import AttachmentMetadataCache, guess_mime_type
+from app.storage.attachment_store import AttachmentStore
+
+class TestAttachmentMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = AttachmentStore(os.path.join(self.test_dir, "attachments"))
+        self.thumbnailed = []
+        self.cache = self._open()
+
+    def tearDown(self):
+        self.cache.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def _open(self) -> AttachmentMetadataCache:
+        return AttachmentMetadataCache(self.store, os.path.join(self.test_dir, "attachment_metadata.json"),
+                                       os.path.join(self.test_dir, "attachment_thumbnails"))
+
+    def _thumbnailer(self, image_path: str, thumbnail_path: str) -> bool:
+        self.thumbnailed.append(image_path)
+        with open(thumbnail_path, 'wb') as f:
+            f.write(b"png")
+        return True
+
+    def _write(self, path: str, data: bytes) -> str:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_entries_are_filled_in_the_background_and_kept(self):
+        picture = self.store.add_file(self._write(os.path.join(self.test_dir, "photo.png"), b"\x89PNG\r\n\x1a\nimage"))
+        notes = self.store.add_file(self._write(os.path.join(self.test_dir, "notes.txt"), b"hello"))
+        self.assertIsNone(self.cache.get(picture))
+        self.assertEqual(sorted(self.cache.refresh([picture, notes], self._thumbnailer).result()), sorted([picture, notes]))
+
+        info = self.cache.get(picture)
+        self.assertEqual((info.size, info.mime_type, info.has_thumbnail), (13, "image/png", True))
+        self.assertTrue(os.path.exists(self.cache.thumbnail_path(info)))
+        self.assertEqual(self.cache.get(notes).mime_type, "text/plain")
+        self.assertIsNone(self.cache.thumbnail_path(self.cache.get(notes)))
+        self.assertEqual(len(self.thumbnailed), 1)
+
+        reopened = self._open() # Read back from the index file, nothing to redo
+        self.assertEqual(reopened.get(picture), info)
+        self.assertEqual(reopened.refresh([picture, notes], self._thumbnailer).result(), [])
+        reopened.shutdown()
+
+    def test_changed_files_are_read_again(self):
+        legacy_ref = os.path.join("task-1", "log.txt")
+        path = self._write(self.store.path(legacy_ref), b"first")
+        self.cache.refresh([legacy_ref]).result()
+        self.assertEqual(self.cache.get(legacy_ref).sha256, hashlib.sha256(b"first").hexdigest())
+
+        self._write(path, b"second run")
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(self.cache.refresh([legacy_ref]).result(), [legacy_ref])
+        self.assertEqual(self.cache.get(legacy_ref).size, len(b"second run"))
+
+        blob_ref = self.store.add_file(self._write(os.path.join(self.test_dir, "same.txt"), b"same"))
+        self.cache.refresh([blob_ref]).result()
+        os.utime(self.store.path(blob_ref)) # Attached again; the content cannot have changed
+        self.assertEqual(self.cache.refresh([blob_ref]).result(), [])
+
+    def test_guess_mime_type(self):
+        self.assertEqual(guess_mime_type("report.pdf"), "application/pdf")
+        gif = self._write(os.path.join(self.test_dir, "noext"), b"GIF89a....")
+        self.assertEqual(guess_mime_type("noext", gif), "image/gif")
+        self.assertEqual(guess_mime_type("unknown"), "application/octet-stream")
+
+if __name__ == '__main__':
+    unittest.main()
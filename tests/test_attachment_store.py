@@ -0,0 +1,100 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+from app.storage.attachment_store import AttachmentStore, attachment_name, blob_digest
+
+class TestAttachmentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.data_manager.load_data()
+        self.task_list = self.data_manager.add_task_list("Team")
+        self.source = os.path.join(self.test_dir, "report.txt")
+        with open(self.source, 'w') as f:
+            f.write("Quarterly numbers")
+
+    def tearDown(self):
+        self.data_manager.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def _attach(self, description: str):
+        ref = self.data_manager.attachment_store.add_file(self.source)
+        return self.data_manager.add_task(description, self.task_list.id, attachments=[ref])
+
+    def _blob_count(self) -> int:
+        return len(list(self.data_manager.attachment_store.iter_blobs()))
+
+    def test_same_content_is_stored_once(self):
+        first, second = self._attach("First"), self._attach("Second")
+        ref = first.attachments[0]
+        self.assertEqual(second.attachments, [ref])
+        self.assertEqual(attachment_name(ref), "report.txt")
+        self.assertEqual(self._blob_count(), 1)
+        self.assertEqual(self.data_manager.attachment_ref_count(ref), 2)
+        with open(self.data_manager.attachment_store.path(ref)) as f:
+            self.assertEqual(f.read(), "Quarterly numbers")
+
+        copy = os.path.join(self.test_dir, "copy.txt") # Same content under another name
+        shutil.copy(self.source, copy)
+        self.assertEqual(blob_digest(AttachmentStore(self.data_manager.attachments_dir).add_file(copy)), blob_digest(ref))
+
+    def test_deleting_only_drops_references(self):
+        first, second = self._attach("First"), self._attach("Second")
+        ref = first.attachments[0]
+        self.data_manager.delete_task(first.id)
+        self.assertEqual(self.data_manager.attachment_ref_count(ref), 1)
+        second.attachments.remove(ref)
+        self.data_manager.update_task(second)
+        self.assertEqual(self.data_manager.attachment_ref_count(ref), 0)
+        self.assertEqual(self._blob_count(), 1)
+
+    def test_collector_removes_unreferenced_blobs(self):
+        kept, dropped = self._attach("Kept"), self._attach("Dropped")
+        other = os.path.join(self.test_dir, "other.txt")
+        with open(other, 'w') as f:
+            f.write("Old notes")
+        self.data_manager.add_task("Archived", self.task_list.id, status=TaskStatus.DONE,
+                                   attachments=[self.data_manager.attachment_store.add_file(other)])
+        self.data_manager.delete_task(dropped.id)
+        self.assertEqual(self.data_manager.archive_done_tasks(older_than_days=0, now=datetime.now() + timedelta(days=1)), 1)
+        orphan = os.path.join(self.test_dir, "orphan.txt")
+        with open(orphan, 'w') as f:
+            f.write("Nobody needs this")
+        self.data_manager.attachment_store.add_file(orphan)
+
+        self.assertEqual(self.data_manager.collect_attachment_blobs(), (0, 0)) # Still within the grace period
+        self.assertEqual(self.data_manager.collect_attachment_blobs(now=time.time() + 7200), (1, len("Nobody needs this")))
+        self.assertEqual(self._blob_count(), 2)
+        self.assertTrue(os.path.exists(self.data_manager.attachment_store.path(kept.attachments[0])))
+
+    def test_collection_runs_in_the_background(self):
+        kept = self._attach("Kept")
+        unused = self._attach("Unused")
+        self.data_manager.delete_task(unused.id)
+        other = os.path.join(self.test_dir, "other.txt")
+        with open(other, 'w') as f:
+            f.write("Dropped")
+        self.data_manager.attachment_store.add_file(other)
+        self.data_manager.ATTACHMENT_GRACE_SECONDS = -60 # Every blob counts as old
+
+        self.assertEqual(self.data_manager.start_attachment_collection().result(), (1, len("Dropped")))
+        self.assertEqual(self._blob_count(), 1)
+        self.assertTrue(os.path.exists(self.data_manager.attachment_store.path(kept.attachments[0])))
+        self.data_manager.close()
+
+    def test_older_attachments_still_resolve(self):
+        legacy_ref = os.path.join("task-1", "notes.txt")
+        self.assertIsNone(blob_digest(legacy_ref))
+        self.assertEqual(attachment_name(legacy_ref), "notes.txt")
+        self.assertEqual(self.data_manager.attachment_store.path(legacy_ref),
+                         os.path.join(self.data_manager.attachments_dir, "task-1", "notes.txt"))
+
+if __name__ == '__main__':
+    unittest.main()
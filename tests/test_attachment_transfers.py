@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+
+from app.attachment_transfers import AttachmentTransfers, DONE, FAILED, CANCELLED
+from app.storage.attachment_store import AttachmentStore, CHUNK_SIZE, TransferCancelled, attachment_name
+
+class TestAttachmentTransfers(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = AttachmentStore(os.path.join(self.test_dir, "attachments"))
+        self.transfers = AttachmentTransfers(self.store, max_workers=2)
+
+    def tearDown(self):
+        self.transfers.shutdown()
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name: str, size: int) -> str:
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(size))
+        return path
+
+    def _stored_files(self):
+        return [name for _, _, names in os.walk(self.store.blobs_dir) for name in names]
+
+    def test_files_are_copied_in_parallel_and_verified(self):
+        paths = [self._write(f"trace{i}.bin", 3 * CHUNK_SIZE + i) for i in range(3)]
+        transfers = [self.transfers.attach(path) for path in paths]
+        for transfer in transfers:
+            transfer.wait()
+        self.assertEqual([transfer.state for transfer in transfers], [DONE] * 3)
+        self.assertEqual([attachment_name(transfer.ref) for transfer in transfers], ["trace0.bin", "trace1.bin", "trace2.bin"])
+        self.assertEqual([transfer.done_bytes for transfer in transfers], [transfer.total_bytes for transfer in transfers])
+        self.assertEqual(len(self._stored_files()), 3)
+        self.assertEqual(self.transfers.active(), [])
+
+        saved = os.path.join(self.test_dir, "saved.bin")
+        download = self.transfers.download(transfers[0].ref, saved)
+        download.wait()
+        self.assertEqual(download.state, DONE)
+        with open(saved, 'rb') as copy, open(paths[0], 'rb') as original:
+            self.assertEqual(copy.read(), original.read())
+
+    def test_cancelled_copy_leaves_nothing_behind(self):
+        path = self._write("big.bin", 4 * CHUNK_SIZE)
+        cancel = threading.Event()
+        read = []
+
+        def progress(count):
+            read.append(count)
+            if len(read) == 5: # Part way through the copy, after hashing
+                cancel.set()
+        with self.assertRaises(TransferCancelled):
+            self.store.add_file(path, progress, cancel)
+        self.assertEqual(self._stored_files(), [])
+
+        cancel.clear()
+        transfer = self.transfers.attach(path)
+        transfer.cancel()
+        transfer.wait()
+        self.assertIn(transfer.state, (CANCELLED, DONE)) # It may have finished before the cancel
+        self.assertEqual(transfer.ref is not None, transfer.state == DONE)
+
+    def test_failed_copy_is_reported(self):
+        path = self._write("gone.bin", 10)
+        transfer = self.transfers.download(self.store.add_file(path), os.path.join(self.test_dir, "missing", "out.bin"))
+        transfer.wait()
+        self.assertEqual(transfer.state, FAILED)
+        self.assertIsInstance(transfer.error, OSError)
+
+if __name__ == '__main__':
+    unittest.main()
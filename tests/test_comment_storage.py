@@ -0,0 +1,153 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from app.data_manager import DataManager
+from app.data_models import Comment, Task
+
+class TestCommentStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = self._open()
+        self.task_list = self.data_manager.add_task_list("Inbox")
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.test_dir)
+
+    def _open(self, **kwargs) -> DataManager:
+        data_manager = DataManager(self.test_dir, **kwargs)
+        data_manager.load_data()
+        return data_manager
+
+    def _count_thread_reads(self, data_manager: DataManager) -> list:
+        reads = []
+        load_comments = data_manager.storage.load_comments
+        data_manager.storage.load_comments = lambda task_id: (reads.append(task_id), load_comments(task_id))[1]
+        return reads
+
+    def test_tasks_load_without_reading_comments(self):
+        first = self.data_manager.add_task("First", self.task_list.id)
+        second = self.data_manager.add_task("Second", self.task_list.id)
+        self.data_manager.add_comment_to_task(first.id, "One", "Ann")
+        self.data_manager.add_comment_to_task(second.id, "Two", "Ben")
+        self.data_manager.close()
+
+        with open(self.data_manager.tasks_file) as f:
+            self.assertTrue(all('comments' not in task_dict for task_dict in json.load(f)))
+        self.data_manager = self._open()
+        reads = self._count_thread_reads(self.data_manager)
+        self.assertEqual(reads, [])
+
+        self.assertEqual([c.text for c in self.data_manager.tasks[first.id].comments], ["One"])
+        self.assertEqual([c.text for c in self.data_manager.tasks[first.id].comments], ["One"]) # Cached
+        self.assertEqual(reads, [first.id])
+
+    def test_cache_keeps_recent_threads_only(self):
+        self.data_manager.comment_threads.capacity = 2
+        tasks = [self.data_manager.add_task(f"Task {i}", self.task_list.id) for i in range(3)]
+        for task in tasks:
+            self.data_manager.add_comment_to_task(task.id, f"On {task.description}", "Ann")
+        self.data_manager.close()
+
+        self.data_manager = self._open()
+        self.data_manager.comment_threads.capacity = 2
+        reads = self._count_thread_reads(self.data_manager)
+        for task in tasks + tasks[-1:]:
+            self.data_manager.tasks[task.id].comments
+        self.assertEqual(reads, [task.id for task in tasks])
+        self.assertIsNone(self.data_manager.comment_threads.peek(tasks[0].id))
+
+    def test_adding_a_comment_appends_to_one_thread(self):
+        busy = self.data_manager.add_task("Busy", self.task_list.id)
+        quiet = self.data_manager.add_task("Quiet", self.task_list.id)
+        self.data_manager.add_comment_to_task(quiet.id, "Settled", "Ann")
+        quiet_path = os.path.join(self.data_manager.comments_dir, f"{quiet.id}.ndjson")
+        quiet_mtime = os.stat(quiet_path).st_mtime_ns
+        self.data_manager.close()
+
+        self.data_manager = self._open()
+        reads = self._count_thread_reads(self.data_manager)
+        self.data_manager.add_comment_to_task(busy.id, "First", "Ann")
+        self.data_manager.add_comment_to_task(busy.id, "Second", "Ben")
+        self.assertEqual(reads, []) # Appending does not read the thread
+        self.assertEqual(os.stat(quiet_path).st_mtime_ns, quiet_mtime)
+        self.assertEqual([c.text for c in self._open().tasks[busy.id].comments], ["First", "Second"])
+
+    def test_edits_made_in_place_are_saved_with_the_task(self):
+        task = self.data_manager.add_task("Review", self.task_list.id,
+                                          comments=[Comment(text="Draft", author="Ann")])
+        task.comments[0].text = "Final"
+        task.comments.append(Comment(text="Done", author="Ben"))
+        self.data_manager.update_task(task)
+        self.assertEqual([c.text for c in self._open().tasks[task.id].comments], ["Final", "Done"])
+
+    def test_comment_edits_are_saved_when_the_thread_is_not_cached(self):
+        task = self.data_manager.add_task("Review", self.task_list.id)
+        self.data_manager.add_comment_to_task(task.id, "Draft", "Ann")
+        self.data_manager.add_comment_to_task(task.id, "Typo", "Ben")
+        draft, typo = task.comments
+        self.data_manager.comment_threads.clear() # E.g. evicted or reloaded since it was shown
+
+        self.assertTrue(self.data_manager.update_comment(task.id, draft, "Final"))
+        self.data_manager.comment_threads.clear()
+        self.assertTrue(self.data_manager.delete_comment(task.id, typo))
+        self.assertFalse(self.data_manager.delete_comment(task.id, typo))
+        self.assertEqual([(c.text, c.author) for c in self._open().tasks[task.id].comments], [("Final", "Ann")])
+
+        with self.assertRaises(RuntimeError):
+            with self.data_manager.transaction():
+                self.data_manager.update_comment(task.id, task.comments[0], "Undone")
+                raise RuntimeError("boom")
+        self.assertEqual([c.text for c in task.comments], ["Final"])
+
+    def test_unsaved_comments_survive_eviction(self):
+        self.data_manager.start_write_behind(quiet_period=60, max_delay=60)
+        self.data_manager.comment_threads.capacity = 1
+        task = self.data_manager.add_task("Pending", self.task_list.id)
+        other = self.data_manager.add_task("Other", self.task_list.id)
+        self.data_manager.add_comment_to_task(task.id, "Not written yet", "Ann")
+        other.comments # Evicts the first thread
+        self.assertIsNone(self.data_manager.comment_threads.peek(task.id))
+        self.assertEqual([c.text for c in task.comments], ["Not written yet"])
+
+    def test_rollback_drops_comments_added_in_the_transaction(self):
+        task = self.data_manager.add_task("Careful", self.task_list.id)
+        self.data_manager.add_comment_to_task(task.id, "Kept", "Ann")
+        with self.assertRaises(RuntimeError):
+            with self.data_manager.transaction():
+                self.data_manager.add_comment_to_task(task.id, "Undone", "Ann")
+                raise RuntimeError("boom")
+        self.assertEqual([c.text for c in self.data_manager.tasks[task.id].comments], ["Kept"])
+
+    def test_comments_inside_older_task_files_are_moved_out(self):
+        self.data_manager.close()
+        legacy_task = Task(description="Legacy", assigned_to=self.task_list.id,
+                           comments=[Comment(text="Old", author="Ann", timestamp=datetime(2024, 1, 1))])
+        with open(self.data_manager.tasks_file, 'w') as f:
+            json.dump([legacy_task.to_dict()], f)
+
+        self.data_manager = self._open()
+        self.assertEqual([c.text for c in self.data_manager.tasks[legacy_task.id].comments], ["Old"])
+        with open(self.data_manager.tasks_file) as f:
+            self.assertNotIn('comments', json.load(f)[0])
+        self.assertEqual([c.text for c in self._open().tasks[legacy_task.id].comments], ["Old"])
+
+    def test_sqlite_reads_one_thread_at_a_time(self):
+        task = self.data_manager.add_task("Query", self.task_list.id)
+        self.data_manager.add_comment_to_task(task.id, "Indexed", "Ann")
+        self.data_manager.close()
+
+        self.data_manager = self._open(backend='sqlite') # Migrates the JSON data, threads included
+        reads = self._count_thread_reads(self.data_manager)
+        self.assertEqual([c.text for c in self.data_manager.tasks[task.id].comments], ["Indexed"])
+        self.assertEqual(reads, [task.id])
+        self.data_manager.delete_task(task.id)
+        self.assertEqual(self.data_manager.storage.load_comments(task.id), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.data_models import Comment, LazyTask, Task, TaskList
+
+class TestCompactModels(unittest.TestCase):
+
+    def test_models_have_no_instance_dict(self):
+        for obj in (Task(), LazyTask(), Comment(text="Hi", author="Ann"), TaskList(name="Work")):
+            self.assertFalse(hasattr(obj, '__dict__'), type(obj).__name__)
+
+    def test_empty_collections_are_shared_until_read(self):
+        first, second = Task(), Task()
+        self.assertIs(first._comments, second._comments)
+        self.assertIs(first._attachments, second._attachments)
+
+        first.comments.append(Comment(text="Hi", author="Ann"))
+        first.attachments.append("a.txt")
+        self.assertEqual(len(first.comments), 1)
+        self.assertEqual(first.attachments, ["a.txt"])
+        self.assertEqual(second.comments, [])
+        self.assertEqual(second.to_dict()["attachments"], [])
+
+    def test_timestamps_round_trip(self):
+        moment = datetime(2024, 3, 31, 2, 30, 15, 123456)
+        task = Task(created_at=moment)
+        self.assertEqual(task.created_at, moment)
+        self.assertEqual(Task.from_dict(task.to_dict()).created_at, moment)
+
+        aware = datetime(2024, 3, 31, 2, 30, tzinfo=timezone(timedelta(hours=2)))
+        comment = Comment(text="Hi", author="Ann", timestamp=aware)
+        self.assertEqual(comment.timestamp, aware)
+        self.assertEqual(Comment.from_dict(comment.to_dict()), comment)
+
+    def test_repeated_strings_are_shared(self):
+        list_id = "".join(["list-", "1"]) # Built at runtime, so not interned by the compiler
+        other_id = "".join(["list-", "1"])
+        self.assertIs(Task(assigned_to=list_id).assigned_to, Task(assigned_to=other_id).assigned_to)
+        first = Comment(text="a", author="".join(["An", "n"]))
+        second = Comment(text="b", author="".join(["An", "n"]))
+        self.assertIs(first.author, second.author)
+
+    def test_equality_follows_fields(self):
+        moment = datetime(2024, 1, 1, 9, 0)
+        task = Task(id="t1", description="Write", created_at=moment, comments=[Comment("Hi", "Ann", moment)])
+        self.assertEqual(task, Task.from_dict(task.to_dict()))
+        self.assertNotEqual(task, Task(id="t1", description="Other", created_at=moment))
+
+    def test_lazy_task_keeps_only_created_at_undecoded(self):
+        moment = datetime(2024, 1, 1, 9, 0)
+        task_dict = Task(description="Lazy", comments=[Comment("Hi", "Ann", moment)], created_at=moment).to_dict()
+        task = LazyTask.from_dict(task_dict)
+        self.assertEqual(LazyTask.__slots__, ('_raw_created_at',))
+        self.assertEqual(task.to_dict(), task_dict)
+        self.assertEqual(task.comments, [Comment("Hi", "Ann", moment)])
+        self.assertEqual(task.created_at, moment)
+
+if __name__ == '__main__':
+    unittest.main()
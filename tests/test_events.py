@@ -0,0 +1,91 @@
+import unittest
+import shutil
+import tempfile
+import os
+
+from app.data_manager import DataManager
+from app.events import (EventBus, ChangeEvent, TASK_ADDED, TASK_UPDATED, TASK_DELETED, COMMENT_ADDED,
+                        LIST_ADDED, LIST_UPDATED, LISTS_DELETED, RELOADED)
+
+class TestChangeEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.data_manager.load_data()
+        self.events = []
+        self.data_manager.events.subscribe(self.events.append)
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.test_dir)
+
+    def kinds(self):
+        return [event.kind for event in self.events]
+
+    def test_task_changes(self):
+        task_list = self.data_manager.add_task_list("Work")
+        task = self.data_manager.add_task("Write report", task_list.id)
+        task.description = "Write the report"
+        self.data_manager.update_task(task)
+        self.data_manager.add_comment_to_task(task.id, "Draft done", "me")
+        self.data_manager.delete_task(task.id)
+
+        self.assertEqual(self.kinds(), [LIST_ADDED, TASK_ADDED, TASK_UPDATED, COMMENT_ADDED, TASK_DELETED])
+        self.assertIs(self.events[1].task, task)
+        self.assertEqual(self.events[3].comment.text, "Draft done")
+        self.assertEqual(self.events[4].ids, (task.id,))
+
+    def test_list_changes(self):
+        workspace = self.data_manager.add_task_list("Project", category='project')
+        inner = self.data_manager.add_task_list("Inner", category=f"project_{workspace.id}")
+        self.data_manager.update_task_list_name(workspace.id, "Renamed")
+        self.data_manager.delete_task_list(workspace.id)
+
+        self.assertEqual(self.kinds(), [LIST_ADDED, LIST_ADDED, LIST_UPDATED, LISTS_DELETED])
+        self.assertEqual(self.events[2].task_list.name, "Renamed")
+        self.assertEqual(set(self.events[3].ids), {workspace.id, inner.id}) # Its lists go with it
+
+    def test_failed_changes_emit_nothing(self):
+        self.assertFalse(self.data_manager.delete_task("missing"))
+        self.assertFalse(self.data_manager.add_comment_to_task("missing", "text", "me"))
+        self.assertEqual(self.events, [])
+
+    def test_rollback_emits_reloaded(self):
+        task_list = self.data_manager.add_task_list("Work")
+        with self.assertRaises(RuntimeError):
+            with self.data_manager.transaction():
+                self.data_manager.add_task("Lost", task_list.id)
+                raise RuntimeError("boom")
+        self.assertEqual(self.kinds(), [LIST_ADDED, TASK_ADDED, RELOADED])
+
+    def test_import_emits_one_reload(self):
+        file_path = os.path.join(self.test_dir, "tasks.csv")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write("description,list\nOne,Work\nTwo,Work\n")
+        self.data_manager.import_tasks(file_path)
+        self.assertEqual(self.kinds(), [RELOADED])
+
+
+class TestEventBus(unittest.TestCase):
+
+    def test_failing_handler_does_not_stop_others(self):
+        bus = EventBus()
+        received = []
+        bus.subscribe(lambda event: 1 / 0)
+        bus.subscribe(received.append)
+        bus.emit(ChangeEvent(RELOADED))
+        self.assertEqual(len(received), 1)
+
+    def test_unsubscribe(self):
+        bus = EventBus()
+        received = []
+        bus.subscribe(received.append)
+        bus.subscribe(received.append) # Subscribing twice delivers once
+        bus.emit(ChangeEvent(RELOADED))
+        bus.unsubscribe(received.append)
+        bus.emit(ChangeEvent(RELOADED))
+        self.assertEqual(len(received), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+from app.events import TASK_ADDED, TASK_UPDATED, TASK_DELETED, LIST_ADDED, LISTS_DELETED
+
+class TestHotReload(unittest.TestCase):
+    """`theirs` stands in for another instance saving to the same data folder."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.theirs = self._open()
+        self.task_list = self.theirs.add_task_list("Team")
+        self.task = self.theirs.add_task("Shared", self.task_list.id)
+        self.ours = self._open()
+        self.events = []
+        self.ours.events.subscribe(self.events.append)
+
+    def tearDown(self):
+        for data_manager in (self.ours, self.theirs):
+            if data_manager.saver:
+                data_manager.saver.stop()
+            data_manager.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def _open(self, backend: str = 'json') -> DataManager:
+        data_manager = DataManager(self.test_dir, backend=backend)
+        data_manager.load_data()
+        return data_manager
+
+    def test_nothing_to_reload(self):
+        self.assertEqual(self.ours.reload_changes(), 0)
+        self.ours.add_task("Our own", self.task_list.id)
+        self.assertEqual(self.ours.reload_changes(), 0)
+        self.assertEqual([event.kind for event in self.events], [TASK_ADDED])
+
+    def test_changes_are_patched_in_with_events(self):
+        kept_task = self.ours.tasks[self.task.id]
+        added = self.theirs.add_task("Theirs", self.task_list.id)
+        self.theirs.add_comment_to_task(self.task.id, "Looks good", "Ann")
+        self.task.status = TaskStatus.DONE
+        self.theirs.update_task(self.task)
+        other_list = self.theirs.add_task_list("Later")
+
+        self.assertEqual(self.ours.reload_changes(), 3)
+        self.assertEqual(sorted(event.kind for event in self.events), sorted([TASK_ADDED, TASK_UPDATED, LIST_ADDED]))
+        self.assertEqual(self.ours.tasks[self.task.id].status, TaskStatus.DONE)
+        self.assertEqual([c.text for c in self.ours.tasks[self.task.id].comments], ["Looks good"])
+        self.assertEqual(self.ours.get_tasks_by_status(TaskStatus.DONE), [self.ours.tasks[self.task.id]])
+        self.assertIn(added.id, self.ours.tasks)
+        self.assertIsNot(self.ours.tasks[self.task.id], kept_task)
+
+        self.events.clear()
+        self.theirs.delete_task(added.id)
+        self.theirs.delete_task_list(other_list.id)
+        self.assertEqual(self.ours.reload_changes(), 2)
+        self.assertEqual(sorted(event.kind for event in self.events), sorted([TASK_DELETED, LISTS_DELETED]))
+        self.assertNotIn(added.id, self.ours.tasks)
+
+    def test_unsaved_edits_are_kept_until_saved(self):
+        self.ours.start_write_behind(quiet_period=60, max_delay=60)
+        ours = self.ours.tasks[self.task.id]
+        ours.description = "Ours"
+        self.ours.update_task(ours)
+        self.task.description = "Theirs"
+        self.theirs.update_task(self.task)
+
+        self.ours.reload_changes()
+        self.assertEqual(self.ours.tasks[self.task.id].description, "Ours")
+        self.ours.flush() # Their edit came first
+        self.assertEqual(len(self.ours.take_conflicts()), 1)
+        self.ours.reload_changes()
+        self.assertEqual(self.ours.tasks[self.task.id].description, "Theirs")
+
+    def test_sqlite_reads_only_changed_rows(self):
+        for data_manager in (self.ours, self.theirs):
+            data_manager.close()
+        self.theirs = self._open('sqlite')
+        for i in range(20):
+            self.theirs.add_task(f"Task {i}", self.task_list.id)
+        self.ours = self._open('sqlite')
+        changed = self.theirs.add_task("New", self.task_list.id)
+
+        read_rows = []
+        load_diff = self.ours.storage.load_diff
+
+        def counting_load_diff(known_versions):
+            diff = load_diff(known_versions)
+            read_rows.extend(diff[1])
+            return diff
+        self.ours.storage.load_diff = counting_load_diff
+        self.assertEqual(self.ours.reload_changes(), 1)
+        self.assertEqual([task_dict['id'] for task_dict in read_rows], [changed.id])
+
+if __name__ == '__main__':
+    unittest.main()
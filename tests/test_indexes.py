@@ -0,0 +1,136 @@
+import unittest
+import random
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+from app.indexes import SecondaryIndex, IntervalIndex
+
+class TestSecondaryIndex(unittest.TestCase):
+
+    def test_update_moves_item_to_new_key(self):
+        items = {'a': {'key': 1}, 'b': {'key': 1}}
+        index = SecondaryIndex(lambda item: item['key'])
+        index.rebuild(items.items())
+        self.assertEqual(index.get(1), ['a', 'b'])
+
+        items['a']['key'] = 2 # Edited in place, then reindexed
+        index.update('a', items['a'])
+        self.assertEqual(index.get(1), ['b'])
+        self.assertEqual(index.get(2), ['a'])
+
+        index.remove('b')
+        self.assertEqual(index.get(1), [])
+        self.assertEqual(index.count(2), 1)
+
+class TestIntervalIndex(unittest.TestCase):
+
+    def test_matches_brute_force_overlap(self):
+        rng = random.Random(7)
+        spans = {}
+        for i in range(300):
+            start = rng.randint(0, 1000)
+            spans[f"t{i}"] = {'group': i % 3, 'span': (start, start + rng.choice([0, 0, 3, 30, 400]))}
+        index = IntervalIndex(lambda item: item['group'], lambda item: item['span'])
+        index.rebuild(spans.items())
+        # Move and drop some items after the trees were built
+        index.overlapping(0, 10)
+        for i in range(0, 300, 10):
+            spans[f"t{i}"]['span'] = (5, 5)
+            index.update(f"t{i}", spans[f"t{i}"])
+        for i in range(1, 300, 25):
+            index.remove(f"t{i}")
+            del spans[f"t{i}"]
+
+        for _ in range(200):
+            low = rng.randint(-10, 1010)
+            high = low + rng.choice([0, 6, 90])
+            expected = {item_id for item_id, item in spans.items() if item['span'][0] <= high and item['span'][1] >= low}
+            self.assertEqual(set(index.overlapping(low, high)), expected)
+            in_group = {item_id for item_id in expected if spans[item_id]['group'] == 1}
+            self.assertEqual(set(index.overlapping(low, high, 1)), in_group)
+
+class TestDataManagerIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.work = self.data_manager.add_task_list("Work")
+        self.home = self.data_manager.add_task_list("Home")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_direct_edits_are_reindexed_by_update_task(self):
+        task = self.data_manager.add_task("Report", self.work.id)
+        task.assigned_to = self.home.id
+        task.status = TaskStatus.DONE
+        self.data_manager.update_task(task)
+
+        self.assertEqual(self.data_manager.get_tasks_for_task_list(self.work.id), [])
+        self.assertEqual(self.data_manager.get_tasks_for_task_list(self.home.id), [task])
+        self.assertEqual(self.data_manager.get_tasks_by_status(TaskStatus.PENDING), [])
+        self.assertEqual(self.data_manager.get_tasks_by_status(TaskStatus.DONE), [task])
+
+        self.data_manager.delete_task(task.id)
+        self.assertEqual(self.data_manager.get_tasks_by_status(TaskStatus.DONE), [])
+
+    def test_deleting_workspace_removes_child_lists_and_unassigns_tasks(self):
+        workspace = self.data_manager.add_task_list("Project", category='project')
+        child = self.data_manager.add_task_list("Sprint", category=f"project_{workspace.id}")
+        task = self.data_manager.add_task("Ship", child.id)
+        self.assertEqual(self.data_manager.get_task_lists_by_category('project'), [workspace])
+
+        self.data_manager.delete_task_list(workspace.id)
+        self.assertEqual(self.data_manager.get_task_lists_by_category('project'), [])
+        self.assertEqual(self.data_manager.get_task_lists_by_category(f"project_{workspace.id}"), [])
+        self.assertEqual(self.data_manager.get_tasks_for_task_list(child.id), [])
+        self.assertIsNone(task.assigned_to)
+        self.assertEqual(self.data_manager.get_tasks_for_task_list(None), [task])
+
+    def test_date_queries_follow_task_edits(self):
+        span_task = self.data_manager.add_task("Trip", self.work.id, start_at=datetime(2024, 3, 4, 9), due_at=datetime(2024, 3, 8, 17))
+        due_task = self.data_manager.add_task("Call", self.home.id, due_at=datetime(2024, 3, 10, 12))
+        self.data_manager.add_task("Someday", self.home.id)
+
+        self.assertEqual(self.data_manager.get_tasks_for_task_list_on_date(self.work.id, date(2024, 3, 6)), [span_task])
+        self.assertEqual(self.data_manager.get_tasks_for_task_list_on_date(self.home.id, date(2024, 3, 6)), [])
+        self.assertEqual(self.data_manager.get_tasks_for_week(date(2024, 3, 6)), [span_task, due_task])
+        self.assertEqual(self.data_manager.get_tasks_in_range(date(2024, 3, 9), date(2024, 3, 31), self.home.id), [due_task])
+
+        span_task.due_at = datetime(2024, 3, 5, 17)
+        self.data_manager.update_task(span_task)
+        self.assertEqual(self.data_manager.get_tasks_for_task_list_on_date(self.work.id, date(2024, 3, 6)), [])
+
+        self.data_manager.delete_task_list(self.home.id)
+        self.assertEqual(self.data_manager.get_tasks_in_range(date(2024, 3, 1), date(2024, 3, 31), self.home.id), [])
+        self.assertEqual(self.data_manager.get_tasks_in_range(date(2024, 3, 1), date(2024, 3, 31)), [span_task, due_task])
+
+    def test_name_lookup_ignores_case_and_follows_renames(self):
+        self.assertIs(self.data_manager.get_task_list_by_name("WORK"), self.work)
+        self.assertIsNone(self.data_manager.add_task_list("work", category='project'))
+        self.assertFalse(self.data_manager.update_task_list_name(self.home.id, "wOrK"))
+        self.assertTrue(self.data_manager.update_task_list_name(self.work.id, "WORK")) # Recasing its own name
+
+        self.assertTrue(self.data_manager.update_task_list_name(self.home.id, "Straße"))
+        self.assertIsNone(self.data_manager.get_task_list_by_name("home"))
+        self.assertIs(self.data_manager.get_task_list_by_name("STRASSE"), self.home)
+
+        self.data_manager.delete_task_list(self.work.id)
+        self.assertIsNone(self.data_manager.get_task_list_by_name("work"))
+        self.assertIsNotNone(self.data_manager.add_task_list("Work"))
+
+    def test_indexes_are_rebuilt_on_load(self):
+        self.data_manager.add_task("Report", self.work.id, status=TaskStatus.ONGOING)
+        self.data_manager.close()
+
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        self.assertEqual([t.description for t in reloaded.get_tasks_for_task_list(self.work.id)], ["Report"])
+        self.assertEqual(len(reloaded.get_tasks_by_status(TaskStatus.ONGOING)), 1)
+        self.assertEqual(len(reloaded.get_task_lists_by_category('default')), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+
+class TestChangeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.data_manager.load_data()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _reload(self) -> DataManager:
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        return reloaded
+
+    def test_mutations_append_to_journal_without_rewriting_snapshot(self):
+        task_list = self.data_manager.add_task_list("Inbox")
+        task = self.data_manager.add_task("Write report", task_list.id)
+        task.status = TaskStatus.DONE
+        self.data_manager.update_task(task)
+        self.data_manager.add_comment_to_task(task.id, "Sent to the team", "Alice")
+
+        self.assertFalse(os.path.exists(self.data_manager.tasks_file))
+        with open(self.data_manager.journal_file) as f:
+            ops = [json.loads(line)['op'] for line in f]
+        self.assertEqual(ops, ['put_list', 'put_task', 'put_task']) # Comments go to the task's thread file
+        self.assertEqual(self.data_manager.storage.load_comments(task.id)[0]['text'], "Sent to the team")
+
+    def test_load_replays_and_compacts_journal(self):
+        task_list = self.data_manager.add_task_list("Inbox")
+        kept = self.data_manager.add_task("Keep me", task_list.id)
+        dropped = self.data_manager.add_task("Drop me", task_list.id)
+        self.data_manager.add_comment_to_task(kept.id, "First!", "Bob")
+        self.data_manager.delete_task(dropped.id)
+
+        reloaded = self._reload()
+        self.assertEqual(list(reloaded.tasks), [kept.id])
+        self.assertEqual([c.text for c in reloaded.tasks[kept.id].comments], ["First!"])
+        self.assertEqual(os.path.getsize(reloaded.journal_file), 0)
+        with open(reloaded.tasks_file) as f:
+            self.assertEqual(len(json.load(f)), 1)
+
+    def test_replaying_journal_twice_does_not_duplicate_comments(self):
+        task_list = self.data_manager.add_task_list("Inbox")
+        task = self.data_manager.add_task("Task", task_list.id)
+        self.data_manager.add_comment_to_task(task.id, "Only once", "Carol")
+        with open(self.data_manager.journal_file) as f:
+            journal_lines = f.read()
+
+        # Simulate a crash after the snapshot was written but before the journal was truncated
+        self.data_manager.save_data()
+        with open(self.data_manager.journal_file, 'w') as f:
+            f.write(journal_lines)
+
+        reloaded = self._reload()
+        self.assertEqual(len(reloaded.tasks[task.id].comments), 1)
+
+    def test_delete_task_list_unassigns_tasks_after_replay(self):
+        task_list = self.data_manager.add_task_list("Temporary")
+        task = self.data_manager.add_task("Orphan", task_list.id)
+        self.data_manager.delete_task_list(task_list.id)
+
+        reloaded = self._reload()
+        self.assertNotIn(task_list.id, reloaded.task_lists)
+        self.assertIsNone(reloaded.tasks[task.id].assigned_to)
+
+    def test_torn_last_record_is_skipped(self):
+        task_list = self.data_manager.add_task_list("Inbox")
+        with open(self.data_manager.journal_file, 'a') as f:
+            f.write('{"op": "put_task", "task": {"id"')
+
+        reloaded = self._reload()
+        self.assertIn(task_list.id, reloaded.task_lists)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from app.data_manager import DataManager
+from app.data_models import Comment, LazyTask, Task
+from app.storage.json_backend import iter_json_array
+
+class TestStreamingLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name: str, data) -> str:
+        file_path = os.path.join(self.test_dir, name)
+        with open(file_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        return file_path
+
+    def test_iter_json_array_across_chunk_boundaries(self):
+        elements = [{"id": str(i), "text": "x" * i, "nested": {"list": [1, 2, {"k": "]"}]}} for i in range(50)]
+        file_path = self._write("items.json", elements)
+        self.assertEqual(list(iter_json_array(file_path, chunk_size=7)), elements)
+
+    def test_iter_json_array_stops_at_truncated_entry(self):
+        file_path = os.path.join(self.test_dir, "broken.json")
+        with open(file_path, 'w') as f:
+            f.write('[{"id": "1"}, {"id": "2"}, {"id": ')
+        self.assertEqual(list(iter_json_array(file_path, chunk_size=4)), [{"id": "1"}, {"id": "2"}])
+
+    def test_lazy_task_decodes_created_at_on_first_access(self):
+        task_dict = Task(description="Lazy", comments=[Comment(text="Hi", author="Frank")]).to_dict()
+        task = LazyTask.from_dict(task_dict)
+        self.assertIsNotNone(task._raw_created_at)
+        self.assertEqual(task.to_dict(), task_dict) # Saving does not need to decode it
+
+        self.assertEqual(task.comments[0].author, "Frank")
+        self.assertIsInstance(task.created_at, datetime)
+        self.assertIsNone(task._raw_created_at)
+        self.assertEqual(task.to_dict(), task_dict)
+
+    def test_data_manager_loads_lazy_tasks(self):
+        data_manager = DataManager(self.test_dir)
+        data_manager.load_data()
+        task_list = data_manager.add_task_list("Inbox")
+        task = data_manager.add_task("Later", task_list.id)
+        data_manager.add_comment_to_task(task.id, "Noted", "Gina")
+        data_manager.close()
+
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        loaded = reloaded.tasks[task.id]
+        self.assertIsInstance(loaded, LazyTask)
+        self.assertEqual([c.text for c in loaded.comments], ["Noted"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from app.mapped_text import MappedTextFile, looks_like_text
+
+class TestMappedText(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_lines_match_the_file_while_indexing_in_small_steps(self):
+        expected = [f"line {i} " + "x" * (i % 7) for i in range(1000)]
+        path = self._write("log.txt", ("\n".join(expected) + "\n").encode('utf-8'))
+        with MappedTextFile(path) as text_file:
+            text_file.LOOKUP_CHUNK = 100 # Lookups cross many partial scans
+            self.assertEqual(text_file.lines(700, 3), expected[700:703])
+            self.assertFalse(text_file.fully_indexed)
+            while text_file.index_more(333):
+                pass
+            self.assertEqual(text_file.indexed_lines, 1000)
+            self.assertEqual(text_file.lines(0, 2000), expected)
+            self.assertEqual(text_file.lines(999, 5), expected[999:])
+            self.assertIsNone(text_file.line_offset(1000))
+
+            for line_number in (0, 63, 64, 65, 500, 999):
+                offset = text_file.line_offset(line_number)
+                self.assertEqual(text_file.line_at(offset), line_number)
+                self.assertEqual(text_file.line_at(offset + 3), line_number)
+
+    def test_large_steps_are_counted_a_chunk_at_a_time(self):
+        path = self._write("log.txt", b"".join(b"entry %d\n" % i for i in range(300)))
+        with MappedTextFile(path) as text_file:
+            text_file.INDEX_CHUNK = 50
+            offset = text_file.size - 5
+            self.assertEqual(text_file.line_at(offset), 299)
+            self.assertGreater(text_file.indexed_bytes, offset)
+            self.assertFalse(text_file.index_more())
+            self.assertEqual(text_file.indexed_lines, 300)
+            self.assertEqual(text_file.lines(298, 5), ["entry 298", "entry 299"])
+
+    def test_empty_file_and_missing_last_newline(self):
+        with MappedTextFile(self._write("empty.txt", b"")) as text_file:
+            self.assertEqual(text_file.indexed_lines, 1)
+            self.assertEqual(text_file.lines(0, 10), [""])
+            self.assertIsNone(text_file.find("a"))
+
+        with MappedTextFile(self._write("short.txt", b"one\r\ntwo\nthree")) as text_file:
+            self.assertEqual(text_file.lines(0, 10), ["one", "two", "three"])
+            self.assertEqual(text_file.indexed_lines, 3)
+
+    def test_find(self):
+        path = self._write("log.txt", b"".join(b"ok %d\n" % i for i in range(500)) + b"Error: disk full\n")
+        with MappedTextFile(path) as text_file:
+            text_file.INDEX_CHUNK = 64 # Case-insensitive search reads in chunks; a match may span two
+            found = text_file.find("error: DISK")
+            self.assertEqual(text_file.line_at(found), 500)
+            self.assertIsNone(text_file.find("error: DISK", match_case=True))
+            self.assertEqual(text_file.find("Error: disk", match_case=True), found)
+            # A match may start just before end_offset, but not after it
+            self.assertEqual(text_file.find("error", found - 10, found + 1), found)
+            self.assertIsNone(text_file.find("error", 0, found))
+            self.assertIsNone(text_file.find("error", found + 1))
+
+    def test_looks_like_text(self):
+        self.assertTrue(looks_like_text(self._write("notes", "naïve café\n".encode('utf-8'))))
+        self.assertFalse(looks_like_text(self._write("image", b"\x89PNG\r\n\x1a\n\0\0")))
+        self.assertFalse(looks_like_text(self._write("latin1", "café au lait".encode('latin-1'))))
+        self.assertFalse(looks_like_text(os.path.join(self.test_dir, "missing")))
+
+if __name__ == '__main__':
+    unittest.main()
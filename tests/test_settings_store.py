@@ -0,0 +1,57 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+from app.settings_store import SettingsStore, WorkspaceViewState
+
+class TestSettingsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.settings_file = os.path.join(self.test_dir, "settings.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_writes_are_batched_until_flush(self):
+        store = SettingsStore(self.settings_file)
+        for i in range(100):
+            store.set('last_selected_context_id', f"workspace-{i}")
+        self.assertFalse(os.path.exists(self.settings_file))
+        self.assertEqual(store.get('last_selected_context_id'), "workspace-99")
+
+        store.flush()
+        self.assertFalse(store.dirty)
+        with open(self.settings_file) as f:
+            self.assertEqual(json.load(f), {'last_selected_context_id': "workspace-99"})
+
+    def test_unchanged_value_does_not_mark_dirty(self):
+        store = SettingsStore(self.settings_file)
+        store.set('key', 1)
+        store.flush()
+        self.assertFalse(store.set('key', 1))
+        self.assertFalse(store.dirty)
+
+    def test_view_state_round_trip(self):
+        store = SettingsStore(self.settings_file)
+        store.set_view_state("ws-1", WorkspaceViewState(selected_list_id="list-a"))
+        store.flush()
+
+        reloaded = SettingsStore(self.settings_file)
+        self.assertEqual(reloaded.get_view_state("ws-1").selected_list_id, "list-a")
+        self.assertIsNone(reloaded.get_view_state("ws-2").selected_list_id)
+
+    def test_data_manager_defers_settings_to_write_behind(self):
+        data_manager = DataManager(self.test_dir)
+        data_manager.start_write_behind(quiet_period=60, max_delay=60)
+        data_manager.save_setting('last_selected_context_id', "__DEFAULT_LISTS__")
+        self.assertFalse(os.path.exists(self.settings_file))
+
+        data_manager.close()
+        self.assertEqual(DataManager(self.test_dir).load_setting('last_selected_context_id'), "__DEFAULT_LISTS__")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+
+class TestShardedJsonBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = self._open()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _open(self) -> DataManager:
+        data_manager = DataManager(self.test_dir, backend='sharded')
+        data_manager.load_data()
+        return data_manager
+
+    def _shard(self, shard_id: str) -> dict:
+        with open(os.path.join(self.data_manager.lists_dir, f"{shard_id}.json")) as f:
+            return json.load(f)
+
+    def test_save_only_rewrites_the_dirty_shard(self):
+        busy = self.data_manager.add_task_list("Busy")
+        quiet = self.data_manager.add_task_list("Quiet")
+        task = self.data_manager.add_task("Edit me", busy.id)
+        quiet_path = os.path.join(self.data_manager.lists_dir, f"{quiet.id}.json")
+        quiet_mtime = os.stat(quiet_path).st_mtime_ns
+
+        task.description = "Edited"
+        self.data_manager.update_task(task)
+        self.assertEqual(os.stat(quiet_path).st_mtime_ns, quiet_mtime)
+        self.assertEqual(self._shard(busy.id)["tasks"][0]["description"], "Edited")
+
+    def test_comments_are_kept_out_of_the_shards(self):
+        busy = self.data_manager.add_task_list("Busy")
+        task = self.data_manager.add_task("Discuss", busy.id)
+        busy_path = os.path.join(self.data_manager.lists_dir, f"{busy.id}.json")
+        busy_mtime = os.stat(busy_path).st_mtime_ns
+
+        self.data_manager.add_comment_to_task(task.id, "Progress", "Eve")
+        self.assertEqual(os.stat(busy_path).st_mtime_ns, busy_mtime)
+        self.assertNotIn("comments", self._shard(busy.id)["tasks"][0])
+        self.assertEqual([c.text for c in self._open().tasks[task.id].comments], ["Progress"])
+
+    def test_moving_a_task_updates_both_shards(self):
+        source = self.data_manager.add_task_list("Source")
+        target = self.data_manager.add_task_list("Target")
+        task = self.data_manager.add_task("Move me", source.id)
+        task.assigned_to = target.id
+        self.data_manager.update_task(task)
+
+        self.assertEqual(self._shard(source.id)["tasks"], [])
+        self.assertEqual([t["id"] for t in self._shard(target.id)["tasks"]], [task.id])
+
+    def test_delete_task_list_drops_its_shard(self):
+        doomed = self.data_manager.add_task_list("Doomed")
+        task = self.data_manager.add_task("Survivor", doomed.id)
+        self.data_manager.delete_task_list(doomed.id)
+
+        self.assertFalse(os.path.exists(os.path.join(self.data_manager.lists_dir, f"{doomed.id}.json")))
+        reloaded = self._open()
+        self.assertNotIn(doomed.id, reloaded.task_lists)
+        self.assertIsNone(reloaded.tasks[task.id].assigned_to)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import json
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+from app.storage.merge import check_versions
+
+class TestSharedFolder(unittest.TestCase):
+    """Two DataManagers on one data folder stand in for two instances of the app."""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.ours = self._open()
+        self.task_list = self.ours.add_task_list("Team")
+        self.shared_task = self.ours.add_task("Shared", self.task_list.id)
+        self.theirs = self._open()
+
+    def tearDown(self):
+        for data_manager in (self.ours, self.theirs):
+            data_manager.storage.close()
+        shutil.rmtree(self.test_dir)
+
+    def _open(self, backend: str = 'json') -> DataManager:
+        data_manager = DataManager(self.test_dir, backend=backend)
+        data_manager.load_data()
+        return data_manager
+
+    def test_saving_keeps_the_other_instances_changes(self):
+        added = self.ours.add_task("Ours", self.task_list.id)
+        task = self.theirs.tasks[self.shared_task.id]
+        task.description = "Edited by them"
+        self.theirs.update_task(task)
+        self.theirs.save_data() # A full snapshot, written from stale data
+
+        reopened = self._open()
+        self.assertIn(added.id, reopened.tasks)
+        self.assertEqual(reopened.tasks[self.shared_task.id].description, "Edited by them")
+        self.assertEqual(reopened.tasks[self.shared_task.id].version, 2)
+        reopened.storage.close()
+
+    def test_editing_a_task_changed_elsewhere_is_a_conflict(self):
+        task = self.theirs.tasks[self.shared_task.id]
+        task.description = "Theirs"
+        self.theirs.update_task(task)
+
+        self.shared_task.description = "Ours"
+        self.ours.update_task(self.shared_task)
+        conflicts = self.ours.take_conflicts()
+        self.assertEqual([(c.task_id, c.ours['description'], c.stored_version) for c in conflicts],
+                         [(self.shared_task.id, "Ours", 2)])
+        self.assertEqual(self.ours.take_conflicts(), [])
+
+        with open(self.ours.conflicts_file) as f:
+            self.assertEqual(json.loads(f.readline())['ours']['description'], "Ours")
+        self.ours.save_data()
+        reopened = self._open()
+        self.assertEqual(reopened.tasks[self.shared_task.id].description, "Theirs")
+        reopened.storage.close()
+
+    def test_deleting_a_task_edited_elsewhere_keeps_it(self):
+        task = self.theirs.tasks[self.shared_task.id]
+        task.description = "Still needed"
+        self.theirs.update_task(task)
+        self.ours.delete_task(self.shared_task.id)
+        self.assertEqual([c.ours for c in self.ours.take_conflicts()], [None])
+        self.assertIn(self.shared_task.id, self._open().tasks)
+
+    def test_sqlite_keeps_versions(self):
+        for data_manager in (self.ours, self.theirs):
+            data_manager.close()
+        self.ours = self._open('sqlite')
+        task = self.ours.tasks[self.shared_task.id]
+        self.ours.update_task(task)
+        self.assertEqual(self.ours.storage.load_versions(), {task.id: 2})
+        self.theirs = self._open('sqlite')
+        self.assertEqual(self.theirs.tasks[task.id].version, 2)
+
+    def test_check_versions(self):
+        stored = {'a': 3, 'b': 1}
+        records = [{'op': 'put_task', 'task': {'id': 'a', 'description': "A", 'version': 4}},
+                   {'op': 'put_task', 'task': {'id': 'a', 'description': "A", 'version': 5}},
+                   {'op': 'put_task', 'task': {'id': 'b', 'description': "B", 'version': 3}},
+                   {'op': 'put_task', 'task': {'id': 'c', 'description': "New", 'version': 1}},
+                   {'op': 'put_task', 'task': {'id': 'd', 'description': "Gone", 'version': 2}},
+                   {'op': 'delete_task', 'id': 'c', 'version': 1}]
+        accepted, conflicts = check_versions(records, stored)
+        self.assertEqual([r.get('task', r).get('version') for r in accepted], [4, 5, 1, 1])
+        self.assertEqual([(c.task_id, c.stored_version) for c in conflicts], [('b', 1), ('d', None)])
+        self.assertEqual(stored, {'a': 5, 'b': 1})
+
+if __name__ == '__main__':
+    unittest.main()
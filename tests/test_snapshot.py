@@ -0,0 +1,74 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime
+
+from app.data_manager import DataManager
+from app.data_models import Comment, Task, TaskList, TaskPriority, TaskStatus
+from app.storage.snapshot import load_binary_snapshot, save_binary_snapshot
+
+class TestBinarySnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.snapshot_file = os.path.join(self.test_dir, "tasks.snap")
+        self.source_file = os.path.join(self.test_dir, "tasks.json")
+        with open(self.source_file, 'w') as f:
+            f.write("[]")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _sample(self):
+        task_list = TaskList(name="Ünïcode list", category="project", is_pinned=True)
+        tasks = [
+            Task(description="Full", status=TaskStatus.QUESTION, priority=TaskPriority.HIGH,
+                 comments=[Comment(text="日本語", author="Hana"), Comment(text="second", author="Hana")],
+                 attachments=[os.path.join("task", "log.txt")], start_at=datetime(2025, 6, 1, 9, 30),
+                 due_at=datetime(2025, 6, 2, 17, 0, 0, 123456), assigned_to=task_list.id, is_pinned=True),
+            Task(description="Bare"),
+        ]
+        return [task_list.to_dict()], [task.to_dict(include_comments=False) for task in tasks]
+
+    def test_round_trip_preserves_data(self):
+        task_lists, tasks = self._sample()
+        self.assertTrue(save_binary_snapshot(self.snapshot_file, task_lists, tasks, [self.source_file]))
+
+        loaded_lists, loaded_tasks = load_binary_snapshot(self.snapshot_file, [self.source_file])
+        self.assertEqual(loaded_lists, task_lists)
+        self.assertEqual([Task.from_dict(t).to_dict(include_comments=False) for t in loaded_tasks], tasks)
+
+    def test_snapshot_is_ignored_once_source_changes(self):
+        task_lists, tasks = self._sample()
+        save_binary_snapshot(self.snapshot_file, task_lists, tasks, [self.source_file])
+        with open(self.source_file, 'w') as f:
+            f.write("[ ]")
+        self.assertIsNone(load_binary_snapshot(self.snapshot_file, [self.source_file]))
+
+    def test_older_snapshot_layout_is_treated_as_stale(self):
+        task_lists, tasks = self._sample()
+        save_binary_snapshot(self.snapshot_file, task_lists, tasks, [self.source_file])
+        with open(self.snapshot_file, 'r+b') as f:
+            f.write(b"MTSNAP03")
+        self.assertIsNone(load_binary_snapshot(self.snapshot_file, [self.source_file]))
+
+    def test_data_manager_prefers_fresh_snapshot(self):
+        data_manager = DataManager(self.test_dir)
+        data_manager.load_data()
+        task_list = data_manager.add_task_list("Inbox")
+        task = data_manager.add_task("Snapshot me", task_list.id, due_at=datetime(2025, 7, 1, 12, 0))
+        data_manager.close()
+        self.assertTrue(os.path.exists(self.snapshot_file))
+
+        task_lists, tasks = data_manager.storage.load()
+        self.assertIsInstance(tasks, list) # Came from the snapshot, not the streaming JSON reader
+
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        self.assertEqual(reloaded.tasks[task.id].due_at, datetime(2025, 7, 1, 12, 0))
+        self.assertEqual(reloaded.tasks[task.id].to_dict(), task.to_dict())
+
+if __name__ == '__main__':
+    unittest.main()
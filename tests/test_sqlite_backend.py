@@ -0,0 +1,113 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+
+class TestSqliteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _open(self, backend='sqlite') -> DataManager:
+        data_manager = DataManager(self.test_dir, backend=backend)
+        data_manager.load_data()
+        return data_manager
+
+    def test_changes_round_trip_through_database(self):
+        data_manager = self._open()
+        task_list = data_manager.add_task_list("Inbox", category='project')
+        task = data_manager.add_task("Ship it", task_list.id, due_at=datetime(2025, 6, 2, 17, 0))
+        data_manager.add_comment_to_task(task.id, "Almost there", "Dana")
+        task.status = TaskStatus.DONE
+        data_manager.update_task(task)
+        data_manager.close()
+
+        reloaded = self._open()
+        self.assertEqual(reloaded.task_lists[task_list.id].category, 'project')
+        self.assertEqual(reloaded.get_task_by_id(task.id).status, TaskStatus.DONE)
+        self.assertEqual([c.text for c in reloaded.tasks[task.id].comments], ["Almost there"])
+        self.assertFalse(os.path.exists(reloaded.tasks_file))
+        reloaded.close()
+
+    def test_migrates_existing_json_files_once(self):
+        json_manager = self._open(backend='json')
+        task_list = json_manager.add_task_list("Legacy")
+        json_manager.add_task("Old task", task_list.id)
+        json_manager.close()
+
+        migrated = self._open()
+        self.assertEqual([t.description for t in migrated.tasks.values()], ["Old task"])
+        self.assertFalse(migrated.storage.is_empty())
+        migrated.close()
+
+    def test_indexed_date_query(self):
+        data_manager = self._open()
+        task_list = data_manager.add_task_list("Calendar")
+        spanning = data_manager.add_task("Sprint", task_list.id, start_at=datetime(2025, 6, 1, 9, 0),
+                                         due_at=datetime(2025, 6, 5, 18, 0))
+        due_only = data_manager.add_task("Report", task_list.id, due_at=datetime(2025, 6, 3, 12, 0))
+        data_manager.add_task("Later", task_list.id, due_at=datetime(2025, 6, 9, 12, 0))
+        data_manager.add_task("Backwards", task_list.id, start_at=datetime(2025, 6, 4), due_at=datetime(2025, 6, 3))
+
+        storage = data_manager.storage
+        self.assertEqual(storage.query_task_ids(assigned_to=task_list.id, start_date=date(2025, 6, 3),
+                                                end_date=date(2025, 6, 3)), [spanning.id, due_only.id])
+        self.assertEqual(storage.query_task_ids(start_date=date(2025, 6, 5), end_date=date(2025, 6, 8)), [spanning.id])
+        self.assertEqual(storage.query_task_ids(end_date=date(2025, 6, 2)), [spanning.id])
+        self.assertEqual(storage.query_task_ids(status=TaskStatus.DONE.name), [])
+        self.assertEqual(storage.query_list_ids('default'), [task_list.id])
+        data_manager.close()
+
+    def test_finished_tasks_are_read_on_demand(self):
+        data_manager = self._open()
+        task_list = data_manager.add_task_list("Team")
+        open_task = data_manager.add_task("Open", task_list.id, due_at=datetime(2025, 6, 3, 12, 0))
+        done = [data_manager.add_task(f"Done {i}", task_list.id, status=TaskStatus.DONE,
+                                      due_at=datetime(2025, 6, 1 + i, 12, 0)) for i in range(3)]
+        data_manager.close()
+
+        data_manager = self._open()
+        self.assertEqual(list(data_manager.tasks), [open_task.id]) # History stays in the database
+        on_date = data_manager.get_tasks_for_task_list_on_date(task_list.id, date(2025, 6, 3))
+        self.assertEqual([t.description for t in on_date], ["Open", "Done 2"])
+        self.assertEqual(set(data_manager.tasks), {open_task.id, done[2].id})
+
+        data_manager.start_write_behind(quiet_period=60, max_delay=60)
+        data_manager.delete_task(done[2].id) # Not written yet, so still in the database
+        self.assertEqual([t.description for t in data_manager.get_tasks_for_task_list(task_list.id)],
+                         ["Open", "Done 0", "Done 1"])
+        self.assertEqual(len(data_manager.get_tasks_by_status(TaskStatus.DONE)), 2)
+        reopened = data_manager.get_task_by_id(done[0].id)
+        reopened.status = TaskStatus.ONGOING
+        data_manager.update_task(reopened)
+        data_manager.close()
+
+        data_manager = self._open()
+        self.assertEqual(set(data_manager.tasks), {open_task.id, done[0].id})
+        self.assertIsNone(data_manager.get_task_by_id(done[2].id))
+        data_manager.close()
+
+    def test_stored_finished_tasks_keep_their_attachments(self):
+        data_manager = self._open()
+        task_list = data_manager.add_task_list("Team")
+        source = os.path.join(self.test_dir, "report.txt")
+        with open(source, 'w') as f:
+            f.write("Quarterly numbers")
+        ref = data_manager.attachment_store.add_file(source)
+        data_manager.add_task("Filed", task_list.id, status=TaskStatus.DONE, attachments=[ref])
+        data_manager.close()
+
+        data_manager = self._open()
+        self.assertEqual(data_manager.collect_attachment_blobs(grace_seconds=0), (0, 0))
+        self.assertTrue(os.path.exists(data_manager.attachment_store.path(ref)))
+        data_manager.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+
+from app.data_manager import DataManager
+from app.data_models import TaskStatus
+
+class TestTaskExport(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.workspace = self.data_manager.add_task_list("Project", category='project')
+        self.sprint = self.data_manager.add_task_list("Sprint", category=f"project_{self.workspace.id}")
+        self.home = self.data_manager.add_task_list("Home")
+        self.plan = self.data_manager.add_task("Plan", self.sprint.id, due_at=datetime(2024, 5, 2, 12))
+        self.data_manager.add_comment_to_task(self.plan.id, "first", "Ann")
+        self.data_manager.add_comment_to_task(self.plan.id, "second", "Bo")
+        self.data_manager.add_task("Ship", self.sprint.id, status=TaskStatus.DONE, due_at=datetime(2024, 6, 1, 12))
+        self.data_manager.add_task("Shop", self.home.id)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_filters(self):
+        descriptions = lambda **filters: sorted(t.description for t in self.data_manager.iter_tasks(**filters))
+        self.assertEqual(descriptions(), ["Plan", "Ship", "Shop"])
+        self.assertEqual(descriptions(workspace_id=self.workspace.id), ["Plan", "Ship"])
+        self.assertEqual(descriptions(workspace_id=self.workspace.id, statuses=[TaskStatus.PENDING]), ["Plan"])
+        self.assertEqual(descriptions(list_id=self.home.id), ["Shop"])
+        self.assertEqual(descriptions(start_date=date(2024, 5, 1), end_date=date(2024, 5, 31)), ["Plan"])
+        self.assertEqual(descriptions(start_date=date(2024, 5, 3)), ["Ship"])
+
+    def test_ndjson_nested_round_trips_through_import(self):
+        path = os.path.join(self.test_dir, "out.ndjson")
+        self.assertEqual(self.data_manager.export_tasks(path, list_id=self.sprint.id), 2)
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        plan = next(r for r in records if r['description'] == "Plan")
+        self.assertEqual([c['text'] for c in plan['comments']], ["first", "second"])
+        self.assertEqual(plan['list'], "Sprint")
+
+        other = DataManager(tempfile.mkdtemp())
+        try:
+            report = other.import_tasks(path)
+            self.assertEqual((report.imported, report.errors, report.created_lists), (2, [], ["Sprint"]))
+        finally:
+            shutil.rmtree(other.data_dir)
+
+    def test_export_leaves_the_comment_cache_alone(self):
+        self.data_manager.flush()
+        self.data_manager.comment_threads.clear()
+        path = os.path.join(self.test_dir, "out.ndjson")
+        self.data_manager.export_tasks(path)
+        with open(path, encoding='utf-8') as f:
+            plan = next(r for r in map(json.loads, f) if r['description'] == "Plan")
+        self.assertEqual([c['text'] for c in plan['comments']], ["first", "second"])
+        self.assertEqual(plan['attachments'], [])
+        self.assertIsNone(self.data_manager.comment_threads.peek(self.plan.id)) # Read past the cache
+        self.assertEqual(self.plan.attachment_refs(), ()) # Still sharing the empty tuple
+
+    def test_csv_flattened_comments(self):
+        path = os.path.join(self.test_dir, "out.csv")
+        count = self.data_manager.export_tasks(path, comments='flat', workspace_id=self.workspace.id)
+        self.assertEqual(count, 3) # Two rows for Plan's comments, one for Ship
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(r['description'], r['comment_text']) for r in rows],
+                         [("Plan", "first"), ("Plan", "second"), ("Ship", "")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from app.data_manager import DataManager
+from app.data_models import TaskPriority, TaskStatus
+
+class TestTaskImport(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.existing = self.data_manager.add_task_list("Sprint 1")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_file(self, name: str, content: str) -> str:
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_import_resolves_and_creates_lists(self):
+        path = self.write_file("tasks.csv",
+                               "description,list,status,priority,start_at,due_at,is_pinned\n"
+                               "Plan,sprint 1,ongoing,high,2024-05-01,2024-05-03T17:00,yes\n"
+                               "Build,Sprint 2,,,,,\n"
+                               ",Sprint 2,,,,,\n"
+                               "Test,Sprint 2,blocked,,,,\n"
+                               "Ship,Sprint 2,,,2024-05-09,2024-05-08,\n")
+        report = self.data_manager.import_tasks(path)
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.created_lists, ["Sprint 2"])
+        self.assertEqual([row for row, _ in report.errors], [4, 5, 6])
+        plan = self.data_manager.get_tasks_for_task_list(self.existing.id)[0]
+        self.assertEqual((plan.status, plan.priority, plan.is_pinned), (TaskStatus.ONGOING, TaskPriority.HIGH, True))
+        self.assertEqual(plan.due_at, datetime(2024, 5, 3, 17))
+
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        self.assertEqual(sorted(t.description for t in reloaded.tasks.values()), ["Build", "Plan"])
+
+    def test_ndjson_import_with_comments_is_saved_once(self):
+        lines = [
+            json.dumps({"description": "A", "list_id": self.existing.id, "comments": ["first", {"text": "second", "author": "Bo"}]}),
+            "{not json",
+            json.dumps({"description": "B", "list": "Elsewhere"}),
+            json.dumps({"description": "C", "list_id": "missing"}),
+        ]
+        path = self.write_file("tasks.ndjson", "\n".join(lines) + "\n")
+        writes = []
+        write_changes = self.data_manager.storage.write_changes
+        self.data_manager.storage.write_changes = lambda records: (writes.append(len(records)), write_changes(records))
+
+        report = self.data_manager.import_tasks(path, create_lists=False)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([row for row, _ in report.errors], [2, 3, 4])
+        self.assertEqual(writes, [1])
+        task = self.data_manager.get_tasks_for_task_list(self.existing.id)[0]
+        self.assertEqual([(c.text, c.author) for c in task.comments], [("first", "Import"), ("second", "Bo")])
+
+    def test_wrong_types_and_time_zones(self):
+        lines = [
+            json.dumps({"description": 5, "list_id": self.existing.id}),
+            json.dumps({"description": "Bad list", "list": ["Sprint 1"]}),
+            json.dumps({"description": "Naive", "list_id": self.existing.id, "due_at": "2024-05-03T17:00"}),
+            json.dumps({"description": "Aware", "list_id": self.existing.id, "due_at": "2024-05-03T17:00+02:00"}),
+        ]
+        report = self.data_manager.import_tasks(self.write_file("tasks.ndjson", "\n".join(lines) + "\n"))
+
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([row for row, _ in report.errors], [1, 2])
+        aware = next(t for t in self.data_manager.tasks.values() if t.description == "Aware")
+        self.assertIsNone(aware.due_at.tzinfo) # Converted to local time
+        self.assertEqual(aware.due_at, datetime.fromisoformat("2024-05-03T17:00+02:00").astimezone().replace(tzinfo=None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import shutil
+import tempfile
+
+from app.data_manager import DataManager
+from app.data_models import Task, TaskStatus
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.task_list = self.data_manager.add_task_list("Work")
+        self.writes = []
+        write_changes = self.data_manager.storage.write_changes
+        self.data_manager.storage.write_changes = lambda records: (self.writes.append(len(records)), write_changes(records))
+
+    def tearDown(self):
+        self.data_manager.close()
+        shutil.rmtree(self.test_dir)
+
+    def reloaded(self) -> DataManager:
+        data_manager = DataManager(self.test_dir)
+        data_manager.load_data()
+        return data_manager
+
+    def test_commit_writes_once(self):
+        with self.data_manager.transaction():
+            for i in range(10):
+                task = self.data_manager.add_task(f"Task {i}", self.task_list.id)
+                self.data_manager.add_comment_to_task(task.id, "note", "me")
+            with self.data_manager.transaction(): # Nested scopes join the outer one
+                self.data_manager.update_task_list_name(self.task_list.id, "Renamed")
+            self.assertEqual(self.writes, [])
+
+        self.assertEqual(self.writes, [21])
+        reloaded = self.reloaded()
+        self.assertEqual(len(reloaded.tasks), 10)
+        self.assertEqual(reloaded.task_lists[self.task_list.id].name, "Renamed")
+
+    def test_exception_rolls_back_in_memory_changes(self):
+        task = self.data_manager.add_task("Keep", self.task_list.id)
+        other = self.data_manager.add_task("Other", self.task_list.id)
+        load = self.data_manager.storage.load
+        self.data_manager.storage.load = lambda: self.fail("Rolled back by reading the files")
+        with self.assertRaises(RuntimeError):
+            with self.data_manager.transaction():
+                self.data_manager.add_task("Discard", self.task_list.id)
+                edited = Task.from_dict(task.to_dict())
+                edited.status = TaskStatus.DONE
+                self.data_manager.update_task(edited)
+                self.data_manager.add_comment_to_task(task.id, "dropped", "me")
+                self.data_manager.delete_task(other.id)
+                self.data_manager.update_task_list_name(self.task_list.id, "Renamed")
+                self.data_manager.delete_task_list(self.task_list.id)
+                raise RuntimeError("boom")
+        self.data_manager.storage.load = load
+
+        self.assertEqual(sorted(t.description for t in self.data_manager.tasks.values()), ["Keep", "Other"])
+        self.assertEqual(self.data_manager.tasks[task.id].status, TaskStatus.PENDING)
+        self.assertEqual(self.data_manager.tasks[task.id].comments, [])
+        self.assertEqual(len(self.data_manager.get_tasks_for_task_list(self.task_list.id)), 2)
+        self.assertEqual(self.data_manager.get_task_list_by_name("work").id, self.task_list.id)
+        self.assertIsNone(self.data_manager.get_task_list_by_name("renamed"))
+        self.assertEqual(self.writes, [1, 1]) # Only the two tasks added before the block
+        self.assertEqual(len(self.reloaded().tasks), 2)
+
+    def test_edits_made_in_place_are_kept(self):
+        task = self.data_manager.add_task("Edited in place", self.task_list.id)
+        with self.assertRaises(RuntimeError):
+            with self.data_manager.transaction():
+                task.status = TaskStatus.DONE
+                self.data_manager.update_task(task)
+                self.data_manager.add_task("Discard", self.task_list.id)
+                raise RuntimeError("boom")
+
+        # Its earlier state is gone, so memory and the files keep the edit
+        self.assertEqual(self.data_manager.get_tasks_by_status(TaskStatus.DONE), [task])
+        self.assertEqual([t.status for t in self.reloaded().tasks.values()], [TaskStatus.DONE])
+
+    def test_nested_rollback_keeps_outer_changes(self):
+        with self.data_manager.transaction():
+            self.data_manager.add_task("Outer", self.task_list.id)
+            try:
+                with self.data_manager.transaction():
+                    self.data_manager.add_task("Inner", self.task_list.id)
+                    raise ValueError("bad row")
+            except ValueError:
+                pass
+            self.data_manager.add_task("After", self.task_list.id)
+
+        descriptions = sorted(t.description for t in self.data_manager.tasks.values())
+        self.assertEqual(descriptions, ["After", "Outer"])
+        self.assertEqual(sorted(t.description for t in self.reloaded().tasks.values()), ["After", "Outer"])
+
+    def test_failed_indexing_leaves_no_half_added_task(self):
+        update_alarm = self.data_manager.alarms.update
+        def failing_update(task):
+            if task.description == "Broken":
+                raise TypeError("can't compare offset-naive and offset-aware datetimes")
+            update_alarm(task)
+        self.data_manager.alarms.update = failing_update
+        with self.assertRaises(TypeError):
+            with self.data_manager.transaction():
+                self.data_manager.add_task("Fine", self.task_list.id)
+                self.data_manager.add_task("Broken", self.task_list.id)
+
+        self.assertEqual(self.data_manager.tasks, {})
+        self.assertEqual(self.data_manager.get_tasks_for_task_list(self.task_list.id), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+from app.data_manager import DataManager
+from app.storage.write_behind import WriteBehindSaver
+
+class TestWriteBehindSaver(unittest.TestCase):
+
+    def test_burst_of_changes_is_coalesced_into_one_flush(self):
+        flushes = []
+        saver = WriteBehindSaver(lambda: flushes.append(time.monotonic()), quiet_period=0.05, max_delay=1.0)
+        saver.start()
+        for _ in range(20):
+            saver.mark_dirty()
+        time.sleep(0.3)
+        saver.stop()
+        self.assertEqual(len(flushes), 1)
+
+    def test_max_delay_bounds_a_continuous_burst(self):
+        flushes = []
+        saver = WriteBehindSaver(lambda: flushes.append(time.monotonic()), quiet_period=0.1, max_delay=0.15)
+        saver.start()
+        end = time.monotonic() + 0.5
+        while time.monotonic() < end:
+            saver.mark_dirty()
+            time.sleep(0.01)
+        saver.stop()
+        self.assertGreaterEqual(len(flushes), 2)
+
+    def test_stop_flushes_pending_changes(self):
+        flushes = []
+        saver = WriteBehindSaver(lambda: flushes.append(1), quiet_period=60, max_delay=60)
+        saver.start()
+        saver.mark_dirty()
+        saver.stop()
+        self.assertEqual(flushes, [1])
+
+
+class TestDataManagerWriteBehind(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.data_manager = DataManager(self.test_dir)
+        self.data_manager.load_data()
+        self.data_manager.start_write_behind(quiet_period=60, max_delay=60)
+
+    def tearDown(self):
+        if self.data_manager.saver:
+            self.data_manager.saver.stop()
+        shutil.rmtree(self.test_dir)
+
+    def test_mutations_do_not_touch_disk_until_flushed(self):
+        task_list = self.data_manager.add_task_list("Inbox")
+        self.data_manager.add_task("Background save", task_list.id)
+        self.assertFalse(os.path.exists(self.data_manager.journal_file))
+
+        self.data_manager.close()
+        reloaded = DataManager(self.test_dir)
+        reloaded.load_data()
+        self.assertEqual([t.description for t in reloaded.tasks.values()], ["Background save"])
+
+if __name__ == '__main__':
+    unittest.main()